@@ -7,6 +7,8 @@ SIM_PLATFORM = os.environ.get('SIM_PLATFORM', 'XRUN')
 _COVFILE = os.environ.get('COVFILE', "coverage.ccf")
 COVFILE = _COVFILE if os.path.isabs(_COVFILE) else os.path.join(PROJ_DIR, _COVFILE)
 REPORT_DIR = os.environ.get("SIMMER_REPORT_DIR")
+SHARED_DISCOVERY_CACHE = os.environ.get("SIMMER_SHARED_DISCOVERY_CACHE")
+SHARED_COMPILE_CACHE = os.environ.get("SIMMER_SHARED_COMPILE_CACHE")
 
 
 def add_child_argument(container, *args, parent, **kwargs):
@@ -121,6 +123,12 @@ def add_debug_arguments(parser):
                              type=int,
                              help=("Stop launching new jobs after this positive number of failures (default: 10); "
                                    "running jobs finish normally."))
+    debug_group.add_argument('--fail-fast',
+                             default=None,
+                             type=int,
+                             metavar='K',
+                             help=("Skip the queued iterations of a test once K of its iterations fail with the "
+                                   "same first error and none has passed. Other tests keep running."))
     debug_group.add_argument(
         "--allow-no-run",
         default=False,
@@ -225,6 +233,70 @@ def add_regression_arguments(parser):
                                   help=('Maximum concurrent compile/simulation jobs. By default simmer uses the '
                                         'LSF/Slurm or process-affinity CPU allocation, applies a conservative '
                                         'fallback cap, and adjusts for VCS FGP or Xcelium MCE threads.'))
+    regression_group.add_argument(
+        '--adaptive-jobs',
+        type=int,
+        default=None,
+        metavar='MAX',
+        help=('Adjust the concurrent job limit during the run, between 1 and MAX, from the load average, '
+              'Linux I/O and memory pressure, and how fast jobs finish against their recorded history. '
+              'Starts from the --jobs or CPU-allocation limit. Not supported with --batch-system lsf/slurm.'))
+    regression_group.add_argument(
+        '--batch-system',
+        choices=['local', 'lsf', 'slurm'],
+        default=None,
+        help=('Submit each simulation as a batch job (bsub/sbatch) instead of a local subprocess. Compiles still '
+              'run locally. "local" runs the same batch flow with local processes for testing.'))
+    regression_group.add_argument(
+        '--batch-submit-args',
+        default='',
+        help='Extra bsub/sbatch arguments for every simulation, for example "-q regress" or "-p sim".')
+    regression_group.add_argument(
+        '--job-array-size',
+        type=int,
+        default=None,
+        help=('Submit the iterations of a test@N sweep as batch job arrays of up to this many iterations instead '
+              'of one batch job per iteration. Each array takes one --jobs slot. Requires --batch-system.'))
+    regression_group.add_argument(
+        '--pipeline-compile',
+        default=False,
+        action='store_true',
+        help=('Run bench compiles next to simulations instead of alone, so one bench simulates while another '
+              'compiles. Compiles and simulations share --jobs and the cpu resource pool.'))
+    regression_group.add_argument(
+        '--compile-jobs',
+        type=int,
+        default=None,
+        help='Maximum concurrent Bazel/compile jobs with --pipeline-compile (default: no separate limit).')
+    regression_group.add_argument(
+        '--resource-pool',
+        dest='resource_pool',
+        action='append',
+        default=[],
+        metavar='NAME=CAPACITY',
+        help=('Limit the summed claims of concurrent simulations on one resource. NAME is cpu, memory_mb, or '
+              'license:<feature>. Repeat for multiple pools.'))
+    regression_group.add_argument(
+        '--sim-license',
+        dest='sim_license',
+        action='append',
+        default=[],
+        metavar='FEATURE[=COUNT]',
+        help=('License feature tokens each simulation holds (default count: 1). Pair with '
+              '--resource-pool license:<feature>=N to match the licenses available to this run.'))
+    regression_group.add_argument(
+        '--sim-memory-mb',
+        type=int,
+        default=None,
+        help=('Estimated peak memory of one simulation in MiB. Simulations are packed against the memory_mb '
+              'resource pool, which defaults to the host physical memory.'))
+    regression_group.add_argument(
+        '--default-test-runtime',
+        type=float,
+        default=None,
+        metavar='SECONDS',
+        help=('Expected simulation time for tests without recorded history. Simulations launch longest '
+              'expected first; by default unknown tests use the median of the tests with history.'))
     regression_group.add_argument(
         '--simmer-profile',
         default=False,
@@ -258,6 +330,21 @@ def add_regression_arguments(parser):
         default=False,
         action='store_true',
         help='Print all active simmer runs in this project and exit without discovery, compilation, or simulation.')
+    regression_group.add_argument(
+        '--discovery-daemon',
+        default=None,
+        choices=('run', 'status', 'stop'),
+        help=('Manage the optional per-workspace discovery daemon. "run" serves discovery results in the '
+              'foreground and keeps them warm by watching BUILD/.bzl files; later simmer runs in this workspace '
+              'ask it first and fall back to the discovery cache when it is absent. "status" and "stop" query or '
+              'stop a running daemon.'))
+    regression_group.add_argument(
+        '--resume',
+        default=None,
+        metavar='RUN_ID',
+        help=('Resume an interrupted regression from its scheduler journal: rerun the journaled command line, '
+              'count iterations that already passed and rerun the rest with their original seeds. No other '
+              'options may be given with --resume.'))
     regression_group.add_argument(
         '--no-stdout',
         default=False,
@@ -312,6 +399,35 @@ def add_flow_control_arguments(parser):
         help=('Require a matching scoped discovery cache and reuse existing bazel-bin/runfiles outputs without '
               'running Bazel. Use only when BUILD files, generated filelists, source dependencies, and rule inputs '
               'are unchanged. Explicit use makes a missing or stale cache an error.'))
+    flow_control_group.add_argument(
+        '--rehash-discovery',
+        default=False,
+        action='store_true',
+        help=('Hash every discovery dependency file when checking the discovery cache instead of trusting '
+              'digests recorded for files whose size, mtime and inode are unchanged.'))
+    flow_control_group.add_argument(
+        '--shared-discovery-cache',
+        default=SHARED_DISCOVERY_CACHE,
+        metavar='DIR',
+        help=('Share discovery results with other users and CI through a content-addressed store in DIR, '
+              'keyed by the discovery dependency manifest. A run on an already discovered commit reuses the '
+              'stored results instead of running Bazel; a read-only DIR is only read. Default comes from '
+              'SIMMER_SHARED_DISCOVERY_CACHE.'))
+    flow_control_group.add_argument(
+        '--explain-recompile',
+        default=False,
+        action='store_true',
+        help=('Record the digest of every compile input with the compile fingerprint, and when a testbench '
+              'must recompile, log the inputs, environment keys and compile script lines that changed since '
+              'its last recorded compile.'))
+    flow_control_group.add_argument(
+        '--shared-compile-cache',
+        default=SHARED_COMPILE_CACHE,
+        metavar='DIR',
+        help=('Share compiled testbenches with other users and CI through a content-addressed store in DIR, keyed '
+              'by the compile fingerprint and simulator release. A compile already published there is linked or '
+              'copied into the VCOMP directory instead of running the simulator compile; successful compiles are '
+              'published. A read-only DIR is only read. Default comes from SIMMER_SHARED_COMPILE_CACHE.'))
     report_toggle_group = flow_control_group.add_mutually_exclusive_group()
     report_toggle_group.add_argument(
         '--report',
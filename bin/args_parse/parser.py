@@ -82,6 +82,24 @@ def reproduction_args(argv):
     return result
 
 
+def _parse_resource_assignments(parser, values, option_name, default_count=None):
+    """Parse repeated NAME=COUNT option values into a dict of positive integers."""
+    assignments = {}
+    for value in values:
+        name, separator, count = value.partition('=')
+        name = name.strip()
+        if not separator and default_count is not None:
+            count = default_count
+        try:
+            count = int(count)
+        except ValueError:
+            count = 0
+        if not name or count < 1:
+            parser.error("{} expects NAME=COUNT with a positive integer COUNT, got '{}'.".format(option_name, value))
+        assignments[name] = count
+    return assignments
+
+
 def create_parser():
     parser = argparse.ArgumentParser(
         prog="simmer",
@@ -120,8 +138,35 @@ def parse_args(argv):
         options.no_bazel = True
     if options.jobs is not None and options.jobs < 1:
         parser.error("--jobs must be a positive integer.")
+    if options.adaptive_jobs is not None:
+        if options.adaptive_jobs < 1:
+            parser.error("--adaptive-jobs must be a positive integer.")
+        if options.batch_system in ("lsf", "slurm"):
+            parser.error("--adaptive-jobs measures this host and cannot be combined with --batch-system lsf/slurm.")
+    if options.batch_submit_args and not options.batch_system:
+        parser.error("--batch-submit-args requires --batch-system.")
+    if options.batch_system and options.gui:
+        parser.error("--batch-system cannot be combined with --gui.")
+    if options.job_array_size is not None:
+        if not options.batch_system:
+            parser.error("--job-array-size requires --batch-system.")
+        if options.job_array_size < 1:
+            parser.error("--job-array-size must be a positive integer.")
+    if options.compile_jobs is not None:
+        if not options.pipeline_compile:
+            parser.error("--compile-jobs requires --pipeline-compile.")
+        if options.compile_jobs < 1:
+            parser.error("--compile-jobs must be a positive integer.")
+    if options.default_test_runtime is not None and options.default_test_runtime < 0:
+        parser.error("--default-test-runtime must be non-negative.")
+    if options.sim_memory_mb is not None and options.sim_memory_mb < 1:
+        parser.error("--sim-memory-mb must be a positive integer.")
+    options.resource_pools = _parse_resource_assignments(parser, options.resource_pool, '--resource-pool')
+    options.sim_licenses = _parse_resource_assignments(parser, options.sim_license, '--sim-license', default_count=1)
     if options.quit_count < 1:
         parser.error("--quit-count must be a positive integer.")
+    if options.fail_fast is not None and options.fail_fast < 1:
+        parser.error("--fail-fast must be a positive integer.")
     if options.uvm_max_quit_count < 0:
         parser.error("--uvm-max-quit-count must be non-negative (0 disables the limit).")
     if options.idle_print_seconds < 1:
@@ -141,6 +186,8 @@ def parse_args(argv):
         parser.error("--status/--st cannot be combined with history query options.")
     if options.status and options.tests:
         parser.error("--status/--st cannot be combined with -t/--tests.")
+    if options.discovery_daemon is not None and (options.tests or options.status or options.history is not None):
+        parser.error("--discovery-daemon cannot be combined with -t/--tests, --status or history query options.")
     if options.timeout < 0:
         parser.error("--timeout must be non-negative (0 disables the timeout).")
     options.simulator_was_explicit = simulator_explicitly_requested(argv)
@@ -5,6 +5,7 @@
 from copy import deepcopy
 import ast
 import datetime
+import functools
 from hashlib import sha1
 import os
 import sys
@@ -13,7 +14,9 @@ import re
 import signal
 import shlex
 import shutil
+import statistics
 import subprocess
+import threading
 import time
 import uuid
 
@@ -29,15 +32,21 @@ dir_path = os.path.dirname(os.path.realpath(__file__))
 from args_parser import parse_args
 import check_test
 from lib.job_lib import Job, JobStatus
+from lib import batch_runner
 from lib import cmn_logging
 from lib import compile_cache
+from lib import content_store
+from lib import fail_fast
 from lib import job_lib
 from lib import regression
+from lib import results_stream
+from lib import run_journal
 from lib import rv_utils
 from lib import seed_plan
 from lib import sim_artifacts
 from lib import simmer_results
 from lib import simmer_state
+from lib import tidy_queue
 from lib.runtime_options import (
     append_uvm_control_options,
     format_log_check_args,
@@ -52,6 +61,10 @@ from lib import regression_report
 
 log = None
 
+# post_run hooks run on several scheduler workers; dynamic test plans must
+# decide and record each follow-up iteration one at a time.
+_SPAWN_LOCK = threading.Lock()
+
 ENV_CAPTURE_KEYS = (
     "HOME",
     "HOSTNAME",
@@ -167,6 +180,29 @@ def replace_symlink(link_path, target_path, cancel_check=None):
         link_lock.release()
 
 
+def tidy_directory(rcfg, path):
+    """Remove a passing job directory, in the background when the run has a tidy queue."""
+    cleanup = getattr(rcfg, "tidy_queue", None)
+    if cleanup is None:
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        cleanup.remove(path)
+
+
+def drain_tidy_queue(rcfg, timeout=None):
+    """Finish background tidy deletions and report the space they reclaimed."""
+    cleanup = getattr(rcfg, "tidy_queue", None)
+    if cleanup is None:
+        return True
+    drained = cleanup.drain(timeout)
+    cleanup.close()
+    if cleanup.directories or cleanup.errors:
+        rcfg.log.info(cleanup.summary())
+    if not drained:
+        rcfg.log.warning("Tidy deletions are still running; the next run in %s will finish them", cleanup.trash_root)
+    return drained
+
+
 def remove_symlink_if_target(link_path, target_path):
     """Remove a shared convenience symlink only when this run still owns it."""
     absolute_link_path = os.path.abspath(link_path)
@@ -240,8 +276,16 @@ def resolve_run_simulator(rcfg, options):
     return resolved_simulator
 
 
-def get_active_job_limit(options, rcfg, simulator):
+def _scheduled_job_count(options, rcfg):
     total_tests = sum(icfg.target for _, (icfgs, _) in rcfg.all_vcomp.items() for icfg in icfgs)
+    if getattr(options, "pipeline_compile", False):
+        # Pipelined compiles take job slots next to the simulations.
+        total_tests += len(rcfg.all_vcomp)
+    return total_tests
+
+
+def get_active_job_limit(options, rcfg, simulator):
+    total_tests = _scheduled_job_count(options, rcfg)
     if total_tests <= 1:
         return 1
 
@@ -250,6 +294,9 @@ def get_active_job_limit(options, rcfg, simulator):
 
     if options.jobs is not None:
         requested_jobs = options.jobs
+    elif getattr(options, "batch_system", None) in ("lsf", "slurm"):
+        # Simulations run on cluster hosts, not within this host's CPU allocation.
+        requested_jobs = total_tests
     else:
         cpu_count, allocation_source = job_lib.detect_allocated_cpus()
         rcfg.log.info("Scheduler CPU allocation: %d (%s)", cpu_count, allocation_source)
@@ -257,6 +304,68 @@ def get_active_job_limit(options, rcfg, simulator):
     return max(1, min(total_tests, requested_jobs))
 
 
+def get_adaptive_job_limits(options, rcfg, active_job_limit):
+    """Return the (minimum, maximum, cpu_count) of --adaptive-jobs, or None when the limit stays fixed.
+
+    The load average is judged against the CPUs allocated to this run, not
+    every CPU of the host.
+    """
+    maximum = getattr(options, "adaptive_jobs", None)
+    if not maximum or options.gui:
+        return None
+    maximum = min(maximum, _scheduled_job_count(options, rcfg))
+    if maximum <= 1:
+        return None
+    cpu_count, _ = job_lib.detect_allocated_cpus()
+    rcfg.log.info("Adaptive job limit: starting at %d, between 1 and %d", min(active_job_limit, maximum), maximum)
+    return 1, maximum, cpu_count
+
+
+def get_resource_pools(options, rcfg):
+    """Return the scheduler resource pools requested for this run."""
+    pools = dict(getattr(options, "resource_pools", None) or {})
+    # Local host pools do not bound simulations submitted to a batch system.
+    local_simulations = not getattr(options, "batch_system", None)
+    if local_simulations and getattr(options, "pipeline_compile",
+                                     False) and options.jobs is None and "cpu" not in pools:
+        pools["cpu"], _ = job_lib.detect_allocated_cpus()
+    if local_simulations and getattr(options, "sim_memory_mb", None) and "memory_mb" not in pools:
+        host_memory_mb = job_lib.detect_host_memory_mb()
+        if host_memory_mb:
+            rcfg.log.info("Scheduler memory pool: %d MiB (host physical memory)", host_memory_mb)
+            pools["memory_mb"] = host_memory_mb
+    for feature in getattr(options, "sim_licenses", None) or {}:
+        if "license:{}".format(feature) not in pools:
+            rcfg.log.warning("--sim-license %s has no matching --resource-pool license:%s=N; it is not limited",
+                             feature, feature)
+    return pools
+
+
+def prioritize_tests_by_history(rcfg, options, active_job_limit):
+    """Launch the longest expected simulations first and log the predicted makespan.
+
+    Expected durations come from earlier runs of the same test target. Unknown
+    targets use --default-test-runtime, or the median of the known targets.
+    """
+    tests = [test for _, (_, tests) in rcfg.all_vcomp.items() for test in tests]
+    if not tests:
+        return
+    history = simmer_results.load_test_durations(rcfg.proj_dir)
+    known = [history[test.target] for test in tests if test.target in history]
+    fallback_s = options.default_test_runtime
+    if fallback_s is None:
+        fallback_s = statistics.median(known) if known else 0
+    for test in tests:
+        test.expected_duration_s = history.get(test.target, fallback_s)
+        # Only a test's own history says how fast it ran; the fallback does not.
+        test.duration_from_history = test.target in history
+        test.increase_priority(-int(test.expected_duration_s))
+    if known or options.default_test_runtime is not None:
+        makespan_s = simmer_results.predict_makespan([test.expected_duration_s for test in tests], active_job_limit)
+        rcfg.log.info("Predicted simulation makespan: %s for %d tests on %d job slots (%d with runtime history)",
+                      datetime.timedelta(seconds=int(makespan_s)), len(tests), active_job_limit, len(known))
+
+
 def describe_vcs_compile_reuse_miss(miss_reason):
     """Return a user-facing explanation for a non-reusable VCS build.
 
@@ -311,6 +420,9 @@ class VCompJob(Job):
         self.main_cmdline = None
         self.cov_work_dir = None
         self.compile_cache_hit = False
+        self.shared_compile_key = None
+        self.digest_index = None
+        self.compile_inputs_manifest = None
         self._compile_lock = None
         self._shared_runtime_locks = {}
 
@@ -359,6 +471,69 @@ class VCompJob(Job):
             log.debug("Released shared runtime directory lock %s", runtime_lock.path)
             del self._shared_runtime_locks[runtime_path]
 
+    def _save_digest_index(self, prune=False):
+        digests = getattr(self, "digest_index", None)
+        if digests is None:
+            return
+        try:
+            digests.save(prune=prune)
+        except OSError as exc:
+            log.debug("Could not save compile input digests for %s: %s", self, exc)
+        log.debug("%s hashed %d compile input(s) and reused %d recorded digest(s)", self, digests.hashed,
+                  digests.reused)
+
+    def _explain_recompile(self):
+        """Log which inputs changed since the last compile when --explain-recompile is given."""
+        inputs_manifest = getattr(self, "compile_inputs_manifest", None)
+        if inputs_manifest is None:
+            return
+        changes = compile_cache.explain_compile_changes(self.job_dir, self.compile_fingerprint, inputs_manifest)
+        if not changes:
+            return
+        log.info("%s must recompile:", self)
+        for change in changes:
+            log.info("  %s", change)
+
+    def _write_compile_inputs_manifest(self):
+        inputs_manifest = getattr(self, "compile_inputs_manifest", None)
+        if inputs_manifest is not None:
+            compile_cache.write_compile_inputs_manifest(self.job_dir, inputs_manifest)
+
+    def _shared_compile_store(self):
+        shared_dir = getattr(self.rcfg.options, "shared_compile_cache", None)
+        return content_store.ContentStore(shared_dir) if shared_dir else None
+
+    def _materialize_shared_compile(self):
+        """Reuse another workspace's compile from the shared compile cache; return whether it was reused."""
+        store = self._shared_compile_store()
+        if store is None or self.shared_compile_key is None:
+            return False
+        try:
+            if compile_cache.materialize_shared_compile(store, self.shared_compile_key, self.job_dir) is None:
+                return False
+            self.simulator.validate_reusable_compile_artifacts(self)
+            compile_cache.write_compile_fingerprint(self.job_dir, self.compile_fingerprint)
+            self._write_compile_inputs_manifest()
+        except (OSError, RuntimeError) as exc:
+            log.warning("Could not reuse shared compile %s for %s: %s", self.shared_compile_key[:12], self, exc)
+            compile_cache.discard_shared_compile(self.job_dir)
+            return False
+        log.info("Reusing shared compile %s for %s", self.shared_compile_key[:12], self)
+        return True
+
+    def _publish_shared_compile(self):
+        store = self._shared_compile_store()
+        if store is None or self.shared_compile_key is None:
+            return
+        artifacts = self.simulator.get_shared_compile_artifacts(self)
+        if not artifacts:
+            return
+        try:
+            if store.publish_tree(compile_cache.SHARED_COMPILE_KIND, self.shared_compile_key, self.job_dir, artifacts):
+                log.info("Published %s to the shared compile cache as %s", self, self.shared_compile_key[:12])
+        except OSError as exc:
+            log.warning("Could not publish %s to the shared compile cache: %s", self, exc)
+
     def resolve_bazel_runfiles_main(self):
         """Return the stable Bazel runfiles root without requiring it to exist yet."""
         existing = getattr(self, "bazel_runfiles_main", None)
@@ -375,6 +550,8 @@ class VCompJob(Job):
         super(VCompJob, self).pre_run()
 
         options = self.rcfg.options
+        self.digest_index = compile_cache.compile_digest_index(self.job_dir, force=bool(options.recompile))
+        self.compile_inputs_manifest = {} if getattr(options, "explain_recompile", False) else None
         if options.compile_args_file and not os.path.isabs(options.compile_args_file):
             options.compile_args_file = os.path.abspath(os.path.join(self.rcfg.proj_dir, options.compile_args_file))
         relpath, bazel_target = self.bazel_vcomp_target.split(':')
@@ -473,15 +650,35 @@ class VCompJob(Job):
                 self.bazel_runfiles_main,
                 self.tb_options["compile_inputs_digest"],
             ) if self.tb_options["compile_inputs_digest"] else None,
+            digests=self.digest_index,
+            inputs_manifest=self.compile_inputs_manifest,
             **fingerprint_inputs,
         )
+        self._save_digest_index(prune=True)
         self.simulator.validate_compile_cache_context(self)
+        if self._shared_compile_store() is not None and self.simulator.get_shared_compile_artifacts(self) is not None:
+            self.shared_compile_key = compile_cache.shared_compile_key(
+                self.compile_fingerprint,
+                fingerprint_script,
+                {
+                    "VCOMP_DIR": self.job_dir,
+                    "PROJ_DIR": self.rcfg.proj_dir
+                },
+                {
+                    "simulator": self.simulator.get_name(),
+                    "tool_identity": self.simulator.get_tool_identity(),
+                },
+            )
 
         log.debug("bazel_runfiles_main: %s", self.bazel_runfiles_main)
 
         if self.rcfg.options.no_compile:
             self.simulator.validate_reusable_compile_artifacts(self)
-            compile_cache.validate_compile_fingerprint(self.job_dir, self.compile_fingerprint)
+            try:
+                compile_cache.validate_compile_fingerprint(self.job_dir, self.compile_fingerprint)
+            except RuntimeError:
+                self._explain_recompile()
+                raise
             self.main_cmdline = "echo \"Bypassing {} due to --no-compile\"".format(self)
         elif self.simulator.should_auto_reuse_compile():
             self.compile_cache_hit, miss_reason = compile_cache.can_reuse_compile(
@@ -489,7 +686,12 @@ class VCompJob(Job):
                 self.compile_fingerprint,
                 lambda: self.simulator.validate_reusable_compile_artifacts(self),
             )
-            if not self.compile_cache_hit:
+            if self.compile_cache_hit:
+                self.main_cmdline = "echo \"Bypassing {} due to VCS compile cache hit\"".format(self)
+            elif self._materialize_shared_compile():
+                self.compile_cache_hit = True
+                self.main_cmdline = "echo \"Bypassing {} due to shared compile cache hit\"".format(self)
+            else:
                 log.info(
                     "%s; invoking incremental VCS compile for %s",
                     describe_vcs_compile_reuse_miss(miss_reason),
@@ -497,13 +699,16 @@ class VCompJob(Job):
                 )
                 log.debug("VCS compile reuse unavailable for %s: %s", self, miss_reason)
                 self.main_cmdline = shlex.join(["bash", vcomp_sh_path])
-            else:
-                self.main_cmdline = "echo \"Bypassing {} due to VCS compile cache hit\"".format(self)
+        elif self._materialize_shared_compile():
+            self.compile_cache_hit = True
+            self.main_cmdline = "echo \"Bypassing {} due to shared compile cache hit\"".format(self)
         else:
             self.main_cmdline = shlex.join(["bash", vcomp_sh_path])
 
         if not self.rcfg.options.no_compile and not self.compile_cache_hit:
+            self._explain_recompile()
             compile_cache.invalidate_compile_fingerprint(self.job_dir)
+            compile_cache.discard_shared_compile(self.job_dir)
 
         self.simulator.prepare_compile_execution(
             self,
@@ -630,8 +835,10 @@ class VCompJob(Job):
             if self.jobstatus == JobStatus.PASSED:
                 try:
                     compile_cache.write_compile_fingerprint(self.job_dir, self.compile_fingerprint)
+                    self._write_compile_inputs_manifest()
                 except OSError as exc:
                     log.warning("Could not write compile fingerprint for %s: %s", self, exc)
+                self._publish_shared_compile()
 
         self.compile_metrics = self.simulator.collect_compile_metrics(self)
 
@@ -666,6 +873,14 @@ class VCompJob(Job):
     def cancel(self):
         self._release_compile_lock()
 
+    @property
+    def execution_mode(self):
+        return "compile" if getattr(self.rcfg.options, "pipeline_compile", False) else "exclusive"
+
+    @property
+    def resources(self):
+        return {"cpu": self.simulator.get_compile_threads()}
+
     def __repr__(self):
         sim_name = self.simulator.get_name() if hasattr(self, 'simulator') else '???'
         return 'Vcomp("{}@{}" -> {})'.format(self.bazel_vcomp_target, sim_name, self.name) # Add simulator info
@@ -679,6 +894,10 @@ class TestJob(Job):
     def execution_mode(self):
         return "parallel"
 
+    @property
+    def resources(self):
+        return self.simulator.get_test_resources(self)
+
     def __init__(self,
                  rcfg,
                  target,
@@ -1088,15 +1307,23 @@ class TestJob(Job):
             waves_script=run_wave_script_path,
             waves_path=abs_wave_path,
         )
+        results_stream.append_test(getattr(self.rcfg, "results_stream", None), self)
 
         if self.rcfg.tidy and self.jobstatus.successful:
             log.debug("tidy=%s removing %s", self.rcfg.tidy, self.job_dir)
-            shutil.rmtree(self.job_dir, ignore_errors=True)
+            tidy_directory(self.rcfg, self.job_dir)
             last_sim_link_target = os.path.relpath(self.job_dir, start=os.getcwd())
             remove_symlink_if_target(".last_sim", last_sim_link_target)
 
-        if self.simulator.should_spawn_test_job(self):
-            self.job_lib.manager.add_job(self.clone())
+        fail_fast_policy = getattr(self.rcfg, "fail_fast", None)
+        if fail_fast_policy is not None:
+            fail_fast_policy.record(self, self.job_lib.manager)
+        with _SPAWN_LOCK:
+            if self.simulator.should_spawn_test_job(self):
+                if fail_fast_policy is not None and fail_fast_policy.test_cancelled(self.icfg):
+                    self.log.info("Fail-fast: not spawning further iterations of %s", self.name)
+                else:
+                    self.job_lib.manager.add_job(self.clone())
         self._release_run_directory_lock()
 
     def launch_failed(self, exc):
@@ -1105,6 +1332,7 @@ class TestJob(Job):
             self.error_message = str(exc)
             self.simulation_duration_s = None
             simmer_results.record_test_job(getattr(self.rcfg, "simmer_results_run", None), self)
+            results_stream.append_test(getattr(self.rcfg, "results_stream", None), self)
         finally:
             self._release_run_directory_lock()
 
@@ -1113,6 +1341,7 @@ class TestJob(Job):
             super().post_run_failed(exc)
             self.simulation_duration_s = None
             simmer_results.record_test_job(getattr(self.rcfg, "simmer_results_run", None), self)
+            results_stream.append_test(getattr(self.rcfg, "results_stream", None), self)
         finally:
             self._release_run_directory_lock()
 
@@ -1120,6 +1349,7 @@ class TestJob(Job):
         super().incomplete_shutdown(message)
         self.simulation_duration_s = None
         simmer_results.record_test_job(getattr(self.rcfg, "simmer_results_run", None), self)
+        results_stream.append_test(getattr(self.rcfg, "results_stream", None), self)
 
     def cancel(self):
         self._release_run_directory_lock()
@@ -1172,6 +1402,160 @@ class TestJob(Job):
             return "<incomplete>"
 
 
+class TestArrayJob(Job):
+    """Iterations of one test submitted together as a single batch job array.
+
+    Members are ordinary TestJobs that each claim their own run directory and
+    render their own sim.sh and rerun.sh, so every iteration stays reproducible
+    on its own. The array owns the launcher script and the batch system logs,
+    and replaces one submission and queue entry per iteration with one per array.
+    """
+
+    @property
+    def execution_mode(self):
+        return "parallel"
+
+    @property
+    def resources(self):
+        return self._resources
+
+    def __init__(self, rcfg, members):
+        first = members[0]
+        super(TestArrayJob, self).__init__(rcfg, first.name)
+        self.array_members = list(members)
+        self.vcomper = first.vcomper
+        self.simulator = first.simulator
+        self.priority = min(member.priority for member in members)
+        # Members already raised their dependencies' priority when they were created.
+        for member in members:
+            for dep in member._dependencies:
+                if dep not in self._dependencies:
+                    self._dependencies.append(dep)
+                    dep._children.append(self)
+        self._resources = {}
+        for member in members:
+            for resource, amount in member.resources.items():
+                self._resources[resource] = self._resources.get(resource, 0) + amount
+        self._launch_failures = []
+
+    def __repr__(self):
+        try:
+            return "{} [array {}-{}]".format(self.array_members[0], self.array_members[0].iteration,
+                                             self.array_members[-1].iteration)
+        except (AttributeError, IndexError):
+            return "<TestArrayJob {}>".format(self.name)
+
+    def request_cancel(self):
+        super(TestArrayJob, self).request_cancel()
+        for member in self.array_members:
+            member.request_cancel()
+
+    def pre_run(self):
+        array_dir = os.path.join(self.rcfg.regression_dir, ".job_arrays")
+        os.makedirs(array_dir, exist_ok=True)
+        self.job_dir = os.path.join(
+            array_dir, "{}__{}__{}-{}__p{}".format(
+                self.vcomper.name.split(":")[-1], self.name, self.array_members[0].iteration,
+                self.array_members[-1].iteration, os.getpid()))
+        super(TestArrayJob, self).pre_run()
+
+        prepared = []
+        for member in self.array_members:
+            self.raise_if_cancelled()
+            try:
+                member.pre_run()
+            except job_lib.JobCancelledError:
+                raise
+            except (Exception, SystemExit) as exc:
+                # Fail this iteration the way the scheduler fails a single test.
+                self.log.error("%s launch_failed(): %s", member, exc)
+                member.job_stop_time = datetime.datetime.now()
+                member.jobstatus = JobStatus.FAILED
+                try:
+                    member.launch_failed(exc)
+                except (Exception, SystemExit) as record_exc:
+                    self.log.error("Could not record launch failure for %s: %s", member, record_exc)
+                self._launch_failures.append(member)
+                continue
+            prepared.append(member)
+        if not prepared:
+            raise RuntimeError("No iteration of {} could be prepared".format(self))
+        self.array_members = prepared
+
+    def _finalize_member(self, member):
+        try:
+            member.post_run()
+        except (Exception, SystemExit) as exc:
+            self.log.error("%s post_run_failed():\n%s", member, exc)
+            member.job_stop_time = datetime.datetime.now()
+            member.jobstatus = JobStatus.FAILED
+            try:
+                member.post_run_failed(exc)
+            except (Exception, SystemExit) as record_exc:
+                self.log.error("%s failed to record post_run failure:\n%s", member, record_exc)
+
+    def post_run(self):
+        super(TestArrayJob, self).post_run()
+        for member in self.array_members:
+            self._finalize_member(member)
+        members = self.array_members + self._launch_failures
+        if all(member.jobstatus.successful for member in members):
+            self.jobstatus = JobStatus.PASSED
+        else:
+            self.jobstatus = JobStatus.FAILED
+        if self.rcfg.tidy and self.jobstatus.successful:
+            tidy_directory(self.rcfg, self.job_dir)
+
+    def launch_failed(self, exc):
+        super(TestArrayJob, self).launch_failed(exc)
+        for member in self.array_members:
+            if member.jobstatus.completed:
+                continue
+            member.job_stop_time = datetime.datetime.now()
+            member.jobstatus = JobStatus.FAILED
+            member.launch_failed(exc)
+
+    def post_run_failed(self, exc):
+        super(TestArrayJob, self).post_run_failed(exc)
+        for member in self.array_members:
+            if not member.jobstatus.completed:
+                member.job_stop_time = datetime.datetime.now()
+                member.jobstatus = JobStatus.FAILED
+                member.post_run_failed(exc)
+
+    def incomplete_shutdown(self, message):
+        super(TestArrayJob, self).incomplete_shutdown(message)
+        for member in self.array_members:
+            runner = member.job_lib
+            if runner is None or not runner.done or runner.shutdown_incomplete:
+                member.incomplete_shutdown(message)
+            else:
+                self._finalize_member(member)
+
+    def cancel(self):
+        for member in self.array_members:
+            member.cancel()
+
+
+def group_test_arrays(tests, array_size):
+    """Return the jobs that run tests, joining iterations of one test into job arrays.
+
+    Iterations of the same test are grouped in order into arrays of at most
+    array_size members. A group with a single member stays a plain TestJob.
+    """
+    if not array_size or array_size < 2:
+        return list(tests)
+    iterations_by_test = {}
+    for test in tests:
+        iterations_by_test.setdefault(id(test.icfg), []).append(test)
+    jobs = []
+    for iterations in iterations_by_test.values():
+        for start in range(0, len(iterations), array_size):
+            members = iterations[start:start + array_size]
+            jobs.append(members[0] if len(members) == 1 else TestArrayJob(members[0].rcfg, members))
+    return jobs
+
+
 def resolve_report_root(rcfg, options):
     configured_root = options.report_dir
     if configured_root:
@@ -1308,6 +1692,8 @@ def _active_run_snapshot(rcfg, vcomp_jobs, jm, total_tests, regression_log_path)
     """Build a compact run-level snapshot without exposing multi-test details."""
     scheduler = jm.status_snapshot()
     active_jobs = set(scheduler["launching"] + scheduler["active"] + scheduler["finalizing"])
+    active_jobs.update(member for job in tuple(active_jobs) if isinstance(job, TestArrayJob)
+                       for member in job.array_members)
     test_jobs = [job for icfgs, _ in rcfg.all_vcomp.values() for icfg in icfgs for job in icfg.jobs]
     finished_tests = sum(1 for job in test_jobs if job.jobstatus.completed)
     active_tests = sum(1 for job in test_jobs if job in active_jobs)
@@ -1377,6 +1763,7 @@ def main(rcfg, options, active_run=None):
         planned_seeds = seed_plan.plan_test_seeds(rcfg.all_vcomp, options.python_seed)
     if options.python_seed is not None:
         log.info("Set python random seed to %s", options.python_seed)
+    resume_passed, resume_seeds = load_resume_plan(rcfg, options, dynamic_test_plan)
 
     for vcomp, test_list in rcfg.all_vcomp.items():
         vcomper = VCompJob(rcfg, vcomp, simulator)
@@ -1402,8 +1789,11 @@ def main(rcfg, options, active_run=None):
             planned_iterations = [None] if dynamic_test_plan else range(1, iterations + 1)
             for iteration in planned_iterations:
                 planned_seed = None
+                journal_key = None
+                if not dynamic_test_plan:
+                    journal_key = run_journal.job_key(vcomp, test, iteration)
                 if not dynamic_test_plan and options.seed is None:
-                    planned_seed = planned_seeds[(vcomp, test, iteration)]
+                    planned_seed = resume_seeds.get(journal_key, planned_seeds[(vcomp, test, iteration)])
                 t = TestJob(rcfg,
                             test,
                             vcomper=vcomper,
@@ -1412,6 +1802,10 @@ def main(rcfg, options, active_run=None):
                             simulator=simulator,
                             iteration=iteration,
                             planned_seed=planned_seed)
+                t.journal_key = journal_key
+                if journal_key in resume_passed:
+                    # Passed before the run was interrupted; report it without running it again.
+                    t.jobstatus = JobStatus.BYPASSED
                 tests.append(t)
                 t.add_dependency(btcj)
 
@@ -1436,6 +1830,8 @@ def main(rcfg, options, active_run=None):
     regression_log_path = None
     if total_tests > 1 and not options.no_run:
         regression_log_path = rv_utils.prepare_regression_log(rcfg)
+        rcfg.results_stream = results_stream.ResultsStream(results_stream.stream_path(regression_log_path))
+        rcfg.log.info("Streaming test results to %s", rcfg.results_stream.path)
     if active_run is not None:
         active_run.update(
             regression_dir=rcfg.regression_dir,
@@ -1456,14 +1852,41 @@ def main(rcfg, options, active_run=None):
             total_tests,
             run_context=active_run.history_context() if active_run is not None else None,
         )
+        if not dynamic_test_plan and rcfg.simmer_results_run.get("run_id"):
+            rcfg.run_journal = open_run_journal(rcfg, options, rcfg.simmer_results_run["run_id"])
+        for vcomp, (icfgs, tests) in rcfg.all_vcomp.items():
+            for test in tests:
+                if test.jobstatus == JobStatus.BYPASSED:
+                    results_stream.append_test(getattr(rcfg, "results_stream", None), test)
 
     try:
+        active_job_limit = get_active_job_limit(options, rcfg, simulator)
         jm_opts = {
             'idle_print_seconds': options.idle_print_seconds,
             'quit_count': options.quit_count,
-            'active_job_limit': get_active_job_limit(options, rcfg, simulator),
+            'active_job_limit': active_job_limit,
+            'resource_pools': get_resource_pools(options, rcfg),
+            'compile_job_limit': getattr(options, "compile_jobs", None),
+            'adaptive_job_limits': get_adaptive_job_limits(options, rcfg, active_job_limit),
         }
+        if getattr(options, "fail_fast", None):
+            rcfg.fail_fast = fail_fast.FailFastPolicy(options.fail_fast, log)
+        if getattr(rcfg, "tidy", False):
+            rcfg.tidy_queue = tidy_queue.TidyQueue(os.path.join(rcfg.regression_dir, tidy_queue.TRASH_DIR_NAME),
+                                                   log=log)
         jm = job_lib.JobManager(jm_opts, log)
+        jm.journal = getattr(rcfg, "run_journal", None)
+        if getattr(options, "batch_system", None):
+            scheduler = batch_runner.create_scheduler(options.batch_system, shlex.split(options.batch_submit_args))
+            jm.parallel_job_lib_type = functools.partial(batch_runner.create_runner, scheduler=scheduler)
+            log.info("Submitting simulations through %s", scheduler.NAME)
+        job_array_size = getattr(options, "job_array_size", None)
+        if job_array_size and dynamic_test_plan:
+            log.warning("--job-array-size is ignored: %s plans test iterations while they run",
+                        simulator.get_name().upper())
+            job_array_size = None
+        if not options.no_run:
+            prioritize_tests_by_history(rcfg, options, active_job_limit)
         simulator.prepare_regression_runtime(vcomp_jobs)
 
         for job in btbj_jobs:
@@ -1502,11 +1925,13 @@ def main(rcfg, options, active_run=None):
 
             [setattr(t, 'suppress_output', suppress_via_tests or suppress_via_vcomp_jobs) for t in tests]
 
-            for test in tests:
-                if options.no_run:
+            if options.no_run:
+                for test in tests:
                     test.jobstatus = JobStatus.TO_BE_BYPASSED
-                elif not dynamic_test_plan:
-                    jm.add_job(test)
+            elif not dynamic_test_plan:
+                pending_tests = [test for test in tests if test.jobstatus != JobStatus.BYPASSED]
+                for job in group_test_arrays(pending_tests, job_array_size):
+                    jm.add_job(job)
 
         if active_run is not None:
             active_run.start_watching(
@@ -1518,6 +1943,7 @@ def main(rcfg, options, active_run=None):
             final_state["status"] = "FINALIZING"
             active_run.update(**final_state)
         jm.stop()
+        drain_tidy_queue(rcfg)
         if options.no_run:
             rcfg.log.info("run_test:main(): --no_run option selected, exiting")
 
@@ -1542,6 +1968,7 @@ def main(rcfg, options, active_run=None):
                 cleanup_shared_runtime=shutdown_complete,
                 shared_runtime_cleanup=shared_runtime_cleanup,
             )
+            close_run_files(rcfg)
         log.error("Exiting due to keyboard interrupt")
         raise SystemExit(130)
 
@@ -1641,6 +2068,7 @@ def main(rcfg, options, active_run=None):
                                          or bool(rcfg.log.warn_count or rcfg.log.error_count)),
             )
             persist_simmer_results(rcfg)
+        close_run_files(rcfg)
 
     if workflow_finalize_failed or coverage_merge_failed:
         log.info("Exiting with status 1 due to backend finalization or coverage merge failure.")
@@ -1653,6 +2081,78 @@ def main(rcfg, options, active_run=None):
         sys.exit(0)
 
 
+def load_resume_plan(rcfg, options, dynamic_test_plan):
+    """Return (passed journal keys, {journal key: seed}) for --resume, or empty ones for a new run."""
+    run_id = getattr(options, "resume", None)
+    if not run_id:
+        return set(), {}
+    if dynamic_test_plan:
+        rcfg.log.critical("--resume is not supported when the simulator plans test iterations while they run")
+        sys.exit(1)
+    path = run_journal.journal_path(rcfg.proj_dir, run_id)
+    try:
+        header, states = run_journal.load(path)
+    except (OSError, ValueError) as exc:
+        rcfg.log.critical("Cannot resume run %s: %s", run_id, exc)
+        sys.exit(1)
+    passed, seeds = run_journal.resume_plan(header, states)
+    rcfg.log.info("Resuming run %s: %d planned iteration(s) already passed and will not run again", run_id, len(passed))
+    return passed, seeds
+
+
+def open_run_journal(rcfg, options, run_id):
+    """Open the scheduler journal for this run, or the resumed run's journal."""
+    run_id = getattr(options, "resume", None) or run_id
+    path = run_journal.journal_path(rcfg.proj_dir, run_id)
+    seeds = {
+        test.journal_key: test.planned_seed
+        for icfgs, tests in rcfg.all_vcomp.values()
+        for test in tests if getattr(test, "journal_key", None) is not None and test.planned_seed is not None
+    }
+    try:
+        journal = run_journal.RunJournal(path,
+                                         run_id=run_id,
+                                         argv=getattr(options, "simmer_argv", sys.argv),
+                                         seeds=seeds)
+    except OSError as exc:
+        rcfg.log.warning("Could not open scheduler journal %s: %s; this run cannot be resumed", path, exc)
+        return None
+    rcfg.log.info("Scheduler journal: %s (resume with --resume %s)", path, run_id)
+    return journal
+
+
+def resolve_resume_options(options, argv=None):
+    """Replace --resume RUN_ID options with the journaled run's own command line.
+
+    argv is the command line that requested the resume; it may not carry any
+    other option, since those would silently be replaced.
+    """
+    if not getattr(options, "resume", None):
+        return options
+    if argv is not None:
+        extra = [
+            argument for argument in argv if argument not in ("--resume", options.resume, "--resume=" + options.resume)
+        ]
+        if extra:
+            sys.exit("simmer: --resume reruns the journaled command line; remove {}".format(shlex.join(extra)))
+    path = run_journal.journal_path(options.proj_dir, options.resume)
+    try:
+        header, _ = run_journal.load(path)
+    except (OSError, ValueError) as exc:
+        sys.exit("simmer: cannot resume run {}: {}".format(options.resume, exc))
+    resumed = parse_args(header["argv"][1:])
+    resumed.resume = options.resume
+    return resumed
+
+
+def close_run_files(rcfg):
+    """Close the files this run appends to as jobs finish."""
+    for name in ("results_stream", "run_journal"):
+        run_file = getattr(rcfg, name, None)
+        if run_file is not None:
+            run_file.close()
+
+
 def persist_simmer_results(rcfg, fatal=True):
     """Persist local history; inability to do so is a command failure."""
     if not simmer_results.should_save_run(rcfg.simmer_results_run):
@@ -1675,6 +2175,7 @@ def finalize_interrupted_run(rcfg,
                              cleanup_shared_runtime=True,
                              shared_runtime_cleanup=None):
     """Clean backend state and persist a failed result record after Ctrl-C."""
+    drain_tidy_queue(rcfg, timeout=job_lib.JobManager.SHUTDOWN_JOIN_SECONDS)
     if cleanup_shared_runtime:
         try:
             if shared_runtime_cleanup is None:
@@ -1693,6 +2194,10 @@ def finalize_interrupted_run(rcfg,
         for job in jm.interrupted_jobs:
             if isinstance(job, TestJob) and job.job_start_time is not None:
                 simmer_results.record_test_job(run, job, status="INTERRUPTED", simulation_started=True)
+            elif isinstance(job, TestArrayJob):
+                for member in job.array_members:
+                    if member.job_start_time is not None and not member.jobstatus.completed:
+                        simmer_results.record_test_job(run, member, status="INTERRUPTED", simulation_started=True)
             elif isinstance(job, VCompJob):
                 simmer_results.record_compile_job(run, job, status="INTERRUPTED")
     simmer_results.finalize_run(
@@ -1718,6 +2223,11 @@ if __name__ == '__main__':
             failed_only=options.history_fail,
         )
         sys.exit(0)
+    if options.discovery_daemon is not None:
+        verbosity = cmn_logging.DEBUG if options.tool_debug else cmn_logging.INFO
+        log = cmn_logging.build_logger("sim", level=verbosity, use_color=options.use_color)
+        sys.exit(regression.run_discovery_daemon_command(options.proj_dir, options.discovery_daemon, log))
+    options = resolve_resume_options(options, sys.argv[1:])
     options.simmer_argv = sys.argv[:]
     verbosity = cmn_logging.DEBUG if options.tool_debug else cmn_logging.INFO
     log = cmn_logging.build_logger("sim", level=verbosity, use_color=options.use_color, filehandler="simmer.log")
@@ -0,0 +1,847 @@
+#!/usr/bin/env python
+"""Run scheduler jobs through a batch system (LSF, Slurm) instead of local subprocesses."""
+
+import abc
+import datetime
+import os
+import re
+import shlex
+import signal
+import subprocess
+import threading
+import time
+
+from lib.job_lib import JobRunner, SubprocessJobRunner
+
+BATCH_SCRIPT_FILENAME = "batch_job.sh"
+BATCH_EXIT_FILENAME = "batch_job.exit"
+BATCH_ARRAY_SCRIPT_FILENAME = "batch_array.sh"
+
+# Normalized batch job states
+PENDING = "PENDING"
+RUNNING = "RUNNING"
+SUSPENDED = "SUSPENDED"
+DONE = "DONE"
+EXIT = "EXIT"
+FINISHED_STATES = (DONE, EXIT)
+
+
+def _run_command(argv):
+    return subprocess.run(argv,
+                          capture_output=True,
+                          text=True,
+                          timeout=CommandScheduler.COMMAND_TIMEOUT_SECONDS,
+                          check=False)
+
+
+def _job_name(job):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", str(job.name)) or "simmer"
+
+
+class BatchScheduler(abc.ABC):
+    """Track batch jobs, with one shared state query per interval.
+
+    Runners call state() on every poll; the scheduler answers from a cache that
+    is refreshed by a single query covering every outstanding job, so the batch
+    system sees one bjobs/squeue call per interval instead of one per job.
+    """
+    NAME = None
+    QUERY_INTERVAL_SECONDS = 10.0
+
+    def __init__(self, submit_args=()):
+        self.submit_args = list(submit_args)
+        self._lock = threading.Lock()
+        self._outstanding = set()
+        self._states = {}
+        self._queried_at = None
+
+    @abc.abstractmethod
+    def submit(self, script_path, name, stdout_path, stderr_path, cwd, resources):
+        """Submit script_path and return the batch job ID."""
+        pass
+
+    @abc.abstractmethod
+    def submit_array(self, script_path, name, stdout_path, stderr_path, cwd, resources, count):
+        """Submit script_path as a job array of count elements.
+
+        Every element runs the same script with its 1-based index in the batch
+        system's array index variable and claims resources on its own. Returns
+        the array ID and the element IDs in index order.
+        """
+        pass
+
+    @abc.abstractmethod
+    def kill(self, job_id):
+        pass
+
+    @abc.abstractmethod
+    def suspend(self, job_id):
+        pass
+
+    @abc.abstractmethod
+    def resume(self, job_id):
+        pass
+
+    @abc.abstractmethod
+    def _query(self, job_ids):
+        """Return {job_id: normalized state} for the job_ids the batch system knows.
+
+        Raises OSError or subprocess.SubprocessError when the batch system
+        cannot be asked.
+        """
+        pass
+
+    def _track(self, job_ids):
+        """Include newly submitted jobs in state queries.
+
+        Until the next query lists them they count as pending, not as unknown
+        to the batch system, whatever an older cached answer says.
+        """
+        with self._lock:
+            for job_id in job_ids:
+                self._outstanding.add(job_id)
+                self._states[job_id] = PENDING
+
+    def state(self, job_id, max_age=None):
+        """Return the normalized state of job_id, or None when the batch system does not know it."""
+        max_age = self.QUERY_INTERVAL_SECONDS if max_age is None else max_age
+        with self._lock:
+            now = time.monotonic()
+            if self._queried_at is None or now - self._queried_at >= max_age:
+                self._queried_at = now
+                try:
+                    self._states = self._query(sorted(self._outstanding))
+                except (OSError, subprocess.SubprocessError):
+                    pass # Keep the last known states; the next interval retries.
+            return self._states.get(job_id)
+
+    def forget(self, job_id):
+        """Stop including a finished job in state queries."""
+        with self._lock:
+            self._outstanding.discard(job_id)
+            self._states.pop(job_id, None)
+
+
+class CommandScheduler(BatchScheduler):
+    """Batch system driven through its submit, query and control commands."""
+    COMMAND_TIMEOUT_SECONDS = 60
+
+    def __init__(self, submit_args=(), run_command=None):
+        super(CommandScheduler, self).__init__(submit_args)
+        self._run_command = run_command or _run_command
+
+    def submit(self, script_path, name, stdout_path, stderr_path, cwd, resources):
+        argv = self._submit_argv(script_path, name, stdout_path, stderr_path, cwd, resources or {})
+        result = self._run_command(argv)
+        job_id = self._parse_job_id(result.stdout) if result.returncode == 0 else None
+        if job_id is None:
+            raise RuntimeError("{} submission failed (exit {}): {}".format(self.NAME, result.returncode,
+                                                                           (result.stderr or result.stdout).strip()))
+        self._track([job_id])
+        return job_id
+
+    def submit_array(self, script_path, name, stdout_path, stderr_path, cwd, resources, count):
+        argv = self._submit_array_argv(script_path, name, stdout_path, stderr_path, cwd, resources or {}, count)
+        result = self._run_command(argv)
+        array_id = self._parse_job_id(result.stdout) if result.returncode == 0 else None
+        if array_id is None:
+            raise RuntimeError("{} array submission failed (exit {}): {}".format(self.NAME, result.returncode,
+                                                                                 (result.stderr
+                                                                                  or result.stdout).strip()))
+        element_ids = [self._element_id(array_id, index) for index in range(1, count + 1)]
+        self._track(element_ids)
+        return array_id, element_ids
+
+    def kill(self, job_id):
+        self._control(self._kill_argv(job_id))
+
+    def suspend(self, job_id):
+        self._control(self._suspend_argv(job_id))
+
+    def resume(self, job_id):
+        self._control(self._resume_argv(job_id))
+
+    def _control(self, argv):
+        result = self._run_command(argv)
+        if result.returncode != 0:
+            raise RuntimeError("{} failed (exit {}): {}".format(shlex.join(argv), result.returncode,
+                                                                (result.stderr or result.stdout).strip()))
+
+    def _query(self, job_ids):
+        if not job_ids:
+            return {}
+        # Arrays are queried by their array ID, which lists every element.
+        requested = set(job_ids)
+        argv = self._query_argv(sorted({self._base_id(job_id) for job_id in job_ids}))
+        result = self._run_command(argv)
+        if result.returncode != 0:
+            # An unreachable mbatchd/slurmctld prints nothing; that must not read as every job being gone.
+            raise subprocess.CalledProcessError(result.returncode, argv, result.stdout, result.stderr)
+        states = {}
+        for line in result.stdout.splitlines():
+            job_id, state = self._parse_state_line(line.split())
+            if job_id in requested:
+                states[job_id] = self._normalize_state(state)
+        return states
+
+    def _parse_state_line(self, fields):
+        if len(fields) < 2:
+            return None, None
+        return fields[0], fields[1]
+
+    def _base_id(self, job_id):
+        return job_id
+
+    @abc.abstractmethod
+    def _submit_argv(self, script_path, name, stdout_path, stderr_path, cwd, resources):
+        pass
+
+    @abc.abstractmethod
+    def _submit_array_argv(self, script_path, name, stdout_path, stderr_path, cwd, resources, count):
+        pass
+
+    @abc.abstractmethod
+    def _element_id(self, array_id, index):
+        pass
+
+    @abc.abstractmethod
+    def _parse_job_id(self, output):
+        pass
+
+    @abc.abstractmethod
+    def _query_argv(self, job_ids):
+        pass
+
+    @abc.abstractmethod
+    def _normalize_state(self, state):
+        pass
+
+    @abc.abstractmethod
+    def _kill_argv(self, job_id):
+        pass
+
+    @abc.abstractmethod
+    def _suspend_argv(self, job_id):
+        pass
+
+    @abc.abstractmethod
+    def _resume_argv(self, job_id):
+        pass
+
+
+class LsfScheduler(CommandScheduler):
+    NAME = "LSF"
+    STATES = {
+        "PEND": PENDING,
+        "PSUSP": PENDING,
+        "WAIT": PENDING,
+        "RUN": RUNNING,
+        "PROV": RUNNING,
+        "USUSP": SUSPENDED,
+        "SSUSP": SUSPENDED,
+        "UNKWN": RUNNING, # Execution host unreachable; the job may still be running.
+        "DONE": DONE,
+        "EXIT": EXIT,
+        "ZOMBI": EXIT,
+    }
+
+    def _submit_argv(self, script_path, name, stdout_path, stderr_path, cwd, resources):
+        argv = ["bsub", "-J", name, "-oo", stdout_path, "-eo", stderr_path, "-cwd", cwd]
+        if resources.get("cpu", 1) > 1:
+            argv.extend(["-n", str(resources["cpu"]), "-R", "span[hosts=1]"])
+        if resources.get("memory_mb"):
+            argv.extend(["-R", "rusage[mem={}]".format(resources["memory_mb"])])
+        return argv + self.submit_args + ["/bin/sh", script_path]
+
+    def _submit_array_argv(self, script_path, name, stdout_path, stderr_path, cwd, resources, count):
+        return self._submit_argv(script_path, "{}[1-{}]".format(name, count), stdout_path + ".%I", stderr_path + ".%I",
+                                 cwd, resources)
+
+    def _element_id(self, array_id, index):
+        return "{}[{}]".format(array_id, index)
+
+    def _base_id(self, job_id):
+        return job_id.split("[", 1)[0]
+
+    def _parse_job_id(self, output):
+        match = re.search(r"Job <(\d+)>", output or "")
+        return match.group(1) if match else None
+
+    def _query_argv(self, job_ids):
+        return ["bjobs", "-noheader", "-o", "jobid jobindex stat"] + list(job_ids)
+
+    def _parse_state_line(self, fields):
+        if len(fields) < 3:
+            return None, None
+        job_id, index, state = fields[:3]
+        if index not in ("0", "-"):
+            job_id = self._element_id(job_id, index)
+        return job_id, state
+
+    def _normalize_state(self, state):
+        return self.STATES.get(state)
+
+    def _kill_argv(self, job_id):
+        return ["bkill", job_id]
+
+    def _suspend_argv(self, job_id):
+        return ["bstop", job_id]
+
+    def _resume_argv(self, job_id):
+        return ["bresume", job_id]
+
+
+class SlurmScheduler(CommandScheduler):
+    NAME = "Slurm"
+    STATES = {
+        "PENDING": PENDING,
+        "CONFIGURING": PENDING,
+        "REQUEUED": PENDING,
+        "RUNNING": RUNNING,
+        "COMPLETING": RUNNING,
+        "STOPPED": SUSPENDED,
+        "SUSPENDED": SUSPENDED,
+        "COMPLETED": DONE,
+    }
+
+    def _submit_argv(self, script_path, name, stdout_path, stderr_path, cwd, resources):
+        argv = ["sbatch", "--parsable", "-J", name, "-o", stdout_path, "-e", stderr_path, "--chdir", cwd]
+        if resources.get("cpu", 1) > 1:
+            argv.append("--cpus-per-task={}".format(resources["cpu"]))
+        if resources.get("memory_mb"):
+            argv.append("--mem={}M".format(resources["memory_mb"]))
+        return argv + self.submit_args + [script_path]
+
+    def _submit_array_argv(self, script_path, name, stdout_path, stderr_path, cwd, resources, count):
+        argv = self._submit_argv(script_path, name, stdout_path + ".%a", stderr_path + ".%a", cwd, resources)
+        argv.insert(1, "--array=1-{}".format(count))
+        return argv
+
+    def _element_id(self, array_id, index):
+        return "{}_{}".format(array_id, index)
+
+    def _base_id(self, job_id):
+        return job_id.split("_", 1)[0]
+
+    def _parse_job_id(self, output):
+        job_id = (output or "").strip().split(";", 1)[0]
+        return job_id if job_id.isdigit() else None
+
+    def _query_argv(self, job_ids):
+        # --states=all keeps recently finished jobs visible with their final state;
+        # -r lists pending array elements one per line instead of as a range.
+        return ["squeue", "-h", "-r", "--states=all", "-o", "%i %T", "-j", ",".join(job_ids)]
+
+    def _normalize_state(self, state):
+        # FAILED, CANCELLED, TIMEOUT, NODE_FAIL, OUT_OF_MEMORY, PREEMPTED, ...
+        return self.STATES.get(state, EXIT)
+
+    def _kill_argv(self, job_id):
+        return ["scancel", job_id]
+
+    def _suspend_argv(self, job_id):
+        # scontrol suspend needs operator rights; signalling the job does not.
+        return ["scancel", "--signal=STOP", "--full", job_id]
+
+    def _resume_argv(self, job_id):
+        return ["scancel", "--signal=CONT", "--full", job_id]
+
+
+class LocalScheduler(BatchScheduler):
+    """Stand-in batch system that runs submitted scripts as local process groups.
+
+    It follows the same submit/query/control protocol as the cluster schedulers
+    so the batch runner can be exercised without LSF or Slurm.
+    """
+    NAME = "local"
+    QUERY_INTERVAL_SECONDS = 0.5
+    KILL_ESCALATION_SECONDS = 10
+
+    def __init__(self, submit_args=()):
+        super(LocalScheduler, self).__init__(submit_args)
+        self._processes = {}
+        self._arrays = {}
+
+    def submit(self, script_path, name, stdout_path, stderr_path, cwd, resources, environment=None):
+        with open(stdout_path, "w") as stdout_fp, open(stderr_path, "w") as stderr_fp:
+            process = subprocess.Popen(["/bin/sh", script_path],
+                                       cwd=cwd,
+                                       stdout=stdout_fp,
+                                       stderr=stderr_fp,
+                                       env=environment,
+                                       start_new_session=True)
+        job_id = str(process.pid)
+        with self._lock:
+            self._processes[job_id] = process
+        self._track([job_id])
+        return job_id
+
+    def submit_array(self, script_path, name, stdout_path, stderr_path, cwd, resources, count):
+        """Start every element at once; each element is a process group of its own."""
+        element_ids = []
+        for index in range(1, count + 1):
+            environment = dict(os.environ, SIMMER_ARRAY_INDEX=str(index))
+            element_ids.append(
+                self.submit(script_path, name, "{}.{}".format(stdout_path, index), "{}.{}".format(stderr_path, index),
+                            cwd, resources, environment))
+        array_id = "array-{}".format(element_ids[0])
+        with self._lock:
+            self._arrays[array_id] = element_ids
+        return array_id, element_ids
+
+    def forget(self, job_id):
+        super(LocalScheduler, self).forget(job_id)
+        process = self._processes.pop(job_id, None)
+        if process is not None:
+            process.poll()
+
+    def _query(self, job_ids):
+        states = {}
+        for job_id in job_ids:
+            process = self._processes.get(job_id)
+            if process is None:
+                continue
+            returncode = process.poll()
+            if returncode is None:
+                states[job_id] = SUSPENDED if self._stopped(job_id) else RUNNING
+            else:
+                states[job_id] = DONE if returncode == 0 else EXIT
+        return states
+
+    @staticmethod
+    def _stopped(job_id):
+        """Return whether the job's process group is stopped.
+
+        A shell stopped between vfork and exec leaves the parent in "D" state
+        waiting for its stopped child, so the whole group is inspected.
+        """
+        states = []
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open("/proc/{}/stat".format(entry), "r", encoding="ascii") as filep:
+                    fields = filep.read().rsplit(")", 1)[1].split()
+            except (OSError, IndexError):
+                continue
+            if len(fields) > 2 and fields[2] == job_id:
+                states.append(fields[0])
+        return "T" in states and all(state in ("T", "t", "D") for state in states)
+
+    def _signal(self, job_id, sig):
+        try:
+            os.killpg(int(job_id), sig)
+        except ProcessLookupError:
+            pass
+
+    def kill(self, job_id):
+        if job_id in self._arrays:
+            for element_id in self._arrays[job_id]:
+                self.kill(element_id)
+            return
+        self._signal(job_id, signal.SIGCONT)
+        self._signal(job_id, signal.SIGTERM)
+        process = self._processes.get(job_id)
+        if process is not None:
+            # Like bkill/scancel, follow SIGTERM with SIGKILL if the job lingers.
+            timer = threading.Timer(self.KILL_ESCALATION_SECONDS, self._escalate, (job_id, process))
+            timer.daemon = True
+            timer.start()
+
+    def _escalate(self, job_id, process):
+        if process.poll() is None:
+            self._signal(job_id, signal.SIGKILL)
+
+    def suspend(self, job_id):
+        for element_id in self._arrays.get(job_id, [job_id]):
+            self._signal(element_id, signal.SIGSTOP)
+
+    def resume(self, job_id):
+        for element_id in self._arrays.get(job_id, [job_id]):
+            self._signal(element_id, signal.SIGCONT)
+
+
+SCHEDULERS = {
+    "local": LocalScheduler,
+    "lsf": LsfScheduler,
+    "slurm": SlurmScheduler,
+}
+
+
+def create_scheduler(name, submit_args=()):
+    return SCHEDULERS[name](submit_args)
+
+
+def create_runner(job, manager, scheduler):
+    """Return the batch runner for job: jobs with array members run as one job array."""
+    if getattr(job, "array_members", None):
+        return BatchArrayJobRunner(job, manager, scheduler)
+    return BatchJobRunner(job, manager, scheduler)
+
+
+class BatchJobRunner(JobRunner):
+    """Run one job's command as a batch job with subprocess-runner semantics.
+
+    The command is wrapped in a script that records its exit status in the job
+    directory. Completion is detected from that file, with the batch system's
+    state as a fallback for jobs that die before writing it. Timeouts, kill and
+    pause/resume go through the batch system.
+
+    With submit=False the runner only tracks the job; BatchArrayJobRunner
+    submits it as an array element and assigns job_id.
+    """
+    TERM_GRACE_SECONDS = SubprocessJobRunner.TERM_GRACE_SECONDS
+    KILL_GRACE_SECONDS = SubprocessJobRunner.KILL_GRACE_SECONDS
+    OWNERSHIP_GRACE_SECONDS = SubprocessJobRunner.OWNERSHIP_GRACE_SECONDS
+    # Shared filesystems may expose the exit file after the batch system reports completion.
+    EXIT_FILE_GRACE_SECONDS = 30
+    CHECK_INTERVAL_SECONDS = 2.0
+    KILL_POLL_SECONDS = 0.5
+
+    def __init__(self, job, manager, scheduler, submit=True):
+        super(BatchJobRunner, self).__init__(job, manager)
+        self.scheduler = scheduler
+        self.shutdown_incomplete = False
+        self._kill_lock = threading.Lock()
+        self._returncode = None
+        self._timed_out = False
+        self._kill_deadline = None
+        self._finish_deadline = None
+        self._running_since = None
+        self._timeout_start = None
+        self._next_check = 0.0
+        self._paused = False
+        self._paused_at = None
+        self._pause_intervals = []
+
+        self.stdout_log_path = self._get_stdout_capture_path()
+        self.stderr_log_path = os.path.join(self.job.job_dir, "stderr.log")
+        self.script_path = os.path.join(self.job.job_dir, BATCH_SCRIPT_FILENAME)
+        self.exit_path = os.path.join(self.job.job_dir, BATCH_EXIT_FILENAME)
+        try:
+            os.remove(self.exit_path)
+        except FileNotFoundError:
+            pass
+        self.job_id = None
+        if submit:
+            self._write_script()
+            self.job_id = self.scheduler.submit(self.script_path, _job_name(self.job), self.stdout_log_path,
+                                                self.stderr_log_path, os.getcwd(), self.job.resources)
+            self.log.info("%s submitted as %s job %s", self.job, self.scheduler.NAME, self.job_id)
+
+    def _script_lines(self):
+        """Shell lines that run the command and record its exit status."""
+        exit_path = shlex.quote(self.exit_path)
+        return [
+            "cd {}".format(shlex.quote(os.getcwd())),
+            "/bin/sh -c {}".format(shlex.quote(self.job.main_cmdline)),
+            "status=$?",
+            "printf '%s\\n' \"$status\" > {0}.tmp && mv -f {0}.tmp {0}".format(exit_path),
+            "exit $status",
+        ]
+
+    def _write_script(self):
+        with open(self.script_path, "w") as filep:
+            filep.write("#!/bin/sh\n")
+            filep.write("".join(line + "\n" for line in self._script_lines()))
+        os.chmod(self.script_path, 0o755)
+
+    def _read_exit_status(self):
+        try:
+            with open(self.exit_path, "r", encoding="ascii") as filep:
+                return int(filep.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    @property
+    def signal_escalation_pending(self):
+        """True while a timed-out batch job needs scheduler polling."""
+        return self._timed_out
+
+    def _finish(self, returncode):
+        if self._timed_out and returncode in (None, 0):
+            returncode = -signal.SIGTERM
+        self._returncode = returncode
+        self.done = True
+        self.scheduler.forget(self.job_id)
+        return True
+
+    def check_for_done(self):
+        if self.done:
+            return self.done
+        now_monotonic = time.monotonic()
+        if now_monotonic < self._next_check:
+            return False
+        self._next_check = now_monotonic + self.CHECK_INTERVAL_SECONDS
+        try:
+            return self._check_for_done()
+        except Exception as exc:
+            self.log.error("Job failed %s:\n%s", self.job, exc)
+            return self._finish(-signal.SIGKILL) if self._stop_batch_job() else self._abandon()
+
+    def _check_for_done(self):
+        # Read the state first: a job that finishes between the two reads then
+        # still has its exit file seen, instead of looking like it died without one.
+        state = self.scheduler.state(self.job_id)
+        exit_status = self._read_exit_status()
+        if exit_status is not None:
+            return self._finish(exit_status)
+
+        now = datetime.datetime.now()
+        if state in FINISHED_STATES or state is None:
+            if self._timed_out:
+                return self._finish(-signal.SIGTERM)
+            if self._finish_deadline is None:
+                self._finish_deadline = now + datetime.timedelta(seconds=self.EXIT_FILE_GRACE_SECONDS)
+            if now < self._finish_deadline:
+                return False
+            if state == DONE:
+                return self._finish(0)
+            self.log.error("%s batch job %s ended without an exit status (state %s)", self.job, self.job_id, state)
+            return self._finish(-signal.SIGKILL)
+        self._finish_deadline = None
+
+        if self._timed_out:
+            if now >= self._kill_deadline + datetime.timedelta(seconds=self.OWNERSHIP_GRACE_SECONDS):
+                return self._abandon()
+            return False
+        if state == RUNNING and self._running_since is None:
+            self._running_since = now
+        if self._paused:
+            return False
+
+        timeout_start = self._running_since
+        timeout_start_path = getattr(self.job, "timeout_start_path", None)
+        if timeout_start_path:
+            timeout_start = self._timeout_start
+            if timeout_start is None:
+                try:
+                    timeout_start = datetime.datetime.fromtimestamp(os.path.getmtime(timeout_start_path))
+                except OSError:
+                    return False
+                self._timeout_start = timeout_start
+        if timeout_start is None:
+            return False
+        timeout_start += self._paused_duration_since(timeout_start, now)
+        if self.job.timeout > 0 and now - timeout_start > datetime.timedelta(hours=self.job.timeout):
+            self.log.error("%s exceeded timeout value of %s; killing batch job %s", self.job, self.job.timeout,
+                           self.job_id)
+            self._timed_out = True
+            self._kill_deadline = now + datetime.timedelta(seconds=self.TERM_GRACE_SECONDS + self.KILL_GRACE_SECONDS)
+            self.scheduler.kill(self.job_id)
+            for path in (self.stderr_log_path, self.stdout_log_path):
+                with open(path, 'a') as filep:
+                    filep.write("%%E- %s exceeded timeout value of %s (batch job killed)" %
+                                (self.job, self.job.timeout))
+        return False
+
+    def _abandon(self):
+        self.log.error("%s batch job %s could not be confirmed stopped; preserving artifacts and stopping scheduling",
+                       self.job, self.job_id)
+        self.shutdown_incomplete = True
+        self.done = True
+        return True
+
+    def _stop_batch_job(self):
+        """Kill the batch job and wait for the batch system to confirm it ended."""
+        try:
+            self.scheduler.kill(self.job_id)
+        except (OSError, RuntimeError, subprocess.SubprocessError) as exc:
+            self.log.warning("Could not kill %s batch job %s: %s", self.job, self.job_id, exc)
+        return self._wait_for_end(time.monotonic() + self.TERM_GRACE_SECONDS + self.KILL_GRACE_SECONDS)
+
+    def _wait_for_end(self, deadline):
+        while time.monotonic() < deadline:
+            if self._read_exit_status() is not None:
+                return True
+            if self.scheduler.state(self.job_id, max_age=1.0) in FINISHED_STATES + (None, ):
+                return True
+            time.sleep(self.KILL_POLL_SECONDS)
+        return False
+
+    @property
+    def returncode(self):
+        return self._returncode
+
+    def pause(self):
+        """Suspend the batch job without consuming its timeout budget."""
+        with self._kill_lock:
+            if self.done or self._timed_out:
+                return False
+            if self._paused:
+                return True
+            try:
+                self.scheduler.suspend(self.job_id)
+            except (OSError, RuntimeError, subprocess.SubprocessError) as exc:
+                self.log.warning("Could not suspend %s batch job %s: %s", self.job, self.job_id, exc)
+                return False
+            self._mark_paused()
+            return True
+
+    def _mark_paused(self):
+        self._paused = True
+        self._paused_at = datetime.datetime.now()
+
+    def _mark_resumed(self):
+        if self._paused:
+            self._pause_intervals.append((self._paused_at, datetime.datetime.now()))
+        self._paused = False
+        self._paused_at = None
+
+    def resume(self):
+        """Resume a batch job suspended by :meth:`pause`."""
+        with self._kill_lock:
+            if not self._paused:
+                return False
+            try:
+                self.scheduler.resume(self.job_id)
+            except (OSError, RuntimeError, subprocess.SubprocessError) as exc:
+                self.log.warning("Could not resume %s batch job %s: %s", self.job, self.job_id, exc)
+                return False
+            self._mark_resumed()
+            return True
+
+    def kill(self):
+        """Kill the batch job and wait until the batch system reports it ended."""
+        with self._kill_lock:
+            if self.done:
+                return not self.shutdown_incomplete
+            self._mark_resumed()
+            if self._stop_batch_job():
+                self._finish(-signal.SIGTERM)
+                return True
+            self.log.warning("%s batch job %s still exists after kill", self.job, self.job_id)
+            self.shutdown_incomplete = True
+            self.done = True
+            return False
+
+
+class BatchArrayJobRunner(JobRunner):
+    """Run the array members of one job as a single batch job array.
+
+    One launcher script dispatches on the array index to each member's
+    command, so the batch system sees one submission instead of one per
+    member. Every member keeps its own BatchJobRunner for exit status and
+    timeout tracking; kill and pause/resume address the whole array at once.
+    """
+    TERM_GRACE_SECONDS = BatchJobRunner.TERM_GRACE_SECONDS
+    KILL_GRACE_SECONDS = BatchJobRunner.KILL_GRACE_SECONDS
+    element_runner_type = BatchJobRunner
+
+    def __init__(self, job, manager, scheduler):
+        super(BatchArrayJobRunner, self).__init__(job, manager)
+        self.scheduler = scheduler
+        self.shutdown_incomplete = False
+        self._kill_lock = threading.Lock()
+        self._paused = False
+        self.elements = [
+            self.element_runner_type(member, manager, scheduler, submit=False) for member in job.array_members
+        ]
+
+        self.script_path = os.path.join(self.job.job_dir, BATCH_ARRAY_SCRIPT_FILENAME)
+        self._write_script()
+        self.array_id, element_ids = self.scheduler.submit_array(self.script_path, _job_name(self.job),
+                                                                 os.path.join(self.job.job_dir, "stdout.log"),
+                                                                 os.path.join(self.job.job_dir, "stderr.log"),
+                                                                 os.getcwd(), job.array_members[0].resources,
+                                                                 len(self.elements))
+        for element, element_id in zip(self.elements, element_ids):
+            element.job_id = element_id
+        self.log.info("%s submitted as %s job array %s (%d elements)", self.job, self.scheduler.NAME, self.array_id,
+                      len(self.elements))
+
+    def _write_script(self):
+        with open(self.script_path, "w") as filep:
+            filep.write("#!/bin/sh\n")
+            filep.write("index=${SIMMER_ARRAY_INDEX:-${LSB_JOBINDEX:-$SLURM_ARRAY_TASK_ID}}\n")
+            filep.write("case \"$index\" in\n")
+            for index, element in enumerate(self.elements, 1):
+                filep.write("{})\n".format(index))
+                filep.write("exec >{} 2>{}\n".format(shlex.quote(element.stdout_log_path),
+                                                     shlex.quote(element.stderr_log_path)))
+                filep.write("".join(line + "\n" for line in element._script_lines()))
+                filep.write(";;\n")
+            filep.write("*)\n")
+            filep.write("echo \"no job array element $index\" >&2\n")
+            filep.write("exit 2\n")
+            filep.write(";;\n")
+            filep.write("esac\n")
+        os.chmod(self.script_path, 0o755)
+
+    @property
+    def signal_escalation_pending(self):
+        """True while a timed-out element needs scheduler polling."""
+        return any(element._timed_out and not element.done for element in self.elements)
+
+    def check_for_done(self):
+        if self.done:
+            return self.done
+        if all([element.check_for_done() for element in self.elements]):
+            self.shutdown_incomplete = any(element.shutdown_incomplete for element in self.elements)
+            self.done = True
+        return self.done
+
+    @property
+    def returncode(self):
+        if not self.done:
+            return None
+        return next((element.returncode for element in self.elements if element.returncode != 0), 0)
+
+    def _running_elements(self):
+        return [element for element in self.elements if not element.done and not element._timed_out]
+
+    def pause(self):
+        """Suspend the whole array without consuming its elements' timeout budget."""
+        with self._kill_lock:
+            if self.done:
+                return False
+            if self._paused:
+                return True
+            try:
+                self.scheduler.suspend(self.array_id)
+            except (OSError, RuntimeError, subprocess.SubprocessError) as exc:
+                self.log.warning("Could not suspend %s job array %s: %s", self.job, self.array_id, exc)
+                return False
+            self._paused = True
+            for element in self._running_elements():
+                element._mark_paused()
+            return True
+
+    def resume(self):
+        """Resume an array suspended by :meth:`pause`."""
+        with self._kill_lock:
+            if not self._paused:
+                return False
+            try:
+                self.scheduler.resume(self.array_id)
+            except (OSError, RuntimeError, subprocess.SubprocessError) as exc:
+                self.log.warning("Could not resume %s job array %s: %s", self.job, self.array_id, exc)
+                return False
+            self._paused = False
+            for element in self.elements:
+                element._mark_resumed()
+            return True
+
+    def kill(self):
+        """Kill the array and wait until the batch system reports every element ended."""
+        with self._kill_lock:
+            if self.done:
+                return not self.shutdown_incomplete
+            remaining = [element for element in self.elements if not element.done]
+            for element in remaining:
+                element._mark_resumed()
+            try:
+                self.scheduler.kill(self.array_id)
+            except (OSError, RuntimeError, subprocess.SubprocessError) as exc:
+                self.log.warning("Could not kill %s job array %s: %s", self.job, self.array_id, exc)
+            deadline = time.monotonic() + self.TERM_GRACE_SECONDS + self.KILL_GRACE_SECONDS
+            for element in remaining:
+                if element._wait_for_end(deadline):
+                    element._finish(-signal.SIGTERM)
+                else:
+                    self.log.warning("%s batch job %s still exists after kill", element.job, element.job_id)
+                    element.shutdown_incomplete = True
+                    element.done = True
+            self.shutdown_incomplete = any(element.shutdown_incomplete for element in self.elements)
+            self.done = True
+            return not self.shutdown_incomplete
@@ -0,0 +1,57 @@
+"""Read the files of an output group from a Bazel build event protocol JSON file."""
+
+import json
+from urllib.parse import unquote, urlparse
+
+
+def _local_path(build_event_file):
+    uri = build_event_file.get("uri", "")
+    if not uri.startswith("file://"):
+        return None
+    return unquote(urlparse(uri).path)
+
+
+def output_group_files(build_event_json_path, output_group):
+    """Return the local paths of every file built into output_group.
+
+    Completed targets and aspects name the file sets of each output group;
+    those sets may nest, so they are resolved through the namedSet events.
+    Files that were not materialized locally (non file:// URIs) are skipped;
+    raises ValueError when the group lists files but none of them is local.
+    """
+    named_sets = {}
+    pending = []
+    with open(build_event_json_path, encoding="utf-8") as events:
+        for line in events:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            event_id = event.get("id", {})
+            if "namedSet" in event_id:
+                named_sets[event_id["namedSet"].get("id")] = event.get("namedSetOfFiles", {})
+            elif "targetCompleted" in event_id:
+                for group in event.get("completed", {}).get("outputGroup", []):
+                    if group.get("name") == output_group:
+                        pending.extend(file_set.get("id") for file_set in group.get("fileSets", []))
+
+    paths = []
+    remote_files = []
+    visited = set()
+    while pending:
+        set_id = pending.pop()
+        if set_id in visited:
+            continue
+        visited.add(set_id)
+        named_set = named_sets.get(set_id, {})
+        for build_event_file in named_set.get("files", []):
+            path = _local_path(build_event_file)
+            if path:
+                paths.append(path)
+            else:
+                remote_files.append(build_event_file.get("uri") or build_event_file.get("name"))
+        pending.extend(file_set.get("id") for file_set in named_set.get("fileSets", []))
+    if remote_files and not paths:
+        raise ValueError("No file of output group {} was downloaded locally, e.g. {}".format(
+            output_group, remote_files[0]))
+    return sorted(set(paths))
@@ -1,13 +1,27 @@
 """Fingerprint simulator builds before allowing --no-compile reuse."""
 
+import difflib
 import hashlib
 import json
 import os
+import platform
 import re
-import shlex
+import shutil
 import tempfile
 
+from lib import content_store, digest_index, filelist_graph
+
 FINGERPRINT_FILE = ".compile_fingerprint.json"
+DIGEST_INDEX_FILE = ".compile_digests.json"
+INPUTS_MANIFEST_FILE = ".compile_fingerprint_inputs.json"
+INPUTS_MANIFEST_SCHEMA_VERSION = 1
+# explain_compile_changes lists at most this many entries of each kind.
+EXPLAIN_LIMIT = 50
+MISSING_DIGEST = "missing"
+SHARED_COMPILE_KIND = "compile"
+# Names materialized from a shared store entry; they are hardlinks into the
+# read-only store and must be replaced, not updated, by a later compile.
+SHARED_COMPILE_MARKER = ".shared_compile.json"
 
 
 class CompileDirectoryLock:
@@ -60,19 +74,25 @@ def _digest_bytes(*values):
     return digest.hexdigest()
 
 
-def _file_bytes(path):
-    try:
-        with open(path, "rb") as filep:
-            return filep.read()
-    except OSError:
-        return b"<missing>"
+def compile_digest_index(job_dir, force=False):
+    """Return the digest index of a compile directory's inputs.
 
+    It lives next to the compile fingerprint, so the compile directory lock
+    also guards it, and lets an unchanged fingerprint check stat its inputs
+    instead of reading them. force ignores the recorded digests.
+    """
+    return digest_index.DigestIndex(os.path.join(job_dir, DIGEST_INDEX_FILE), force=force)
 
-def _compile_inputs_digest(compile_inputs_path, runfiles_root):
-    if not compile_inputs_path:
-        return None
 
-    digest = hashlib.sha256()
+def _file_digests(paths, digests=None):
+    file_digests = digest_index.sha256_files(paths, sha256=digests.sha256 if digests is not None else None)
+    return [digest or MISSING_DIGEST for digest in file_digests]
+
+
+def _inventory_file_digests(compile_inputs_path, runfiles_root, digests=None):
+    """Return (inventory entry, file digest) for every compile input inventory line."""
+    entries = []
+    input_paths = []
     with open(compile_inputs_path, "r", encoding="utf-8") as filep:
         for line in filep:
             entry = line.rstrip("\n")
@@ -82,10 +102,18 @@ def _compile_inputs_digest(compile_inputs_path, runfiles_root):
             input_path = os.path.join(runfiles_root, relative_path)
             if not os.path.isfile(input_path):
                 raise RuntimeError("Compile input inventory references missing file: {}".format(input_path))
-            digest.update(entry.encode("utf-8"))
-            digest.update(b"\0")
-            digest.update(_file_bytes(input_path))
-            digest.update(b"\0")
+            entries.append(entry)
+            input_paths.append(input_path)
+    return list(zip(entries, _file_digests(input_paths, digests)))
+
+
+def _inventory_digest(inventory):
+    digest = hashlib.sha256()
+    for entry, file_digest in inventory:
+        digest.update(entry.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(file_digest.encode("ascii"))
+        digest.update(b"\0")
     return digest.hexdigest()
 
 
@@ -112,32 +140,42 @@ def _read_compile_inputs_digest(path):
     return digest
 
 
-def _extra_input_digests(paths):
+def _input_label(path, runfiles_root):
+    path = os.path.abspath(os.fspath(path))
+    if runfiles_root:
+        relative_path = os.path.relpath(path, os.path.abspath(os.fspath(runfiles_root)))
+        if not relative_path.startswith(os.pardir):
+            return relative_path
+    return path
+
+
+def _extra_input_file_digests(paths, digests=None):
+    paths = sorted(os.path.abspath(os.fspath(path)) for path in paths if path)
+    return list(zip(paths, _file_digests(paths, digests)))
+
+
+def _extra_input_digests(file_digests):
     path_digest = hashlib.sha256()
-    content_digests = []
-    for path in sorted(os.path.abspath(os.fspath(path)) for path in paths if path):
-        content = _file_bytes(path)
+    for path, file_digest in file_digests:
         path_digest.update(path.encode("utf-8"))
         path_digest.update(b"\0")
-        path_digest.update(content)
+        path_digest.update(file_digest.encode("ascii"))
         path_digest.update(b"\0")
-        content_digests.append(_digest_bytes(content))
-    content_digest = _digest_bytes(*(digest.encode("ascii") for digest in sorted(content_digests)))
+    content_digest = _digest_bytes(*(file_digest.encode("ascii")
+                                     for file_digest in sorted(file_digest for _, file_digest in file_digests)))
     return path_digest.hexdigest(), content_digest
 
 
-def _directory_inputs(path):
-    for root, dirs, files in os.walk(path):
-        dirs.sort()
-        for filename in sorted(files):
-            yield os.path.join(root, filename)
+def discover_filelist_inputs(filelist_path, working_directory, cache=None, digests=None):
+    """Return existing files and include/library directory contents referenced by a simulator filelist.
 
-
-def discover_filelist_inputs(filelist_path, working_directory):
-    """Return existing files and include/library directory contents referenced by a simulator filelist."""
+    cache is a FilelistCache shared between calls, and digests an optional
+    DigestIndex used to key its parsed filelists without reading them.
+    """
     if not filelist_path:
         return []
 
+    cache = cache if cache is not None else filelist_graph.FilelistCache()
     working_directory = os.path.abspath(working_directory)
     root_filelist = os.path.abspath(filelist_path)
     discovered = set()
@@ -159,7 +197,7 @@ def discover_filelist_inputs(filelist_path, working_directory):
         if os.path.isfile(resolved):
             discovered.add(resolved)
         elif include_directory and os.path.isdir(resolved):
-            discovered.update(_directory_inputs(resolved))
+            discovered.update(cache.directory_files(resolved))
         return resolved
 
     while pending:
@@ -171,15 +209,14 @@ def discover_filelist_inputs(filelist_path, working_directory):
             continue
         discovered.add(current_filelist)
         try:
-            with open(current_filelist, "r", encoding="utf-8", errors="surrogateescape") as filep:
-                # Simulator filelists are usually POSIX shell syntax, but the
-                # library is also exercised on Windows where drive-letter
-                # paths contain backslashes.  ``posix=True`` treats those
-                # backslashes as escapes and silently turns e.g.
-                # ``C:\\work\\dut.sv`` into ``C:workdut.sv``.  Preserve
-                # native Windows paths while retaining the existing POSIX
-                # parsing rules on licensed Linux hosts.
-                tokens = [unquote(token) for token in shlex.split(filep.read(), comments=True, posix=os.name != "nt")]
+            # Simulator filelists are usually POSIX shell syntax, but the
+            # library is also exercised on Windows where drive-letter
+            # paths contain backslashes.  ``posix=True`` treats those
+            # backslashes as escapes and silently turns e.g.
+            # ``C:\\work\\dut.sv`` into ``C:workdut.sv``.  The tokenizer
+            # preserves native Windows paths while retaining the existing
+            # POSIX parsing rules on licensed Linux hosts.
+            tokens = [unquote(token) for token in cache.tokens(current_filelist, digests)]
         except ValueError:
             continue
 
@@ -235,26 +272,95 @@ def compile_fingerprint(project_dir,
                         runfiles_root=None,
                         compile_inputs_digest_path=None,
                         extra_input_paths=(),
-                        environment=None):
-    """Return the source, generated filelist and compile-mode identity."""
+                        environment=None,
+                        digests=None,
+                        inputs_manifest=None):
+    """Return the source, generated filelist and compile-mode identity.
+
+    digests is an optional DigestIndex consulted for every input file. When
+    inputs_manifest is a dict it is filled with the per-file digests and
+    compile script lines behind the fingerprint, for explain_compile_changes.
+    """
     fingerprint = {
-        "schema_version": 7,
+        "schema_version": 8,
         "compile_script_sha256": _digest_bytes(compile_script.encode("utf-8")),
-        "compile_args_sha256": _digest_bytes(_file_bytes(compile_args_path)),
+        "compile_args_sha256": _file_digests([compile_args_path], digests)[0],
         "environment": dict(sorted((environment or {}).items())),
     }
+    inputs = {}
     if compile_inputs_path:
+        inventory = None
+        if inputs_manifest is not None or not compile_inputs_digest_path:
+            inventory = _inventory_file_digests(compile_inputs_path, runfiles_root, digests)
+            inputs.update((entry.partition("\t")[2], file_digest) for entry, file_digest in inventory)
         fingerprint["compile_inputs_sha256"] = (_read_compile_inputs_digest(compile_inputs_digest_path)
-                                                if compile_inputs_digest_path else _compile_inputs_digest(
-                                                    compile_inputs_path, runfiles_root))
+                                                if compile_inputs_digest_path else _inventory_digest(inventory))
         fingerprint["compile_inputs_manifest_sha256"] = _compile_inputs_manifest_digest(compile_inputs_path)
     if extra_input_paths:
-        extra_inputs_digest, extra_inputs_content_digest = _extra_input_digests(extra_input_paths)
+        extra_inputs = _extra_input_file_digests(extra_input_paths, digests)
+        inputs.update(extra_inputs)
+        extra_inputs_digest, extra_inputs_content_digest = _extra_input_digests(extra_inputs)
         fingerprint["extra_inputs_sha256"] = extra_inputs_digest
         fingerprint["extra_inputs_content_sha256"] = extra_inputs_content_digest
+    if inputs_manifest is not None:
+        inputs[_input_label(compile_args_path, runfiles_root)] = fingerprint["compile_args_sha256"]
+        inputs_manifest.update({
+            "schema_version": INPUTS_MANIFEST_SCHEMA_VERSION,
+            "inputs": dict(sorted(inputs.items())),
+            "compile_script": compile_script.splitlines(),
+        })
     return fingerprint
 
 
+def shared_compile_key(fingerprint, compile_script, workspace_paths, backend_identity):
+    """Return the content key of a compile in a store shared between workspaces.
+
+    The compile script is hashed again with workspace_paths replaced by
+    tokens, and extra inputs count by content only, so checkouts at
+    different paths share a key. backend_identity names the simulator and
+    tool release; the host platform is added here.
+    """
+    shared_fingerprint = dict(fingerprint)
+    shared_fingerprint["compile_script_sha256"] = _digest_bytes(
+        normalize_compile_script_paths(compile_script, workspace_paths).encode("utf-8"))
+    shared_fingerprint.pop("extra_inputs_sha256", None)
+    return content_store.content_key({
+        "fingerprint": shared_fingerprint,
+        "backend": backend_identity,
+        "platform": [platform.system(), platform.machine()],
+    })
+
+
+def materialize_shared_compile(store, key, job_dir):
+    """Link a shared compile entry into job_dir; return the materialized names, or None on a miss."""
+    names = store.tree_names(SHARED_COMPILE_KIND, key)
+    if names is None:
+        return None
+    # Record the names first so that a partial materialization is discarded too.
+    os.makedirs(job_dir, exist_ok=True)
+    with open(os.path.join(job_dir, SHARED_COMPILE_MARKER), "w", encoding="utf-8") as filep:
+        json.dump({"key": key, "names": names}, filep, indent=2, sort_keys=True)
+        filep.write("\n")
+    return store.materialize_tree(SHARED_COMPILE_KIND, key, job_dir)
+
+
+def discard_shared_compile(job_dir):
+    """Remove outputs materialized from a shared store so a compile cannot write through their links."""
+    marker_path = os.path.join(job_dir, SHARED_COMPILE_MARKER)
+    try:
+        with open(marker_path, "r", encoding="utf-8") as filep:
+            names = json.load(filep).get("names") or []
+    except (OSError, ValueError, AttributeError):
+        return
+    for name in names:
+        path = os.path.join(job_dir, name)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.lexists(path):
+            os.remove(path)
+    os.remove(marker_path)
+
+
 def _fingerprint_path(job_dir):
     return os.path.join(job_dir, FINGERPRINT_FILE)
 
@@ -272,11 +378,88 @@ def write_compile_fingerprint(job_dir, fingerprint):
             os.remove(temporary_path)
 
 
+def write_compile_inputs_manifest(job_dir, inputs_manifest):
+    """Record the per-file digests behind the fingerprint for a later explain_compile_changes."""
+    os.makedirs(job_dir, exist_ok=True)
+    descriptor, temporary_path = tempfile.mkstemp(prefix=".compile-inputs-", dir=job_dir, text=True)
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as filep:
+            json.dump(inputs_manifest, filep, indent=1, sort_keys=True)
+            filep.write("\n")
+        os.replace(temporary_path, os.path.join(job_dir, INPUTS_MANIFEST_FILE))
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
 def invalidate_compile_fingerprint(job_dir):
+    for path in (_fingerprint_path(job_dir), os.path.join(job_dir, INPUTS_MANIFEST_FILE)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _read_json(path):
     try:
-        os.remove(_fingerprint_path(job_dir))
-    except FileNotFoundError:
-        pass
+        with open(path, "r", encoding="utf-8") as filep:
+            return json.load(filep)
+    except (OSError, ValueError):
+        return None
+
+
+def _limited(lines, limit=EXPLAIN_LIMIT):
+    if len(lines) <= limit:
+        return lines
+    return lines[:limit] + ["... and {} more".format(len(lines) - limit)]
+
+
+def explain_compile_changes(job_dir, expected, inputs_manifest):
+    """Return readable lines naming the inputs, environment keys and script lines that changed since job_dir compiled.
+
+    Per-file detail needs the inputs manifest recorded by the previous
+    compile; without it only the changed fingerprint fields are named.
+    """
+    actual = _read_json(_fingerprint_path(job_dir))
+    if not isinstance(actual, dict):
+        return ["No previous compile fingerprint in {}".format(job_dir)]
+    changed_fields = _changed_fingerprint_fields(actual, expected)
+    if not changed_fields:
+        return []
+    lines = ["Changed fingerprint fields: {}".format(", ".join(changed_fields))]
+
+    actual_environment = actual.get("environment") or {}
+    expected_environment = expected.get("environment") or {}
+    for key in sorted(set(actual_environment) | set(expected_environment)):
+        if actual_environment.get(key) != expected_environment.get(key):
+            lines.append("environment {}: {!r} -> {!r}".format(key, actual_environment.get(key),
+                                                               expected_environment.get(key)))
+
+    previous = _read_json(os.path.join(job_dir, INPUTS_MANIFEST_FILE))
+    if not isinstance(previous, dict) or previous.get("schema_version") != INPUTS_MANIFEST_SCHEMA_VERSION:
+        lines.append("No per-input record from the previous compile; compile once with --explain-recompile to "
+                     "record one")
+        return lines
+
+    previous_inputs = previous.get("inputs") or {}
+    current_inputs = inputs_manifest.get("inputs") or {}
+    input_changes = []
+    for path in sorted(set(previous_inputs) | set(current_inputs)):
+        if path not in current_inputs:
+            input_changes.append("removed input {}".format(path))
+        elif path not in previous_inputs:
+            input_changes.append("added input {}".format(path))
+        elif previous_inputs[path] != current_inputs[path]:
+            input_changes.append("changed input {}".format(path))
+    lines.extend(_limited(input_changes))
+
+    script_changes = [
+        line for line in difflib.unified_diff(
+            previous.get("compile_script") or [], inputs_manifest.get("compile_script") or [], lineterm="", n=0)
+        if line.startswith(("-", "+")) and not line.startswith(("---", "+++"))
+    ]
+    lines.extend(_limited(["compile script {}".format(line) for line in script_changes]))
+    return lines
 
 
 def _changed_fingerprint_fields(actual, expected, prefix=""):
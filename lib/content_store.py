@@ -0,0 +1,145 @@
+"""Content-addressed store shared between users and CI, published with atomic renames."""
+
+import hashlib
+import json
+import os
+import shutil
+import stat
+import tempfile
+
+
+def _link_or_copy(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def content_key(payload):
+    """Return the SHA-256 of payload's canonical JSON encoding."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ContentStore():
+    """Immutable entries under ``root/<kind>/<key[:2]>/<key>``.
+
+    An entry is written to a temporary name in its final directory and then
+    renamed into place, so readers only ever see complete entries and the
+    first of several concurrent publishers wins. Entries are made read-only
+    once published. A store the current user cannot write to is still read.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(os.path.expanduser(os.fspath(root)))
+
+    def path(self, kind, key):
+        return os.path.join(self.root, kind, key[:2], key)
+
+    def read_json(self, kind, key):
+        """Return the JSON entry stored under key, or None when it is absent or unreadable."""
+        try:
+            with open(self.path(kind, key), "r", encoding="utf-8") as filep:
+                return json.load(filep)
+        except (OSError, ValueError):
+            return None
+
+    def publish_json(self, kind, key, payload):
+        """Store payload under key unless an entry already exists; return True if this call stored it.
+
+        Raises OSError when the store cannot be written.
+        """
+        path = self.path(kind, key)
+        if os.path.exists(path):
+            return False
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(prefix=".{}-".format(key[:12]), suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as filep:
+                json.dump(payload, filep, sort_keys=True, separators=(",", ":"))
+                filep.flush()
+                os.fsync(filep.fileno())
+            os.chmod(temporary_path, 0o444)
+            if os.path.exists(path):
+                return False
+            os.replace(temporary_path, path)
+            return True
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def publish_tree(self, kind, key, source_dir, names):
+        """Copy the named entries of source_dir into a directory entry under key; return True if this call stored it.
+
+        Files in the entry lose their write permission and, like every
+        directory in it, become readable by all users; mkdtemp alone would
+        leave the entry private to its publisher. Raises OSError when the
+        store cannot be written.
+        """
+        path = self.path(kind, key)
+        if os.path.exists(path):
+            return False
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        temporary_path = tempfile.mkdtemp(prefix=".{}-".format(key[:12]), suffix=".tmp", dir=directory)
+        try:
+            for name in names:
+                source = os.path.join(source_dir, name)
+                destination = os.path.join(temporary_path, name)
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                if os.path.isdir(source) and not os.path.islink(source):
+                    shutil.copytree(source, destination, symlinks=True)
+                else:
+                    shutil.copy2(source, destination, follow_symlinks=False)
+            for root, _, files in os.walk(temporary_path):
+                os.chmod(root, 0o755)
+                for filename in files:
+                    file_path = os.path.join(root, filename)
+                    if not os.path.islink(file_path):
+                        os.chmod(file_path, stat.S_IMODE(os.stat(file_path).st_mode) & 0o555 | 0o444)
+            if os.path.exists(path):
+                return False
+            try:
+                os.rename(temporary_path, path)
+            except OSError:
+                if os.path.exists(path):
+                    return False
+                raise
+            return True
+        finally:
+            if os.path.exists(temporary_path):
+                shutil.rmtree(temporary_path, ignore_errors=True)
+
+    def tree_names(self, kind, key):
+        """Return the top-level names of a directory entry, or None when it is absent."""
+        try:
+            return sorted(os.listdir(self.path(kind, key)))
+        except OSError:
+            return None
+
+    def materialize_tree(self, kind, key, destination_dir):
+        """Hardlink, or copy across filesystems, a directory entry into destination_dir.
+
+        Returns the materialized top-level names, or None when the entry is
+        absent. Existing destination entries with those names are replaced.
+        """
+        names = self.tree_names(kind, key)
+        if names is None:
+            return None
+        path = self.path(kind, key)
+        os.makedirs(destination_dir, exist_ok=True)
+        for name in names:
+            source = os.path.join(path, name)
+            destination = os.path.join(destination_dir, name)
+            if os.path.isdir(destination) and not os.path.islink(destination):
+                shutil.rmtree(destination)
+            elif os.path.lexists(destination):
+                os.remove(destination)
+            if os.path.isdir(source) and not os.path.islink(source):
+                shutil.copytree(source, destination, symlinks=True, copy_function=_link_or_copy)
+            elif os.path.islink(source):
+                os.symlink(os.readlink(source), destination)
+            else:
+                _link_or_copy(source, destination)
+        return names
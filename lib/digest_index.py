@@ -0,0 +1,146 @@
+"""Persistent index of file digests keyed by stat identity, so unchanged files are not re-read."""
+
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+INDEX_SCHEMA_VERSION = 1
+READ_CHUNK_BYTES = 1 << 20
+# Files at least this large are hashed from a read-only mapping instead of
+# copied through Python buffers.
+MMAP_MIN_BYTES = 4 * READ_CHUNK_BYTES
+# A file modified this recently may be modified again within the same mtime
+# tick without changing its stat identity, so its digest is not remembered.
+RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+
+def file_sha256(path):
+    """Return the hex SHA-256 of path without holding the whole file in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as filep:
+        if os.fstat(filep.fileno()).st_size >= MMAP_MIN_BYTES:
+            try:
+                with mmap.mmap(filep.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    digest.update(mapped)
+                return digest.hexdigest()
+            except (OSError, ValueError):
+                filep.seek(0)
+        for chunk in iter(lambda: filep.read(READ_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _readable_sha256(path):
+    try:
+        return file_sha256(path)
+    except OSError:
+        return None
+
+
+def sha256_files(paths, sha256=None, max_workers=None):
+    """Return the hex SHA-256 of each path, in order, or None for files that cannot be read.
+
+    Files are hashed on a thread pool; hashlib releases the GIL while it
+    digests large buffers, so reads and hashing overlap across files.
+    sha256 replaces the per-file digest function, for example with a
+    DigestIndex's sha256 method.
+    """
+    sha256 = sha256 or _readable_sha256
+    paths = list(paths)
+    if len(paths) < 2:
+        return [sha256(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sha256") as pool:
+        return list(pool.map(sha256, paths))
+
+
+def _stat_identity(stat_result):
+    return [stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino, stat_result.st_ctime_ns]
+
+
+class DigestIndex():
+    """Map (path, size, mtime_ns, inode, ctime_ns) to a file's SHA-256.
+
+    A lookup whose stat identity matches the recorded one returns the stored
+    digest without opening the file. With ``force`` the digests stored on
+    disk are ignored, so every file is hashed once more in this process.
+    The index file is advisory: a missing or corrupt index only costs a
+    rehash, and concurrent writers simply keep the last complete index.
+    """
+
+    def __init__(self, path, force=False):
+        self.path = path
+        self.force = force
+        self.hashed = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+        self._entries = {} if force else self._load()
+        self._touched = set()
+        self._dirty = False
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as filep:
+                payload = json.load(filep)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(payload, dict) or payload.get("schema_version") != INDEX_SCHEMA_VERSION:
+            return {}
+        entries = payload.get("entries")
+        return entries if isinstance(entries, dict) else {}
+
+    def sha256(self, path):
+        """Return the hex SHA-256 of path, or None when it cannot be read."""
+        path = os.path.abspath(os.fspath(path))
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            return None
+        identity = _stat_identity(stat_result)
+        with self._lock:
+            self._touched.add(path)
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == identity:
+                self.reused += 1
+                return entry[1]
+        try:
+            digest = file_sha256(path)
+        except OSError:
+            return None
+        with self._lock:
+            self.hashed += 1
+            if time.time_ns() - stat_result.st_mtime_ns > RACY_WINDOW_NS:
+                self._entries[path] = [identity, digest]
+            else:
+                self._entries.pop(path, None)
+            self._dirty = True
+        return digest
+
+    def save(self, prune=False):
+        """Atomically write the index; prune drops files not looked up since it was opened."""
+        with self._lock:
+            if prune:
+                stale = set(self._entries) - self._touched
+                for path in stale:
+                    del self._entries[path]
+                self._dirty = self._dirty or bool(stale)
+            if not self._dirty:
+                return
+            payload = {"schema_version": INDEX_SCHEMA_VERSION, "entries": dict(self._entries)}
+            self._dirty = False
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(prefix=".{}-".format(os.path.basename(self.path)),
+                                                      suffix=".tmp",
+                                                      dir=directory)
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as filep:
+                json.dump(payload, filep, separators=(",", ":"))
+            os.replace(temporary_path, self.path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
@@ -0,0 +1,366 @@
+"""Per-workspace daemon that keeps test discovery results in memory between simmer runs."""
+
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import json
+import os
+import select
+import socket
+import socketserver
+import stat
+import struct
+import tempfile
+import threading
+
+REQUEST_TIMEOUT_SECONDS = 2.0
+# Only these manifest fields describe the workspace; the others describe the
+# discovery scope, which is already part of the lookup key.
+WORKSPACE_MANIFEST_KEYS = ("schema_version", "cacheable", "git_submodules", "files")
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_IN_TREE_CHANGE = _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_WATCH_MASK = _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_TREE_CHANGE
+_EVENT = struct.Struct("iIII")
+
+
+def _socket_dir():
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isabs(runtime_dir):
+        return os.path.join(runtime_dir, "simmer")
+    return os.path.join(tempfile.gettempdir(), "simmer-{}".format(os.getuid()))
+
+
+def socket_path(proj_dir):
+    workspace = hashlib.sha256(os.path.realpath(proj_dir).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(_socket_dir(), "discovery-{}.sock".format(workspace))
+
+
+def _check_private_dir(directory, create=False):
+    """Raise OSError unless directory is a real directory that only the current user can enter."""
+    if create:
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise OSError(errno.EPERM, "not a private directory of the current user", directory)
+
+
+def _peer_uid(client):
+    if not hasattr(socket, "SO_PEERCRED"):
+        return os.getuid()
+    credentials = client.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", credentials)[1]
+
+
+def request(proj_dir, message, timeout=REQUEST_TIMEOUT_SECONDS):
+    """Send one request to the workspace daemon; return its reply, or None when no daemon of ours answers."""
+    path = socket_path(proj_dir)
+    try:
+        _check_private_dir(os.path.dirname(path))
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(path)
+            if _peer_uid(client) != os.getuid():
+                return None
+            client.sendall(json.dumps(message).encode("utf-8") + b"\n")
+            client.shutdown(socket.SHUT_WR)
+            reply = b"".join(iter(lambda: client.recv(1 << 16), b""))
+    except OSError:
+        return None
+    try:
+        return json.loads(reply)
+    except ValueError:
+        return None
+
+
+def lookup(proj_dir, scope_id):
+    """Return the daemon's current discovery results for scope_id, or None."""
+    reply = request(proj_dir, {"op": "lookup", "scope": scope_id})
+    if not isinstance(reply, dict) or reply.get("status") != "hit":
+        return None
+    return reply.get("discovery")
+
+
+def publish(proj_dir, scope_id, manifest, discovery):
+    """Hand fresh discovery results to the workspace daemon, if one is running."""
+    return request(proj_dir, {
+        "op": "publish",
+        "scope": scope_id,
+        "manifest": manifest,
+        "discovery": discovery,
+    }) is not None
+
+
+def _workspace_part(manifest):
+    return {key: manifest.get(key) for key in WORKSPACE_MANIFEST_KEYS}
+
+
+class _Inotify():
+    """Minimal Linux inotify binding; raises OSError where inotify is unavailable."""
+
+    def __init__(self):
+        try:
+            self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+            self.fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        except (AttributeError, OSError) as exc:
+            raise OSError(errno.ENOSYS, "inotify is not available: {}".format(exc)) from exc
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+    def add_watch(self, path):
+        descriptor = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if descriptor < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        return descriptor
+
+    def read(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            descriptor, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            events.append((descriptor, mask, os.fsdecode(data[offset:offset + length].rstrip(b"\0"))))
+            offset += length
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        try:
+            message = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        reply = self.server.discovery.handle(message if isinstance(message, dict) else {})
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class DiscoveryDaemon():
+    """Serve published discovery results for one workspace over a unix socket.
+
+    The socket lives in a directory only the current user can enter, under
+    $XDG_RUNTIME_DIR or the temporary directory, and clients ignore a daemon
+    run by another user.
+
+    Results are kept per discovery scope together with the dependency
+    manifest they were discovered from. An inotify watch over the workspace
+    tree counts changes to discovery dependency files, directory layout and
+    Git HEADs; once anything changed, the next lookup recomputes the
+    workspace part of the manifest (stat-indexed, so cheap) and serves the
+    results only if it still matches. Without inotify, or past the watch
+    limit, every lookup revalidates this way.
+    """
+
+    def __init__(self, proj_dir, workspace_manifest, is_dependency, extra_files=(), skip_dirs=(), log=None):
+        self.proj_dir = os.path.realpath(proj_dir)
+        self.path = socket_path(proj_dir)
+        self.log = log
+        self.ready = threading.Event()
+        self.watching = False
+        self._workspace_manifest = workspace_manifest
+        self._is_dependency = is_dependency
+        self._extra_files = {os.path.abspath(path) for path in extra_files}
+        self._skip_dirs = {os.path.realpath(path) for path in skip_dirs}
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generation = 0
+        self._inotify = None
+        self._watches = {}
+        self._git_watches = set()
+        self._server = None
+        self._stopping = threading.Event()
+
+    def _add_watch(self, directory, git=False):
+        if not self.watching:
+            return
+        try:
+            descriptor = self._inotify.add_watch(directory)
+        except OSError as exc:
+            if exc.errno in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return
+            self.watching = False
+            if self.log:
+                self.log.warning("Cannot watch %s (%s); revalidating discovery on every lookup", directory, exc)
+            return
+        self._watches[descriptor] = directory
+        if git:
+            self._git_watches.add(descriptor)
+
+    def _watch_tree(self, top):
+        for root, dirs, _ in os.walk(top):
+            dirs[:] = [
+                directory for directory in dirs
+                if directory not in (".git", ".simmer") and not directory.startswith("bazel-")
+                and os.path.realpath(os.path.join(root, directory)) not in self._skip_dirs
+            ]
+            self._add_watch(root)
+
+    def _start_watching(self):
+        try:
+            self._inotify = _Inotify()
+        except OSError as exc:
+            if self.log:
+                self.log.warning("%s; revalidating discovery on every lookup", exc)
+            return
+        self.watching = True
+        self._watch_tree(self.proj_dir)
+        git_dir = os.path.join(self.proj_dir, ".git")
+        if os.path.isdir(git_dir):
+            self._add_watch(git_dir, git=True)
+            for root, dirs, files in os.walk(os.path.join(git_dir, "modules")):
+                dirs[:] = [directory for directory in dirs if directory not in ("objects", "refs", "logs")]
+                if "HEAD" in files:
+                    self._add_watch(root, git=True)
+        for directory in sorted({os.path.dirname(path) for path in self._extra_files}):
+            self._add_watch(directory)
+        threading.Thread(target=self._watch_loop, name="discovery-watch", daemon=True).start()
+
+    def _relevant(self, path, descriptor):
+        if descriptor in self._git_watches:
+            return os.path.basename(path) == "HEAD"
+        if path in self._extra_files:
+            return True
+        relative_path = os.path.relpath(path, self.proj_dir)
+        if relative_path.startswith(os.pardir):
+            return False
+        return self._is_dependency(relative_path.replace(os.sep, "/"))
+
+    def _watch_loop(self):
+        while not self._stopping.is_set() and self.watching:
+            changed = False
+            try:
+                events = self._inotify.read(0.5)
+            except (OSError, ValueError):
+                return
+            for descriptor, mask, name in events:
+                if mask & _IN_Q_OVERFLOW:
+                    changed = True
+                    continue
+                directory = self._watches.get(descriptor)
+                if directory is None:
+                    continue
+                if mask & _IN_IGNORED:
+                    self._watches.pop(descriptor, None)
+                    continue
+                path = os.path.join(directory, name) if name else directory
+                if mask & _IN_ISDIR and descriptor not in self._git_watches:
+                    if mask & (_IN_CREATE | _IN_MOVED_TO):
+                        self._watch_tree(path)
+                    changed = changed or bool(mask & _IN_TREE_CHANGE)
+                elif self._relevant(path, descriptor):
+                    changed = True
+            if changed:
+                with self._lock:
+                    self._generation += 1
+
+    def _validated_discovery(self, scope):
+        with self._lock:
+            entry = self._entries.get(scope)
+            if entry is None:
+                return None
+            if self.watching and entry["generation"] == self._generation:
+                return entry["discovery"]
+            generation = self._generation
+        current = _workspace_part(self._workspace_manifest())
+        with self._lock:
+            if self._entries.get(scope) is not entry:
+                return None
+            if current != _workspace_part(entry["manifest"]):
+                del self._entries[scope]
+                return None
+            entry["generation"] = generation
+            return entry["discovery"]
+
+    def handle(self, message):
+        operation = message.get("op")
+        if operation == "lookup":
+            discovery = self._validated_discovery(message.get("scope"))
+            return {"status": "miss"} if discovery is None else {"status": "hit", "discovery": discovery}
+        if operation == "publish":
+            scope = message.get("scope")
+            with self._lock:
+                self._entries[scope] = {
+                    "manifest": message.get("manifest") or {},
+                    "discovery": message.get("discovery"),
+                    "generation": None,
+                }
+            threading.Thread(target=self._validated_discovery, args=(scope, ), daemon=True).start()
+            return {"status": "ok"}
+        if operation == "status":
+            with self._lock:
+                return {
+                    "status": "ok",
+                    "pid": os.getpid(),
+                    "scopes": len(self._entries),
+                    "watching": self.watching,
+                    "watches": len(self._watches),
+                }
+        if operation == "shutdown":
+            threading.Thread(target=self.stop, daemon=True).start()
+            return {"status": "ok"}
+        return {"status": "error", "error": "unknown request {!r}".format(operation)}
+
+    def serve(self):
+        """Serve requests until stop() or a shutdown request."""
+        try:
+            _check_private_dir(os.path.dirname(self.path), create=True)
+        except OSError as exc:
+            raise RuntimeError("Cannot serve discovery on {}: {}".format(self.path, exc)) from exc
+        if request(self.proj_dir, {"op": "status"}) is not None:
+            raise RuntimeError("A discovery daemon is already running on {}".format(self.path))
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self._start_watching()
+        self._server = _Server(self.path, _Handler)
+        self._server.discovery = self
+        os.chmod(self.path, 0o600)
+        self.ready.set()
+        try:
+            self._server.serve_forever(poll_interval=0.2)
+        finally:
+            self._stopping.set()
+            self._server.server_close()
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            if self._inotify is not None:
+                self.watching = False
+                self._inotify.close()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
@@ -0,0 +1,90 @@
+"""Skip the remaining iterations of a test that keeps failing the same way."""
+
+import collections
+import re
+import threading
+
+_PATH = re.compile(r"(?:/[^\s:'\"()\[\]]+)+")
+_HEX = re.compile(r"\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{8,}\b")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+SIGNATURE_LENGTH = 200
+
+CancelledTest = collections.namedtuple("CancelledTest", ["bench", "test", "failures", "skipped", "signature"])
+
+
+def error_signature(message):
+    """Return the first non-blank line of message with paths, addresses and numbers masked.
+
+    Seeds, simulation times and run directories differ between iterations of
+    the same bug, so they must not make two failures look different.
+    """
+    for line in (message or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        line = _PATH.sub("<path>", line)
+        line = _HEX.sub("<hex>", line)
+        line = _NUMBER.sub("<n>", line)
+        return " ".join(line.split())[:SIGNATURE_LENGTH]
+    return ""
+
+
+class FailFastPolicy():
+    """Cancel queued iterations of a test after repeated matching failures.
+
+    Results are counted per IterationCfg. Once ``threshold`` iterations of a
+    test fail with the same error signature and none has passed, its queued
+    iterations (and job arrays made only of them) are skipped through
+    ``JobManager.skip_queued_jobs``; running iterations finish normally and
+    other tests are not affected. A test with any passing iteration is never
+    cancelled, since its failures depend on the seed.
+    """
+
+    def __init__(self, threshold, log):
+        if threshold < 1:
+            raise ValueError("fail-fast threshold must be positive")
+        self.threshold = threshold
+        self.log = log
+        self.cancelled = []
+        self._lock = threading.Lock()
+        self._passed = set()
+        self._failures = {}
+        self._cancelled_icfgs = set()
+
+    def test_cancelled(self, icfg):
+        with self._lock:
+            return icfg in self._cancelled_icfgs
+
+    def record(self, job, manager):
+        """Count a finished TestJob and return the jobs skipped because of it."""
+        icfg = job.icfg
+        with self._lock:
+            if icfg in self._cancelled_icfgs or icfg in self._passed:
+                return []
+            if job.jobstatus.successful:
+                self._passed.add(icfg)
+                self._failures.pop(icfg, None)
+                return []
+            signature = error_signature(getattr(job, "error_message", None))
+            failures = self._failures.setdefault(icfg, collections.Counter())
+            failures[signature] += 1
+            if failures[signature] < self.threshold:
+                return []
+            self._cancelled_icfgs.add(icfg)
+            count = failures[signature]
+
+        iterations = set(icfg.jobs)
+
+        def queued_iteration(queued):
+            members = getattr(queued, "array_members", None) or [queued]
+            return all(member in iterations for member in members)
+
+        skipped = manager.skip_queued_jobs(queued_iteration,
+                                           "{} failed {} times with the same error".format(job.name, count))
+        skipped_iterations = sum(len(getattr(queued, "array_members", None) or [queued]) for queued in skipped)
+        cancelled = CancelledTest(job.vcomper.name, job.name, count, skipped_iterations, signature)
+        with self._lock:
+            self.cancelled.append(cancelled)
+        self.log.warning("Fail-fast: %s failed %d times with the same error; skipped %d queued iteration(s): %s",
+                         job.name, count, skipped_iterations, signature or "<no error message>")
+        return skipped
@@ -0,0 +1,165 @@
+"""Cache of parsed simulator filelists and include directory listings used by compile fingerprints."""
+
+import hashlib
+import json
+import os
+import re
+import shlex
+import tempfile
+import threading
+import time
+
+from lib import digest_index
+
+FILELIST_CACHE_FILE = "filelist_graph.json"
+CACHE_SCHEMA_VERSION = 1
+# Entries not used by any run for this long are dropped when the cache is saved.
+STALE_AFTER_SECONDS = 14 * 24 * 60 * 60
+USE_REFRESH_SECONDS = 24 * 60 * 60
+
+# Quotes and backslash escapes need shlex; everything else splits on whitespace.
+_SHELL_SYNTAX_RE = re.compile(r"[\"'\\]")
+_TOKEN_RE = re.compile(r"[^ \t\r\n]+")
+
+
+def tokenize(text, posix=os.name != "nt"):
+    """Split filelist text like ``shlex.split(text, comments=True, posix=posix)``.
+
+    Lines without quotes or backslashes, the common case, are split with a
+    regular expression; a ``#`` ends the line there just as it does for
+    shlex.
+    """
+    if _SHELL_SYNTAX_RE.search(text):
+        return shlex.split(text, comments=True, posix=posix)
+    return [token for line in text.split("\n") for token in _TOKEN_RE.findall(line.split("#", 1)[0])]
+
+
+def _walk(directory):
+    files = []
+    mtimes = {}
+    for root, dirs, filenames in os.walk(directory):
+        dirs.sort()
+        try:
+            mtimes[root] = os.stat(root).st_mtime_ns
+        except OSError:
+            mtimes[root] = None
+        files.extend(os.path.join(root, filename) for filename in sorted(filenames))
+    return files, mtimes
+
+
+def _unchanged(mtimes):
+    for directory, mtime_ns in mtimes.items():
+        try:
+            if os.stat(directory).st_mtime_ns != mtime_ns:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+class FilelistCache():
+    """Tokens of each filelist keyed by its SHA-256, and files under each include or library directory.
+
+    Filelists shared by many testbenches are tokenized once; with a
+    DigestIndex their digest, and so their tokens, comes from a stat call.
+    A directory listing is reused while the mtime of every directory in the
+    tree is unchanged, which adding, removing or renaming an entry updates;
+    trees changed within the last moments are not remembered. With a path
+    the cache is kept across runs; the file is advisory and concurrent
+    writers keep the last complete copy.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._filelists = {}
+        self._directories = {}
+        self._dirty = False
+        if path:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as filep:
+                payload = json.load(filep)
+        except (OSError, ValueError):
+            return
+        if not isinstance(payload, dict) or payload.get("schema_version") != CACHE_SCHEMA_VERSION:
+            return
+        self._filelists = payload.get("filelists") or {}
+        self._directories = payload.get("directories") or {}
+
+    def _mark_used(self, entry, now):
+        # Refresh the recorded use at most daily so that cache hits rarely rewrite the file.
+        if now - entry.get("used_at", 0) > USE_REFRESH_SECONDS:
+            entry["used_at"] = now
+            self._dirty = True
+
+    def tokens(self, filelist_path, digests=None):
+        """Return the tokens of filelist_path; raises OSError or ValueError like reading and shlex would."""
+        digest = digests.sha256(filelist_path) if digests is not None else None
+        now = int(time.time())
+        with self._lock:
+            entry = self._filelists.get(digest) if digest else None
+            if entry is not None:
+                self._mark_used(entry, now)
+                return list(entry["tokens"])
+        with open(filelist_path, "rb") as filep:
+            data = filep.read()
+        tokens = tokenize(data.decode("utf-8", errors="surrogateescape"))
+        with self._lock:
+            self._filelists[digest or hashlib.sha256(data).hexdigest()] = {"tokens": tokens, "used_at": now}
+            self._dirty = True
+        return list(tokens)
+
+    def directory_files(self, directory):
+        """Return every file under directory, sorted by directory then name."""
+        now = int(time.time())
+        with self._lock:
+            entry = self._directories.get(directory)
+        if entry is not None and _unchanged(entry["mtimes"]):
+            with self._lock:
+                self._mark_used(entry, now)
+            return list(entry["files"])
+        files, mtimes = _walk(directory)
+        settled = time.time_ns() - digest_index.RACY_WINDOW_NS
+        with self._lock:
+            if all(mtime_ns is not None and mtime_ns < settled for mtime_ns in mtimes.values()):
+                self._directories[directory] = {"files": files, "mtimes": mtimes, "used_at": now}
+            else:
+                self._directories.pop(directory, None)
+            self._dirty = True
+        return list(files)
+
+    def save(self):
+        """Atomically write the cache, dropping entries no run has used recently."""
+        if not self.path:
+            return
+        oldest = int(time.time()) - STALE_AFTER_SECONDS
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {
+                "schema_version": CACHE_SCHEMA_VERSION,
+                "filelists": {
+                    key: entry
+                    for key, entry in self._filelists.items() if entry.get("used_at", 0) >= oldest
+                },
+                "directories": {
+                    key: entry
+                    for key, entry in self._directories.items() if entry.get("used_at", 0) >= oldest
+                },
+            }
+            self._dirty = False
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(prefix=".{}-".format(os.path.basename(self.path)),
+                                                      suffix=".tmp",
+                                                      dir=directory)
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as filep:
+                json.dump(payload, filep, separators=(",", ":"))
+            os.replace(temporary_path, self.path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
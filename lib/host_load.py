@@ -0,0 +1,140 @@
+"""Host load sampling and the adaptive concurrency controller for JobManager."""
+
+import collections
+import os
+import statistics
+import time
+
+HostLoad = collections.namedtuple("HostLoad", ["load1", "io_pressure", "memory_pressure"])
+
+
+def read_loadavg(path="/proc/loadavg"):
+    """Return the one-minute load average, or None when it cannot be read."""
+    try:
+        with open(path) as loadavg:
+            return float(loadavg.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def read_pressure(resource, root="/proc/pressure"):
+    """Return the PSI "some avg10" stall percentage for resource, or None.
+
+    Kernels without pressure stall information (or without permission to read
+    it) report None so callers can fall back to the load average alone.
+    """
+    try:
+        with open(os.path.join(root, resource)) as pressure:
+            for line in pressure:
+                fields = line.split()
+                if fields and fields[0] == "some":
+                    for field in fields[1:]:
+                        key, _, value = field.partition("=")
+                        if key == "avg10":
+                            return float(value)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def sample_host_load():
+    """Return the current HostLoad; unavailable readings are None."""
+    return HostLoad(read_loadavg(), read_pressure("io"), read_pressure("memory"))
+
+
+class AdaptiveJobLimit():
+    """Move JobManager's active job limit between bounds to maximize throughput.
+
+    Every ADJUST_INTERVAL_SECONDS the controller samples the load average and
+    I/O and memory pressure. Pressure above its threshold backs the limit off
+    multiplicatively; a high load average backs it off by one slot. When the
+    host has headroom and jobs are waiting for a slot the limit grows by one.
+
+    Throughput is judged from completed jobs whose ``expected_duration_s``
+    comes from their own run history (``duration_from_history``). History
+    records simulation time only, so it is compared with the job's
+    ``simulation_duration_s`` rather than its wall time, which includes
+    queueing and setup: a job that simulated for twice its expected time ran
+    at half speed, and the host's simulation rate is the limit times the mean
+    job speed. If growing the limit lowered that rate the step is reverted and
+    growth pauses for HOLD_INTERVALS intervals.
+    """
+    ADJUST_INTERVAL_SECONDS = 30.0
+    IO_PRESSURE_PERCENT = 20.0
+    MEMORY_PRESSURE_PERCENT = 10.0
+    HIGH_LOAD_PER_CPU = 1.5
+    LOW_LOAD_PER_CPU = 1.0
+    THROUGHPUT_DROP = 0.95
+    HOLD_INTERVALS = 4
+
+    def __init__(self, initial, minimum, maximum, cpu_count=None, sampler=sample_host_load, clock=time.monotonic):
+        if minimum < 1:
+            raise ValueError("adaptive job limit minimum must be positive")
+        if maximum < minimum:
+            raise ValueError("adaptive job limit maximum {} is below minimum {}".format(maximum, minimum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(maximum, initial))
+        self._cpu_count = cpu_count or os.cpu_count() or 1
+        self._sampler = sampler
+        self._clock = clock
+        self._next_update = clock() + self.ADJUST_INTERVAL_SECONDS
+        self._speeds = []
+        self._last_step = 0
+        self._last_throughput = None
+        self._hold = 0
+
+    def record_completion(self, job):
+        """Note the speed of a finished job relative to its history estimate."""
+        if not getattr(job, "duration_from_history", False):
+            return
+        expected_s = getattr(job, "expected_duration_s", None)
+        actual_s = getattr(job, "simulation_duration_s", None)
+        if expected_s and actual_s and job.jobstatus.successful:
+            self._speeds.append(expected_s / actual_s)
+
+    def update(self, saturated):
+        """Return (new_limit, reason) when the limit should change, else None.
+
+        saturated says whether ready jobs are waiting because every slot is busy.
+        """
+        now = self._clock()
+        if now < self._next_update:
+            return None
+        self._next_update = now + self.ADJUST_INTERVAL_SECONDS
+        sample = self._sampler()
+        speeds, self._speeds = self._speeds, []
+        throughput = self.limit * statistics.mean(speeds) if speeds else None
+
+        limit, reason = self._decide(sample, throughput, saturated)
+        self._last_step = limit - self.limit
+        if throughput is not None:
+            self._last_throughput = throughput
+        if limit == self.limit:
+            return None
+        self.limit = limit
+        return limit, reason
+
+    def _decide(self, sample, throughput, saturated):
+        io_pressure = sample.io_pressure or 0.0
+        memory_pressure = sample.memory_pressure or 0.0
+        load_per_cpu = (sample.load1 or 0.0) / self._cpu_count
+        back_off = max(self.minimum, min(self.limit - 1, self.limit * 3 // 4))
+        if memory_pressure >= self.MEMORY_PRESSURE_PERCENT:
+            return back_off, "memory pressure {:.1f}%".format(memory_pressure)
+        if io_pressure >= self.IO_PRESSURE_PERCENT:
+            return back_off, "I/O pressure {:.1f}%".format(io_pressure)
+        if load_per_cpu >= self.HIGH_LOAD_PER_CPU:
+            return max(self.minimum, self.limit - 1), "load average {:.1f} per CPU".format(load_per_cpu)
+        if (throughput is not None and self._last_step > 0 and self._last_throughput
+                and throughput < self._last_throughput * self.THROUGHPUT_DROP):
+            self._hold = self.HOLD_INTERVALS
+            return max(self.minimum, self.limit - 1), "throughput fell from {:.2f} to {:.2f} job speeds".format(
+                self._last_throughput, throughput)
+        if self._hold:
+            self._hold -= 1
+            return self.limit, None
+        if (saturated and load_per_cpu < self.LOW_LOAD_PER_CPU and io_pressure < self.IO_PRESSURE_PERCENT / 2
+                and memory_pressure < self.MEMORY_PRESSURE_PERCENT / 2):
+            return min(self.maximum, self.limit + 1), "host has headroom"
+        return self.limit, None
@@ -8,6 +8,8 @@ import ast
 import datetime
 import enum
 import os
+import queue
+import selectors
 import shlex
 import signal
 import socket
@@ -16,6 +18,7 @@ import threading
 import time
 
 from lib import bazel_profile
+from lib import host_load
 from lib.runtime_options import normalize_test_runtime_options
 
 
@@ -107,6 +110,14 @@ def detect_allocated_cpus(environment=None, hostname=None, affinity_getter=None,
     return min(host_cpu_count or 1, 8), "host CPU count fallback (capped at 8)"
 
 
+def detect_host_memory_mb():
+    """Return physical host memory in MiB, or None when it cannot be determined."""
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
 @enum.unique
 class JobStatus(enum.Enum):
     NOT_STARTED = 0
@@ -205,9 +216,23 @@ class Job():
 
     @property
     def execution_mode(self):
-        """Execution class used by the scheduler."""
+        """Execution class used by the scheduler.
+
+        "exclusive" jobs run alone. "parallel" and "compile" jobs share the
+        active job slots and resource pools; "compile" jobs are additionally
+        bounded by the compile job limit.
+        """
         return "exclusive"
 
+    @property
+    def resources(self):
+        """Resource claims packed against the JobManager resource pools.
+
+        Keys are pool names such as "cpu", "memory_mb" or "license:<feature>";
+        claims on resources without a configured pool are not limited.
+        """
+        return {}
+
     def __lt__(self, other):
         return self.priority < other.priority
 
@@ -306,6 +331,14 @@ class JobRunner():
     def check_for_done(self):
         raise NotImplementedError
 
+    def open_exit_fd(self):
+        """Return a new descriptor that becomes readable when the job exits.
+
+        The caller owns and closes the descriptor. Runners without exit
+        notification return None and are polled on every scheduler tick.
+        """
+        return None
+
     @property
     def returncode(self):
         raise NotImplementedError
@@ -313,6 +346,32 @@ class JobRunner():
     def print_stderr_if_failed(self):
         raise NotImplementedError
 
+    def _paused_duration_since(self, timeout_start, now):
+        duration = datetime.timedelta()
+        intervals = list(getattr(self, "_pause_intervals", ()))
+        if getattr(self, "_paused", False) and self._paused_at is not None:
+            intervals.append((self._paused_at, now))
+        for paused_at, resumed_at in intervals:
+            overlap_start = max(timeout_start, paused_at)
+            overlap_end = min(now, resumed_at)
+            if overlap_end > overlap_start:
+                duration += overlap_end - overlap_start
+        return duration
+
+    def _get_stdout_capture_path(self):
+        """Avoid clobbering simulator-owned stdout.log files.
+
+        Test jobs can ask the simulator itself to write `stdout.log` via its own
+        logging switch (for example VCS `-l stdout.log`). In that case, keep the
+        subprocess wrapper output separate so the simulator log remains
+        authoritative.
+        """
+        simulator_log_path = getattr(self.job, "_log_path", None)
+        default_stdout_log_path = os.path.join(self.job.job_dir, "stdout.log")
+        if simulator_log_path == default_stdout_log_path:
+            return os.path.join(self.job.job_dir, "job_runner.stdout.log")
+        return default_stdout_log_path
+
 
 class SubprocessJobRunner(JobRunner):
 
@@ -355,6 +414,21 @@ class SubprocessJobRunner(JobRunner):
                     stream.close()
             raise
 
+    def open_exit_fd(self):
+        pidfd_open = getattr(os, "pidfd_open", None)
+        if pidfd_open is None or self.done:
+            return None
+        try:
+            return pidfd_open(self._p.pid)
+        except OSError:
+            # Older kernels and seccomp-restricted containers fall back to polling.
+            return None
+
+    @property
+    def signal_escalation_pending(self):
+        """True while a SIGTERM/SIGKILL deadline needs scheduler polling."""
+        return getattr(self, "_timed_out", False) or getattr(self, "_orphaned_process_group", False)
+
     def _signal_process_group(self, sig):
         try:
             os.killpg(self._process_group_id, sig)
@@ -486,32 +560,6 @@ class SubprocessJobRunner(JobRunner):
         self._close_output_streams()
         return True
 
-    def _paused_duration_since(self, timeout_start, now):
-        duration = datetime.timedelta()
-        intervals = list(getattr(self, "_pause_intervals", ()))
-        if getattr(self, "_paused", False) and self._paused_at is not None:
-            intervals.append((self._paused_at, now))
-        for paused_at, resumed_at in intervals:
-            overlap_start = max(timeout_start, paused_at)
-            overlap_end = min(now, resumed_at)
-            if overlap_end > overlap_start:
-                duration += overlap_end - overlap_start
-        return duration
-
-    def _get_stdout_capture_path(self):
-        """Avoid clobbering simulator-owned stdout.log files.
-
-        Test jobs can ask the simulator itself to write `stdout.log` via its own
-        logging switch (for example VCS `-l stdout.log`). In that case, keep the
-        subprocess wrapper output separate so the simulator log remains
-        authoritative.
-        """
-        simulator_log_path = getattr(self.job, "_log_path", None)
-        default_stdout_log_path = os.path.join(self.job.job_dir, "stdout.log")
-        if simulator_log_path == default_stdout_log_path:
-            return os.path.join(self.job.job_dir, "job_runner.stdout.log")
-        return default_stdout_log_path
-
     def check_for_done(self):
         if self.done:
             return self.done
@@ -689,11 +737,183 @@ class SubprocessJobRunner(JobRunner):
             return direct_child_reaped and group_exited
 
 
+class _ExitNotifier():
+    """Report watched job exits to the scheduler from one selector thread.
+
+    Registrations are queued and applied by the notifier thread so the selector
+    is never mutated while another thread is blocked in select(). Each exit
+    descriptor is one-shot: it is unregistered and closed as soon as it fires.
+    """
+
+    def __init__(self, on_exit):
+        self._on_exit = on_exit
+        self._selector = selectors.DefaultSelector()
+        self._wake_read, self._wake_write = os.pipe()
+        os.set_blocking(self._wake_read, False)
+        os.set_blocking(self._wake_write, False)
+        self._selector.register(self._wake_read, selectors.EVENT_READ)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._closed = False
+        self._thread = threading.Thread(name="_exit_notifier", target=self._run, daemon=True)
+        self._thread.start()
+
+    def watch(self, job, exit_fd):
+        self._request(("watch", job, exit_fd))
+
+    def unwatch(self, job):
+        self._request(("unwatch", job, None))
+
+    def close(self):
+        """Stop the notifier thread; later calls, from stop() and kill() alike, do nothing."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wake_locked()
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+
+    def _request(self, request):
+        with self._lock:
+            if self._closed:
+                if request[2] is not None:
+                    os.close(request[2])
+                return
+            self._pending.append(request)
+            self._wake_locked()
+
+    def _wake_locked(self):
+        # The notifier thread clears the descriptor under the lock when it closes
+        # the pipe, so a wakeup never writes to a reused descriptor number.
+        if self._wake_write is None:
+            return
+        try:
+            os.write(self._wake_write, b"\0")
+        except (BlockingIOError, OSError):
+            pass # A full pipe already guarantees a wakeup.
+
+    def _drain_wake_pipe(self):
+        try:
+            while os.read(self._wake_read, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _run(self):
+        exit_fds = {}
+        while True:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                closed = self._closed
+            for action, job, exit_fd in pending:
+                if action == "watch":
+                    self._forget(exit_fds, job)
+                    self._selector.register(exit_fd, selectors.EVENT_READ, job)
+                    exit_fds[job] = exit_fd
+                else:
+                    self._forget(exit_fds, job)
+            if closed:
+                for job in list(exit_fds):
+                    self._forget(exit_fds, job)
+                self._selector.close()
+                with self._lock:
+                    os.close(self._wake_read)
+                    os.close(self._wake_write)
+                    self._wake_read = self._wake_write = None
+                return
+
+            exited_jobs = []
+            for key, _ in self._selector.select():
+                if key.data is None:
+                    self._drain_wake_pipe()
+                    continue
+                self._forget(exit_fds, key.data)
+                exited_jobs.append(key.data)
+            if exited_jobs:
+                self._on_exit(exited_jobs)
+
+    def _forget(self, exit_fds, job):
+        exit_fd = exit_fds.pop(job, None)
+        if exit_fd is None:
+            return
+        self._selector.unregister(exit_fd)
+        os.close(exit_fd)
+
+
+class _HookPool():
+    """Run job launch and completion hooks on a bounded set of daemon threads.
+
+    pre_run/post_run hooks render scripts, create symlinks and remove tidied
+    directories; on a slow filesystem running them on the scheduler thread
+    would stall every other launch and reap. Workers start on demand up to the
+    limit and, like the scheduler thread, never block interpreter exit.
+    """
+
+    def __init__(self, max_workers, log):
+        self._max_workers = max_workers
+        self._log = log
+        self._queue = queue.Queue()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._pending = 0
+
+    def submit(self, func, *args):
+        with self._condition:
+            self._pending += 1
+            # One worker per submitted hook, up to the limit: a burst after an
+            # idle spell must not queue behind the few workers still around.
+            if len(self._threads) < min(self._max_workers, self._pending):
+                thread = threading.Thread(name="job_hooks_{}".format(len(self._threads)), target=self._run, daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        self._queue.put((func, args))
+
+    def owns_current_thread(self):
+        return threading.current_thread() in self._threads
+
+    def join(self, timeout=None):
+        """Wait for every submitted hook; return False if timeout seconds elapse first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self):
+        """Stop idle workers; hooks still running finish on their own."""
+        with self._condition:
+            threads = list(self._threads)
+        for _ in threads:
+            self._queue.put(None)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            func, args = item
+            try:
+                func(*args)
+            except Exception as exc: # Hooks record their own failures; never lose a worker.
+                self._log.error("Job hook %s failed: %s", getattr(func, "__name__", func), exc)
+            finally:
+                with self._condition:
+                    self._pending -= 1
+                    self._condition.notify_all()
+
+
 class JobManager():
     """Manages multiple concurrent jobs"""
     POLL_SLEEP_SECONDS = 0.25
+    # Jobs with exit notification are only walked this often, for timeouts.
+    TIMEOUT_POLL_SECONDS = 5.0
     ACTIVE_KILL_JOIN_SECONDS = (SubprocessJobRunner.TERM_GRACE_SECONDS + 2 * SubprocessJobRunner.KILL_GRACE_SECONDS + 1)
     SHUTDOWN_JOIN_SECONDS = ACTIVE_KILL_JOIN_SECONDS
+    DEFAULT_HOOK_WORKERS = 8
 
     def __init__(self, options, log):
         self.log = log
@@ -703,6 +923,29 @@ class JobManager():
         self.active_job_limit = int(options.get('active_job_limit', 1))
         if self.active_job_limit < 1:
             raise ValueError("active_job_limit must be positive")
+        self.compile_job_limit = options.get('compile_job_limit')
+        if self.compile_job_limit is not None and self.compile_job_limit < 1:
+            raise ValueError("compile_job_limit must be positive")
+        # With adaptive limits, active_job_limit moves between these bounds
+        # as host load and I/O pressure change.
+        self._adaptive_limit = None
+        adaptive_limits = options.get('adaptive_job_limits')
+        if adaptive_limits:
+            self._adaptive_limit = host_load.AdaptiveJobLimit(self.active_job_limit, *adaptive_limits)
+            self.active_job_limit = self._adaptive_limit.limit
+        max_job_limit = self._adaptive_limit.maximum if self._adaptive_limit else self.active_job_limit
+        # pre_run/post_run hooks run on this many worker threads, so a slow
+        # filesystem delays only the job being prepared or finalized.
+        self.hook_workers = options.get('hook_workers')
+        if self.hook_workers is None:
+            self.hook_workers = min(max_job_limit, self.DEFAULT_HOOK_WORKERS)
+        self.hook_workers = int(self.hook_workers)
+        if self.hook_workers < 1:
+            raise ValueError("hook_workers must be positive")
+        self.resource_pools = dict(options.get('resource_pools') or {})
+        for resource, capacity in self.resource_pools.items():
+            if capacity <= 0:
+                raise ValueError("resource pool '{}' must be positive".format(resource))
 
         self._quit_count = options['quit_count']
         if self._quit_count < 1:
@@ -720,6 +963,11 @@ class JobManager():
         # This list is maintained in sorted priority order
         self._todo = []
 
+        # Unfinished dependencies of each job in _todo, and the _todo jobs whose
+        # last dependency finished since the scheduler last promoted jobs.
+        self._unmet_dependencies = {}
+        self._unblocked = []
+
         # Jobs ready to launch (all dependencies met)
         # This list is maintained in sorted priority order
         self._ready = []
@@ -741,12 +989,24 @@ class JobManager():
         self._condition = threading.Condition(threading.RLock())
         self._launching = []
 
+        # Active jobs whose exit descriptor has not fired yet. Everything else
+        # in _active is polled on each scheduler tick.
+        self._exit_watched = set()
+        self._next_timeout_poll = time.monotonic()
+        self._exit_notifier = _ExitNotifier(self._jobs_exited)
+        self._hooks = _HookPool(self.hook_workers, log)
+
         self._run_jobs_thread = threading.Thread(name="_run_jobs", target=self._run_jobs, daemon=True)
         self._run_jobs_thread.daemon = True
         self._run_jobs_thread_active = True
         self._run_jobs_thread.start()
 
         self.job_lib_type = SubprocessJobRunner
+        # Optional runner for "parallel" jobs, e.g. a batch-system submitter.
+        self.parallel_job_lib_type = None
+        # Optional run_journal.RunJournal that records launches and results of
+        # jobs with a journal_key, so an interrupted run can be resumed.
+        self.journal = None
 
         self._last_done_or_idle_print = datetime.datetime.now()
 
@@ -759,30 +1019,61 @@ class JobManager():
         for jq in job_queues:
             log_fn("%s: %s", jq, list(getattr(self, jq)))
 
+    def _debug_state_locked(self):
+        """Log queue lengths only; the full queues are printed on the idle-print interval."""
+        self.log.debug("Queues: %d todo, %d ready, %d launching, %d active, %d finalizing, %d done, %d skipped",
+                       len(self._todo), len(self._ready), len(self._launching), len(self._active),
+                       len(self._finalizing), len(self._done), len(self._skipped))
+
+    def _jobs_exited(self, jobs):
+        """Exit notifier callback: stop watching and wake the scheduler."""
+        with self._condition:
+            for job in jobs:
+                self._exit_watched.discard(job)
+            self._condition.notify_all()
+
+    def _jobs_to_check_locked(self):
+        now = time.monotonic()
+        if now >= self._next_timeout_poll:
+            self._next_timeout_poll = now + self.TIMEOUT_POLL_SECONDS
+            return list(self._active)
+        return [
+            job for job in self._active
+            if job not in self._exit_watched or getattr(job.job_lib, "signal_escalation_pending", False)
+        ]
+
+    def _poll_timeout_locked(self):
+        if any(job not in self._exit_watched or getattr(job.job_lib, "signal_escalation_pending", False)
+               for job in self._active):
+            return self.POLL_SLEEP_SECONDS
+        return max(0, self._next_timeout_poll - time.monotonic())
+
+    def _forget_exit_watch_locked(self, job):
+        if job in self._exit_watched:
+            self._exit_watched.discard(job)
+            self._exit_notifier.unwatch(job)
+
     def _run_jobs(self):
         while True:
             with self._condition:
                 if not self._run_jobs_thread_active:
                     return
                 self._move_todo_to_ready_locked()
+                self._adapt_job_limit_locked()
                 job_to_launch = self._take_ready_job_locked()
-                active_jobs = list(self._active)
                 self._condition.notify_all()
-                if job_to_launch is None and not active_jobs:
+                if job_to_launch is None and not self._active:
                     self._condition.wait()
                     continue
+                jobs_to_check = [] if job_to_launch is not None else self._jobs_to_check_locked()
 
             if job_to_launch is not None:
-                self._launch_job(job_to_launch)
+                # The job stays in _launching, holding its slot, until the hook worker finishes.
+                self._hooks.submit(self._launch_job, job_to_launch)
                 continue
 
-            completed_job = None
-            for job in active_jobs:
-                if job.job_lib.check_for_done():
-                    completed_job = job
-                    break
-
-            if completed_job is not None:
+            completed_jobs = [job for job in jobs_to_check if job.job_lib.check_for_done()]
+            for completed_job in completed_jobs:
                 if getattr(completed_job.job_lib, "shutdown_incomplete", False):
                     self._record_incomplete_shutdown(completed_job)
                     continue
@@ -792,9 +1083,11 @@ class JobManager():
                     if completed_job not in self._active:
                         continue
                     self._active.remove(completed_job)
+                    self._forget_exit_watch_locked(completed_job)
                     self._finalizing.append(completed_job)
                     self._condition.notify_all()
-                self._complete_job(completed_job)
+                self._hooks.submit(self._complete_job, completed_job)
+            if completed_jobs:
                 continue
 
             now = datetime.datetime.now()
@@ -802,9 +1095,24 @@ class JobManager():
                 if now - self._last_done_or_idle_print > self.idle_print_interval:
                     self._last_done_or_idle_print = now
                     self._print_state_locked(self.log.info)
-                self._condition.wait(timeout=self.POLL_SLEEP_SECONDS)
+                # Exit notifications and queue changes notify this condition;
+                # the timeout only covers polled runners and timeout bookkeeping.
+                self._condition.wait(timeout=self._poll_timeout_locked())
+
+    def _adapt_job_limit_locked(self):
+        if self._adaptive_limit is None:
+            return
+        running = len(self._active) + len(self._launching)
+        saturated = bool(self._ready) and running >= self.active_job_limit
+        change = self._adaptive_limit.update(saturated)
+        if change is None:
+            return
+        limit, reason = change
+        self.log.info("Adjusting active job limit %d -> %d (%s)", self.active_job_limit, limit, reason)
+        self.active_job_limit = limit
 
     def _move_children_to_skipped_locked(self, job):
+        unmet_dependencies = getattr(self, "_unmet_dependencies", {})
         for child in job._children:
             self.log.info("Skipping job %s due to dependency (%s) failure", child, job)
             try:
@@ -816,6 +1124,7 @@ class JobManager():
                 # if child not in self._skipped:
                 #    raise ValueError("Couldn't find child job to mark as skipped")
                 continue
+            unmet_dependencies.pop(child, None)
             self._skipped.append(child)
             self._move_children_to_skipped_locked(child)
 
@@ -825,50 +1134,105 @@ class JobManager():
             self._move_children_to_skipped_locked(job)
             self._condition.notify_all()
 
+    def skip_queued_jobs(self, predicate, reason):
+        """Skip every queued job matching predicate, and its dependents; return the jobs skipped.
+
+        Only jobs still waiting in _todo or _ready are affected. Jobs that are
+        launching, running or finalizing finish normally.
+        """
+        skipped = []
+        with self._condition:
+            for queue_name in ("_todo", "_ready"):
+                kept = []
+                for job in getattr(self, queue_name):
+                    (skipped if predicate(job) else kept).append(job)
+                setattr(self, queue_name, kept)
+            for job in skipped:
+                self.log.info("Skipping job %s: %s", job, reason)
+                self._unmet_dependencies.pop(job, None)
+                job.jobstatus = JobStatus.SKIPPED
+                self._skipped.append(job)
+                self._move_children_to_skipped_locked(job)
+            self._condition.notify_all()
+        return skipped
+
+    def _track_dependencies_locked(self, job):
+        """Record which dependencies still block a newly queued job."""
+        unmet = {dep for dep in job._dependencies if not dep.jobstatus.completed}
+        self._unmet_dependencies[job] = unmet
+        if not unmet:
+            self._unblocked.append(job)
+
+    def _release_children_locked(self, job):
+        """Mark a completed job as met for its queued children."""
+        for child in job._children:
+            unmet = self._unmet_dependencies.get(child)
+            if unmet is None or job not in unmet:
+                continue
+            unmet.discard(job)
+            if not unmet:
+                self._unblocked.append(child)
+
     def _move_todo_to_ready_locked(self):
-        self._print_state_locked(self.log.debug)
-        jobs_that_advanced_state = []
-        for i, job in enumerate(self._todo):
-            if len(job._dependencies) == 0:
-                # There are no dependencies
+        if not self._unblocked:
+            return
+        unblocked, self._unblocked = self._unblocked, []
+        jobs_that_advanced_state = set()
+        for job in unblocked:
+            if self._unmet_dependencies.pop(job, None) is None:
+                continue # Already skipped by a failed dependency
+            jobs_that_advanced_state.add(job)
+            if all(dep.jobstatus.successful for dep in job._dependencies):
                 bisect.insort_right(self._ready, job)
-                jobs_that_advanced_state.append(i)
             else:
-                all_dependencies_are_done = all([dep.jobstatus.completed for dep in job._dependencies])
-                if not all_dependencies_are_done:
-                    continue
-                all_dependencies_passed = all([dep.jobstatus.successful for dep in job._dependencies])
-                if all_dependencies_passed:
-                    bisect.insort_right(self._ready, job)
-                    jobs_that_advanced_state.append(i)
-                else:
-                    self.log.error("Skipping job %s due dependency failure", job)
-                    jobs_that_advanced_state.append(i)
-                    self._skipped.append(job)
-                    job.jobstatus = JobStatus.SKIPPED
+                self.log.error("Skipping job %s due dependency failure", job)
+                self._skipped.append(job)
+                job.jobstatus = JobStatus.SKIPPED
 
-        # Can't iterate and remove in list at the same time easily
-        for i in reversed(jobs_that_advanced_state):
-            self._todo.pop(i)
+        self._todo = [job for job in self._todo if job not in jobs_that_advanced_state]
+        self._debug_state_locked()
 
     def _can_launch_locked(self, job):
         running_jobs = self._active + self._launching
+        # Hooks run off the scheduler thread, so an exclusive job also excludes,
+        # and is excluded by, jobs whose post_run is still finalizing.
         if job.execution_mode == "exclusive":
-            return len(running_jobs) == 0
-        if job.execution_mode != "parallel":
+            return len(running_jobs) == 0 and len(self._finalizing) == 0
+        if job.execution_mode not in ("parallel", "compile"):
             raise ValueError("Unknown execution mode '{}'".format(job.execution_mode))
-        if any(active_job.execution_mode != "parallel" for active_job in running_jobs):
+        if any(active_job.execution_mode == "exclusive" for active_job in running_jobs + self._finalizing):
+            return False
+        if len(running_jobs) >= self.active_job_limit:
             return False
-        return len(running_jobs) < self.active_job_limit
+        if job.execution_mode == "compile" and self.compile_job_limit is not None:
+            running_compiles = sum(1 for active_job in running_jobs if active_job.execution_mode == "compile")
+            if running_compiles >= self.compile_job_limit:
+                return False
+        return self._resources_available_locked(job, running_jobs)
+
+    def _resources_available_locked(self, job, running_jobs):
+        """Return whether job's claims fit in the pools next to running_jobs.
+
+        A claim larger than its whole pool is admitted once nothing else holds
+        that resource, so an oversized job runs alone rather than never.
+        """
+        for resource, amount in job.resources.items():
+            capacity = self.resource_pools.get(resource)
+            if capacity is None or amount <= 0:
+                continue
+            in_use = sum(running_job.resources.get(resource, 0) for running_job in running_jobs)
+            if in_use and in_use + amount > capacity:
+                return False
+        return True
 
     def _take_ready_job_locked(self):
-        self._print_state_locked(self.log.debug)
         if self._paused:
             return None
         for index, job in enumerate(self._ready):
             if self._can_launch_locked(job):
                 self._ready.pop(index)
                 self._launching.append(job)
+                self._debug_state_locked()
                 return job
         return None
 
@@ -878,7 +1242,10 @@ class JobManager():
             job.pre_run()
             job.raise_if_cancelled()
             self.log.debug("%s priority: %d", job, job.priority)
-            runner = self.job_lib_type(job, self)
+            runner_type = self.job_lib_type
+            if job.execution_mode == "parallel" and self.parallel_job_lib_type is not None:
+                runner_type = self.parallel_job_lib_type
+            runner = runner_type(job, self)
         except JobCancelledError as exc:
             self.log.info("%s", exc)
             job.job_stop_time = datetime.datetime.now()
@@ -892,6 +1259,8 @@ class JobManager():
                 if job in self._launching:
                     self._launching.remove(job)
                 self._skipped.append(job)
+                self._release_children_locked(job)
+                self._move_todo_to_ready_locked()
                 self._condition.notify_all()
             return
         except (Exception, SystemExit) as exc:
@@ -902,6 +1271,7 @@ class JobManager():
                 job.launch_failed(exc)
             except (Exception, SystemExit) as record_exc:
                 self.log.error("Could not record launch failure for %s: %s", job, record_exc)
+            self._journal_job(job)
             with self._condition:
                 self._launching.remove(job)
                 self._error_count += 1
@@ -913,16 +1283,24 @@ class JobManager():
                 self._condition.notify_all()
             return
 
+        self._journal_job(job, "LAUNCHED")
         cancel_runner = False
         pause_runner = False
+        exit_fd = self._open_exit_fd(runner)
         with self._condition:
             self._launching.remove(job)
             if self._run_jobs_thread_active:
                 self._active.append(job)
+                if exit_fd is not None:
+                    self._exit_watched.add(job)
+                    self._exit_notifier.watch(job, exit_fd)
+                    exit_fd = None
                 pause_runner = self._paused
             else:
                 cancel_runner = True
             self._condition.notify_all()
+        if exit_fd is not None:
+            os.close(exit_fd)
         if pause_runner:
             try:
                 runner.pause()
@@ -952,6 +1330,24 @@ class JobManager():
                     self._shutdown_incomplete = True
                     self._condition.notify_all()
 
+    def _journal_job(self, job, state=None):
+        if self.journal is None:
+            return
+        try:
+            self.journal.record(job, state)
+        except OSError as exc:
+            self.log.warning("Could not journal %s for %s: %s", state or job.jobstatus, job, exc)
+
+    def _open_exit_fd(self, runner):
+        open_exit_fd = getattr(runner, "open_exit_fd", None)
+        if open_exit_fd is None:
+            return None
+        try:
+            return open_exit_fd()
+        except Exception as exc:
+            self.log.debug("Exit notification unavailable for %s; polling instead: %s", runner, exc)
+            return None
+
     def _complete_job(self, job):
         self.log.debug("%s body done", job)
         try:
@@ -964,8 +1360,11 @@ class JobManager():
                 job.post_run_failed(exc)
             except (Exception, SystemExit) as record_exc:
                 self.log.error("%s failed to record post_run failure:\n%s", job, record_exc)
+        self._journal_job(job)
 
         with self._condition:
+            if self._adaptive_limit is not None and job.execution_mode == "parallel":
+                self._adaptive_limit.record_completion(job)
             if not job.jobstatus.successful:
                 self._error_count += 1
                 if self._error_count >= self._quit_count:
@@ -974,6 +1373,7 @@ class JobManager():
             self._finalizing.remove(job)
             self._last_done_or_idle_print = datetime.datetime.now()
             self._done.append(job)
+            self._release_children_locked(job)
             self._move_todo_to_ready_locked()
             self._condition.notify_all()
 
@@ -991,6 +1391,7 @@ class JobManager():
             if job not in self._active:
                 return
             self._active.remove(job)
+            self._forget_exit_watch_locked(job)
             self._shutdown_incomplete = True
             self._error_count += 1
             self._move_children_to_skipped_locked(job)
@@ -1010,6 +1411,8 @@ class JobManager():
                 job.jobstatus = JobStatus.SKIPPED
         self._skipped.extend(self._todo)
         self._todo = []
+        self._unmet_dependencies = {}
+        self._unblocked = []
         self._skipped.extend(self._ready)
         self._ready = []
 
@@ -1019,6 +1422,7 @@ class JobManager():
         with self._condition:
             if not self._done_grace_exit and self._run_jobs_thread_active:
                 bisect.insort_right(self._todo, job)
+                self._track_dependencies_locked(job)
             else:
                 self._skipped.append(job)
             self._condition.notify_all()
@@ -1038,6 +1442,10 @@ class JobManager():
             self._condition.notify_all()
         if threading.current_thread() is not self._run_jobs_thread:
             self._run_jobs_thread.join()
+        if not self._hooks.owns_current_thread():
+            self._hooks.join()
+        self._hooks.close()
+        self._exit_notifier.close()
 
     @property
     def paused(self):
@@ -1131,6 +1539,8 @@ class JobManager():
                     job.jobstatus = JobStatus.SKIPPED
             self._skipped.extend(self._todo)
             self._todo = []
+            self._unmet_dependencies = {}
+            self._unblocked = []
             self._skipped.extend(self._ready)
             self._ready = []
             self._condition.notify_all()
@@ -1167,11 +1577,16 @@ class JobManager():
             self.log.warning("Timed out waiting for active job shutdown: %s", ", ".join(unfinished_kills))
 
         scheduler_finished = True
-        if threading.current_thread() is not self._run_jobs_thread:
+        if threading.current_thread() is not self._run_jobs_thread and not self._hooks.owns_current_thread():
+            shutdown_deadline = time.monotonic() + self.SHUTDOWN_JOIN_SECONDS
             self._run_jobs_thread.join(timeout=self.SHUTDOWN_JOIN_SECONDS)
-            if self._run_jobs_thread.is_alive():
+            hooks_finished = self._hooks.join(timeout=max(0, shutdown_deadline - time.monotonic()))
+            if self._run_jobs_thread.is_alive() or not hooks_finished:
                 scheduler_finished = False
                 self.log.warning("Timed out waiting for scheduler launch hook to stop")
+        if scheduler_finished:
+            self._hooks.close()
+            self._exit_notifier.close()
         first_error = next((error for error in errors if error is not None), None)
         if first_error is not None:
             raise first_error
@@ -1214,6 +1629,12 @@ class BazelTBJob(Job):
             command.extend(self.bazel_targets)
             self.main_cmdline = shlex.join(command)
 
+    @property
+    def execution_mode(self):
+        # Concurrent Bazel commands queue on the output base lock, so pipelined
+        # builds only need to stay within the compile job limit.
+        return "compile" if getattr(self.rcfg.options, "pipeline_compile", False) else "exclusive"
+
     def _cached_test_cfg_output_exists(self, project_dir, target):
         package, target_name = target.split(":", 1)
         output_dir = os.path.join(project_dir, "bazel-bin", package[2:])
@@ -1269,6 +1690,10 @@ class BazelTestCfgJob(Job):
         else:
             self.main_cmdline = "bazel build {}".format(" ".join(self.bazel_targets))
 
+    @property
+    def execution_mode(self):
+        return "compile" if getattr(self.rcfg.options, "pipeline_compile", False) else "exclusive"
+
     def post_run(self):
         super(BazelTestCfgJob, self).post_run()
         if self.job_lib.returncode == 0:
@@ -2,9 +2,9 @@
 
 ################################################################################
 # standard lib imports
+import argparse
 import ast
 from contextlib import contextmanager
-import fnmatch
 import hashlib
 import os
 import re
@@ -17,7 +17,7 @@ import time
 
 ################################################################################
 # rules_verilog lib imports
-from lib import bazel_profile, rv_utils
+from lib import bazel_events, bazel_profile, content_store, digest_index, discovery_daemon, rv_utils, test_selection
 
 # I'd rather create a "plain" message in the logger
 # that doesn't format, but more work than its worth
@@ -41,8 +41,13 @@ DISCOVERY_ROOT_FILES = {
     "WORKSPACE",
     "WORKSPACE.bazel",
 }
-DISCOVERY_MAX_ARG_CHARS = 100000
 DISCOVERY_MAX_SOURCE_RETRIES = 2
+DISCOVERY_DIGEST_INDEX_FILE = "discovery_digests.json"
+SHARED_DISCOVERY_KIND = "discovery"
+DISCOVERY_OUTPUT_GROUP = "verilog_dv_test_cfg_info"
+DISCOVERY_TEST_CFG_INFO_RE = re.compile(
+    r'verilog_dv_test_cfg_info\(@(?:@)?(?P<test>[^,]+), @(?:@)?(?P<vcomp>[^,]+), (?P<tags>\[.*\]), (?P<simulator>[A-Z0-9_]+)\)'
+)
 DISCOVERY_GIT_METADATA_PATHS = (
     "BUILD",
     "BUILD.bazel",
@@ -60,6 +65,43 @@ def resolve_report_generation(report_option, total_simulations):
     return report_option
 
 
+def run_discovery_daemon_command(proj_dir, action, log):
+    """Run, query or stop the discovery daemon of proj_dir; return the exit status."""
+    if action == "status":
+        reply = discovery_daemon.request(proj_dir, {"op": "status"})
+        if reply is None:
+            log.info("No discovery daemon is running for %s", proj_dir)
+            return 1
+        watching = "watching {} directories".format(reply["watches"]) if reply["watching"] else "not watching"
+        log.info("Discovery daemon pid %s holds %d discovery scope(s), %s", reply["pid"], reply["scopes"], watching)
+        return 0
+    if action == "stop":
+        if discovery_daemon.request(proj_dir, {"op": "shutdown"}) is None:
+            log.info("No discovery daemon is running for %s", proj_dir)
+            return 1
+        log.info("Stopped the discovery daemon for %s", proj_dir)
+        return 0
+
+    workspace = RegressionConfig.workspace_only(proj_dir, log)
+    daemon = discovery_daemon.DiscoveryDaemon(
+        proj_dir,
+        workspace._discovery_dependency_manifest,
+        RegressionConfig._is_discovery_dependency,
+        extra_files=list(workspace._bazelrc_dependency_paths()),
+        skip_dirs=[workspace.regression_dir],
+        log=log,
+    )
+    log.info("Serving test discovery for %s on %s", proj_dir, daemon.path)
+    try:
+        daemon.serve()
+    except RuntimeError as exc:
+        log.error("%s", exc)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
 class RegressionConfig():
     """Configuration class for managing regression tests"""
 
@@ -134,6 +176,16 @@ class RegressionConfig():
                 "tidy=%s passing tests will automatically be cleaned up. Use --nt to prevent automatic cleanup.",
                 self.tidy)
 
+    @classmethod
+    def workspace_only(cls, proj_dir, log):
+        """Return a config that only computes workspace discovery dependencies, without running discovery."""
+        config = cls.__new__(cls)
+        config.options = argparse.Namespace(proj_dir=proj_dir, tests=[], allow_no_run=False, rehash_discovery=False)
+        config.log = log
+        config.proj_dir = proj_dir
+        config.regression_dir = rv_utils.calc_simresults_location(proj_dir)
+        return config
+
     def _profile_step(self, name, detail, func):
         start = time.perf_counter()
         try:
@@ -375,6 +427,9 @@ class RegressionConfig():
                 legacy_manifest = None
             if legacy_manifest is not None and self._same_discovery_scope(legacy_manifest, manifest):
                 self._remove_legacy_discovery_cache_locked()
+        if manifest.get("cacheable", True):
+            self._publish_to_discovery_daemon(manifest, self.all_vcomp, self.tests_to_tags, self.tests_to_simulator)
+            self._publish_shared_discovery(manifest)
 
     def _warn_if_discovery_uncacheable(self, manifest):
         reason = manifest.get("uncacheable_reason")
@@ -397,19 +452,32 @@ class RegressionConfig():
         except ValueError:
             return real_path.replace(os.sep, "/")
 
+    def _discovery_digest_index(self):
+        """Return this run's index of discovery dependency digests.
+
+        Files whose size, mtime, inode and ctime match the previous run are
+        not read again; --rehash-discovery ignores the stored digests.
+        """
+        index = getattr(self, "_digest_index", None)
+        if index is None:
+            index = digest_index.DigestIndex(self._cache_path(DISCOVERY_DIGEST_INDEX_FILE),
+                                             force=bool(getattr(self.options, "rehash_discovery", False)))
+            self._digest_index = index
+        return index
+
     def _discovery_dependency_manifest(self):
         submodule_state = self._git_submodule_state()
         project_root = os.path.realpath(self.proj_dir)
         dependency_paths = sorted(set(self._iter_discovery_dependency_paths(submodule_state)))
+        digests = self._discovery_digest_index()
         files = []
         for path in dependency_paths:
             relative_path = self._manifest_relative_path(path, project_root)
-            try:
-                with open(path, "rb") as filep:
-                    digest = hashlib.sha256(filep.read()).hexdigest()
-            except OSError:
-                digest = "missing"
-            files.append({"path": relative_path, "sha256": digest})
+            files.append({"path": relative_path, "sha256": digests.sha256(path) or "missing"})
+        try:
+            digests.save(prune=True)
+        except OSError as exc:
+            self.log.debug("Could not save discovery digest index %s: %s", digests.path, exc)
         manifest = {
             "schema_version": 5,
             "cacheable": True,
@@ -564,23 +632,175 @@ class RegressionConfig():
             return False
         return True
 
+    @staticmethod
+    def _discovery_bench_package(vcomp):
+        return vcomp.split(":")[0].lstrip("/")
+
+    def _stale_discovery_vcomps(self, cached_manifest, current_manifest, all_vcomp):
+        """Return the cached benches a manifest change invalidates, or None when all of them are.
+
+        Only BUILD files under a bench's tests directory are attributed to
+        that bench, together with every other bench whose tests BUILD files
+        name the changed package, since their test cfgs may inherit from it.
+        A change to any other file (workspace, .bazelrc, any .bzl, the bench's
+        own BUILD, a new bench directory) or to the Git submodules can affect
+        every bench, so it invalidates the whole cache.
+        """
+        if ({
+                key: value
+                for key, value in cached_manifest.items() if key != "files"
+        } != {
+                key: value
+                for key, value in current_manifest.items() if key != "files"
+        }):
+            return None
+        cached_files = {entry["path"]: entry["sha256"] for entry in cached_manifest.get("files", [])}
+        current_files = {entry["path"]: entry["sha256"] for entry in current_manifest.get("files", [])}
+        bench_tests_dirs = {vcomp: self._discovery_bench_package(vcomp) + "/tests/" for vcomp in all_vcomp}
+        stale_vcomps = set()
+        changed_packages = set()
+        for path in set(cached_files) | set(current_files):
+            if cached_files.get(path) == current_files.get(path):
+                continue
+            if os.path.basename(path) not in ("BUILD", "BUILD.bazel"):
+                return None
+            owners = [tests_dir for tests_dir in bench_tests_dirs.values() if path.startswith(tests_dir)]
+            if not owners:
+                return None
+            owner = max(owners, key=len)
+            stale_vcomps.update(vcomp for vcomp, tests_dir in bench_tests_dirs.items() if tests_dir == owner)
+            changed_packages.add(os.path.dirname(path))
+        changed_labels = ["//{}".format(package) for package in sorted(changed_packages)]
+        for vcomp, tests_dir in bench_tests_dirs.items():
+            if vcomp not in stale_vcomps and self._build_files_reference(current_files, tests_dir, changed_labels):
+                stale_vcomps.add(vcomp)
+        return stale_vcomps
+
+    def _build_files_reference(self, files, tests_dir, labels):
+        """Return whether a BUILD file under tests_dir mentions any of labels; unreadable files count as yes."""
+        for path in files:
+            if not path.startswith(tests_dir) or os.path.basename(path) not in ("BUILD", "BUILD.bazel"):
+                continue
+            try:
+                with open(os.path.join(self.proj_dir, path), encoding="utf-8", errors="surrogateescape") as filep:
+                    contents = filep.read()
+            except OSError:
+                return True
+            if any(label in contents for label in labels):
+                return True
+        return False
+
+    def _lookup_discovery_daemon(self):
+        if getattr(self.options, "rehash_discovery", False):
+            return None
+        discovery = discovery_daemon.lookup(self.proj_dir, self._discovery_scope_id())
+        if not isinstance(discovery, dict):
+            return None
+        generation = tuple(discovery.get(name) for name in ("all_vcomp", "tests_to_tags", "tests_to_simulator"))
+        if any(not isinstance(item, dict) for item in generation):
+            return None
+        return generation
+
+    def _publish_to_discovery_daemon(self, manifest, all_vcomp, tests_to_tags, tests_to_simulator):
+        discovery_daemon.publish(self.proj_dir, self._discovery_scope_id(), manifest, {
+            "all_vcomp": all_vcomp,
+            "tests_to_tags": tests_to_tags,
+            "tests_to_simulator": tests_to_simulator,
+        })
+
+    def _shared_discovery_store(self):
+        shared_dir = getattr(self.options, "shared_discovery_cache", None)
+        return content_store.ContentStore(shared_dir) if shared_dir else None
+
+    def _shared_discovery_key(self, manifest):
+        """Return the shared cache key of a manifest, independent of the checkout location.
+
+        Files outside the project (user and system .bazelrc files) differ in
+        path between users, so only their name and content take part.
+        """
+        files = []
+        for entry in manifest.get("files", []):
+            path = entry["path"]
+            if path.startswith("../") or os.path.isabs(path):
+                path = "<external>/{}".format(os.path.basename(path))
+            files.append([path, entry["sha256"]])
+        portable_manifest = dict(manifest, files=sorted(files))
+        return content_store.content_key({"scope": self._discovery_scope(), "manifest": portable_manifest})
+
+    def _read_shared_discovery(self, manifest):
+        store = self._shared_discovery_store()
+        if store is None or not manifest.get("cacheable", True):
+            return None
+        key = self._shared_discovery_key(manifest)
+        payload = store.read_json(SHARED_DISCOVERY_KIND, key)
+        if not isinstance(payload, dict) or payload.get("schema_version") != DISCOVERY_CACHE_SCHEMA_VERSION:
+            return None
+        generation = tuple(payload.get(name) for name in ("all_vcomp", "tests_to_tags", "tests_to_simulator"))
+        if payload.get("key") != key or any(not isinstance(item, dict) for item in generation):
+            return None
+        return generation
+
+    def _publish_shared_discovery(self, manifest):
+        store = self._shared_discovery_store()
+        if store is None:
+            return
+        key = self._shared_discovery_key(manifest)
+        payload = {
+            "schema_version": DISCOVERY_CACHE_SCHEMA_VERSION,
+            "key": key,
+            "all_vcomp": self.all_vcomp,
+            "tests_to_tags": self.tests_to_tags,
+            "tests_to_simulator": self.tests_to_simulator,
+        }
+        try:
+            if store.publish_json(SHARED_DISCOVERY_KIND, key, payload):
+                self.log.debug("Published test discovery to the shared cache as %s", key)
+        except OSError as exc:
+            self.log.debug("Could not publish test discovery to the shared cache %s: %s", store.root, exc)
+
+    def _use_shared_discovery(self, manifest):
+        generation = self._read_shared_discovery(manifest)
+        if generation is None:
+            return False
+        self.all_vcomp, self.tests_to_tags, self.tests_to_simulator = generation
+        self._publish_discovery_cache(manifest)
+        self._cached_discovery = generation
+        self._partial_discovery = None
+        self.log.info("Using test discovery from the shared cache")
+        return True
+
     def _should_use_cached_discovery(self):
+        daemon_discovery = self._lookup_discovery_daemon()
+        if daemon_discovery is not None:
+            self._cached_discovery = daemon_discovery
+            self.log.info("Using test discovery from the discovery daemon")
+            return True
         if not os.path.exists(self._discovery_cache_path()) and not self._have_legacy_discovery_cache():
-            return False
+            if self._shared_discovery_store() is None:
+                return False
+            return self._use_shared_discovery(self._discovery_dependency_manifest())
         current_manifest = self._discovery_dependency_manifest()
         try:
             all_vcomp, tests_to_tags, tests_to_simulator, cached_manifest = self._read_or_migrate_discovery_cache(
                 current_manifest)
         except (OSError, ValueError, json.JSONDecodeError):
-            return False
+            return self._use_shared_discovery(current_manifest)
         if not cached_manifest.get("cacheable", True):
             self._warn_if_discovery_uncacheable(cached_manifest)
             return False
         if cached_manifest != current_manifest:
             self.log.debug("Discovery cache dependency manifest changed")
+            if self._use_shared_discovery(current_manifest):
+                return True
+            stale_vcomps = self._stale_discovery_vcomps(cached_manifest, current_manifest, all_vcomp)
+            if stale_vcomps is not None:
+                self._partial_discovery = (all_vcomp, tests_to_tags, tests_to_simulator, stale_vcomps)
+                self.log.info("Refreshing test discovery for %d of %d cached benches", len(stale_vcomps),
+                              len(all_vcomp))
             return False
 
         self._cached_discovery = (all_vcomp, tests_to_tags, tests_to_simulator)
+        self._publish_to_discovery_daemon(current_manifest, all_vcomp, tests_to_tags, tests_to_simulator)
         self.log.info("Using cached test discovery")
         return True
 
@@ -674,22 +894,71 @@ class RegressionConfig():
                         os.remove(profile_path)
         return result.returncode, result.stdout, result.stderr
 
+    @contextmanager
+    def _discovery_argument_file(self, kind, lines):
+        """Yield a temporary file holding one discovery argument per line.
+
+        Bazel reads query expressions and target patterns from a file, so
+        discovery issues a single invocation however many targets a project
+        has instead of one invocation per command-line sized chunk.
+        """
+        cache_dir = os.path.dirname(self._cache_path(self._discovery_cache_relative_path()))
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix=".{}_".format(kind), suffix=".txt", dir=cache_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as argument_file:
+                argument_file.write("".join("{}\n".format(line) for line in lines))
+            yield path
+        finally:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
     @staticmethod
-    def _chunk_arguments(arguments, max_chars=DISCOVERY_MAX_ARG_CHARS):
-        chunks = []
-        current = []
-        current_chars = 0
-        for argument in arguments:
-            argument_chars = len(argument) + 1
-            if current and current_chars + argument_chars > max_chars:
-                chunks.append(current)
-                current = []
-                current_chars = 0
-            current.append(argument)
-            current_chars += argument_chars
-        if current:
-            chunks.append(current)
-        return chunks
+    def _strip_label_repository(label):
+        return re.sub(r"^@@?(?=//)", "", label)
+
+    def _read_test_cfg_info(self, build_events_file):
+        """Return (test, vcomp, tags, simulator) from the aspect's JSON files.
+
+        The files are found through the build event protocol output rather
+        than by scanning console output. None means the aspect reported no
+        output group, e.g. an older rules_verilog that only prints its info.
+        """
+        try:
+            info_paths = bazel_events.output_group_files(build_events_file, DISCOVERY_OUTPUT_GROUP)
+        except OSError as exc:
+            self.log.warning("Could not read Bazel build events %s: %s", build_events_file, exc)
+            return None
+        except ValueError as exc:
+            self.log.critical(
+                "Bazel did not download the test cfg info files (%s); check --remote_download_* "
+                "options in your bazelrc", exc)
+        if not info_paths:
+            return None
+        matching_tests = []
+        for info_path in info_paths:
+            try:
+                with open(info_path, encoding="utf-8") as info_file:
+                    info = json.load(info_file)
+            except (OSError, ValueError) as exc:
+                self.log.critical("Could not read test cfg info %s: %s", info_path, exc)
+                raise
+            matching_tests.append((
+                self._strip_label_repository(info["test"]),
+                self._strip_label_repository(info["tb"]),
+                list(info["tags"]),
+                info["simulator"],
+            ))
+        return matching_tests
+
+    @staticmethod
+    def _scrape_test_cfg_info(lines):
+        """Return (test, vcomp, tags, simulator) printed by an older test cfg info aspect."""
+        matches = [DISCOVERY_TEST_CFG_INFO_RE.search(line) for line in lines if "verilog_dv_test_cfg_info(" in line]
+        return [(match.group('test'), match.group('vcomp'), ast.literal_eval(match.group('tags')),
+                 match.group('simulator')) for match in matches if match]
 
     def test_discovery_all(self):
         for attempt in range(DISCOVERY_MAX_SOURCE_RETRIES + 1):
@@ -724,70 +993,86 @@ class RegressionConfig():
             self.tests_to_simulator = {}
             return
 
-        test_queries = ["({})".format(self._build_test_cfg_query(vcomp)) for vcomp in sorted(self.all_vcomp)]
-        query_results = []
-        for query_chunk in self._chunk_arguments(test_queries):
-            combined_test_query = " union ".join(query_chunk)
+        # Benches whose metadata did not change since the cached generation
+        # keep their cached tests; only the rest are queried and built.
+        self.tests_to_tags = {}
+        self.tests_to_simulator = {}
+        reused_vcomps = set()
+        partial_discovery, self._partial_discovery = getattr(self, "_partial_discovery", None), None
+        if partial_discovery is not None:
+            cached_all_vcomp, cached_tags, cached_simulators, stale_vcomps = partial_discovery
+            for vcomp, tests in cached_all_vcomp.items():
+                if vcomp not in self.all_vcomp or vcomp in stale_vcomps:
+                    continue
+                self.all_vcomp[vcomp] = dict(tests)
+                reused_vcomps.add(vcomp)
+                for test_name in tests:
+                    self.tests_to_tags[test_name] = cached_tags.get(test_name, [])
+                    self.tests_to_simulator[test_name] = cached_simulators.get(test_name)
+            self.log.debug("Reused cached test discovery for %d bench(es)", len(reused_vcomps))
+        discover_vcomps = [vcomp for vcomp in sorted(self.all_vcomp) if vcomp not in reused_vcomps]
+        self.discovery_prebuilt_targets = set()
+        matching_tests = self._discover_test_cfgs(discover_vcomps, dtp) if discover_vcomps else []
+        for test_name, vcomp, tags, simulator in matching_tests:
+            self.tests_to_tags[test_name] = tags
+            self.tests_to_simulator[test_name] = simulator
+            if vcomp in self.all_vcomp:
+                self.all_vcomp[vcomp][test_name] = 0
+
+        # Log discovered tests in table format
+        table_output = []
+        table_output.append(self.table_format("bench", "test", "count"))
+        table_output.append(self.table_format("-----", "----", "-----"))
+        for vcomp, tests in self.all_vcomp.items():
+            bench = vcomp.split(':')[1]
+            for i, (test_target, count) in enumerate(tests.items()):
+                test = test_target.split(':')[1]
+                if i == 0:
+                    table_output.append(self.table_format(bench, test, str(count)))
+                else:
+                    table_output.append(self.table_format('', test, str(count)))
+
+        self.log.debug("Tests available:\n%s", "\n".join(table_output))
+
+    def _discover_test_cfgs(self, vcomps, dtp):
+        """Query and build the test cfgs of vcomps; return (test, vcomp, tags, simulator) tuples."""
+        test_queries = ["({})".format(self._build_test_cfg_query(vcomp)) for vcomp in vcomps]
+        with self._discovery_argument_file("test_cfg_query", [" union ".join(test_queries)]) as query_file:
             dtp.reset()
-            returncode, stdout, stderr = self._run_command(["bazel", "cquery", combined_test_query], )
+            returncode, stdout, stderr = self._run_command(["bazel", "cquery", "--query_file={}".format(query_file)])
             dtp.stop_and_print()
-            if returncode:
-                self.log.critical("bazel test discovery failed:\n%s", stderr)
-            query_results.extend(re.sub(r"\([a-z0-9]{7,64}\) *", "", stdout.replace('\n', ' ')).split())
+        if returncode:
+            self.log.critical("bazel test discovery failed:\n%s", stderr)
+        query_results = re.sub(r"\([a-z0-9]{7,64}\) *", "", stdout.replace('\n', ' ')).split()
         query_results = list(dict.fromkeys(query_results))
 
         discovery_build_targets = list(query_results)
         if not self.options.no_compile:
-            discovery_build_targets.extend(sorted(self.all_vcomp))
+            discovery_build_targets.extend(vcomps)
         discovery_build_targets = list(dict.fromkeys(discovery_build_targets))
 
-        text = []
-        for target_chunk in self._chunk_arguments(discovery_build_targets):
+        with self._discovery_argument_file("test_cfg_targets", discovery_build_targets) as target_file, \
+                self._discovery_argument_file("build_events", []) as build_events_file:
             dtp.reset()
             returncode, stdout, stderr = self._run_command([
                 "bazel",
                 "build",
-                *target_chunk,
+                "--target_pattern_file={}".format(target_file),
                 "--aspects",
                 "@rules_verilog//verilog/private:dv.bzl%verilog_dv_test_cfg_info_aspect",
+                "--output_groups=+{}".format(DISCOVERY_OUTPUT_GROUP),
+                # Remote-cache builds with --remote_download_minimal would leave the JSON files remote.
+                "--remote_download_outputs=toplevel",
+                "--build_event_json_file={}".format(build_events_file),
             ])
             dtp.stop_and_print()
             if returncode:
                 self.log.critical("bazel test discovery failed:\n%s", stderr)
-            text.extend(stdout.split('\n') + stderr.split('\n'))
+            matching_tests = self._read_test_cfg_info(build_events_file)
+        if matching_tests is None:
+            matching_tests = self._scrape_test_cfg_info(stdout.split('\n') + stderr.split('\n'))
         self.discovery_prebuilt_targets = set(discovery_build_targets)
-
-        # Parse test information from output
-        ttv = [
-            re.search(
-                r'verilog_dv_test_cfg_info\(@(?:@)?(?P<test>[^,]+), @(?:@)?(?P<vcomp>[^,]+), (?P<tags>\[.*\]), (?P<simulator>[A-Z0-9_]+)\)',
-                line,
-            ) for line in text
-        ]
-        ttv = [match for match in ttv if match]
-
-        matching_tests = [(mt.group('test'), mt.group('vcomp'), ast.literal_eval(mt.group('tags')),
-                           mt.group('simulator')) for mt in ttv]
-        self.tests_to_tags = {test_name: tags for test_name, _, tags, _ in matching_tests}
-        self.tests_to_simulator = {test_name: simulator for test_name, _, _, simulator in matching_tests}
-        for test_name, vcomp, _, _ in matching_tests:
-            if vcomp in self.all_vcomp:
-                self.all_vcomp[vcomp][test_name] = 0
-
-        # Log discovered tests in table format
-        table_output = []
-        table_output.append(self.table_format("bench", "test", "count"))
-        table_output.append(self.table_format("-----", "----", "-----"))
-        for vcomp, tests in self.all_vcomp.items():
-            bench = vcomp.split(':')[1]
-            for i, (test_target, count) in enumerate(tests.items()):
-                test = test_target.split(':')[1]
-                if i == 0:
-                    table_output.append(self.table_format(bench, test, str(count)))
-                else:
-                    table_output.append(self.table_format('', test, str(count)))
-
-        self.log.debug("Tests available:\n%s", "\n".join(table_output))
+        return matching_tests
 
     def test_discovery_match(self):
         """
@@ -801,46 +1086,17 @@ class RegressionConfig():
                 cached_discovery = self._load_discovery_cache_generation()[:3]
             self.all_vcomp, self.tests_to_tags, self.tests_to_simulator = cached_discovery
 
-        # Process each test specification from command line
+        # Select tests for every test specification from the command line
+        specs = []
         for ta in self.options.tests:
             bglob, tglob, iterations = self._split_btglob(ta.btiglob)
-
-            # Find matching vcomponents
-            query = "*:{}".format(bglob)
-            vcomp_match = fnmatch.filter(self.all_vcomp.keys(), query)
-
             self.log.debug("Looking for tests matching %s", ta)
-
-            # Process each matching vcomponent
-            for vcomp in vcomp_match:
-                tests = self.all_vcomp[vcomp]
-                query = "*:{}".format(tglob)
-                test_match = fnmatch.filter(tests, query)
-                for test in test_match:
-                    # Filter tests based on tags
-                    test_tags = set(self.tests_to_tags[test])
-                    if ta.tag and not ((ta.tag & test_tags) == ta.tag):
-                        self.log.debug("  Skipping %s because it did not match --tag=%s", test, ta.tag)
-                        continue
-                    if ta.ntag and (ta.ntag & test_tags):
-                        self.log.debug("  Skipping %s because it matched --ntags=%s", test, ta.ntag)
-                        continue
-                    if self.options.global_tag and not (
-                        (self.options.global_tag & test_tags) == self.options.global_tag):
-                        self.log.debug("  Skipping %s because it did not match --global-tag=%s", test,
-                                       self.options.global_tag)
-                        continue
-                    if self.options.global_ntag and (self.options.global_ntag & test_tags):
-                        self.log.debug("  Skipping %s because it matched --global-ntags=%s", test,
-                                       self.options.global_ntag)
-                        continue
-                    self.log.debug("  %s met tag requirements", test)
-                    # Update iteration count if larger than current
-                    try:
-                        new_max = max(tests[test], iterations)
-                    except KeyError:
-                        new_max = iterations
-                    tests[test] = new_max
+            specs.append(test_selection.TestSpec(bglob, tglob, iterations, ta.tag, ta.ntag))
+        index = test_selection.SelectionIndex(self.all_vcomp, self.tests_to_tags)
+        selection = index.select(specs, self.options.global_tag, self.options.global_ntag, log=self.log)
+        for (vcomp, test), iterations in selection.items():
+            tests = self.all_vcomp[vcomp]
+            tests[test] = max(tests.get(test, 0), iterations)
 
         # Remove inactive tests and vcomponents
         for vcomp, tests in self.all_vcomp.items():
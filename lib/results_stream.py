@@ -0,0 +1,103 @@
+"""Per-regression stream of finished test results, one JSON object per line."""
+
+import datetime
+import json
+import os
+import threading
+
+
+def stream_path(regression_log_path):
+    """Return the results stream written next to a regression log."""
+    return os.path.splitext(regression_log_path)[0] + ".jsonl"
+
+
+class ResultsStream():
+    """Append-only JSON lines file of test results, written as each test finishes.
+
+    Each record is written with a single O_APPEND write, so a reader tailing
+    the file during the run only ever sees whole lines, except possibly a
+    torn last line after a crash, which ``read`` drops.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def append(self, record):
+        data = (json.dumps(record, sort_keys=True) + "\n").encode("utf-8")
+        with self._lock:
+            if self._fd is not None:
+                os.write(self._fd, data)
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def read(self):
+        """Return every complete record written so far."""
+        records = []
+        with open(self.path, encoding="utf-8") as stream:
+            for line in stream:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records
+
+
+def test_record(test_job):
+    """Return the stream record for a finished TestJob."""
+    timed = getattr(test_job, "simulation_duration_s", None) is not None
+    return {
+        "bench": test_job.vcomper.name,
+        "test": test_job.name,
+        "target": getattr(test_job, "target", ""),
+        "iteration": test_job.iteration,
+        "seed": getattr(test_job, "seed", None),
+        "status": test_job.jobstatus.name,
+        "sim_time_s": test_job.job_time if timed else None,
+        "sim_time": test_job._get_job_time_str() if timed else None,
+        "log_path": getattr(test_job, "_log_path", None),
+        "error_message": getattr(test_job, "error_message", None),
+        "finished_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def append_test(stream, test_job):
+    if stream is None:
+        return
+    stream.append(test_record(test_job))
+
+
+def tally(records):
+    """Fold stream records into per-test totals keyed by (bench, target, test).
+
+    The last record of an iteration wins, so a test recorded again after a
+    post-run failure is counted once with its final status.
+    """
+    latest = {}
+    for record in records:
+        latest[(record["bench"], record.get("target") or "", record["test"], record["iteration"])] = record
+    totals = {}
+    for (bench, target, test, _), record in sorted(latest.items(), key=lambda item: item[0]):
+        entry = totals.setdefault((bench, target, test), {
+            "passed": [],
+            "failed": [],
+            "max_sim_time_s": None,
+            "max_sim_time": "",
+        })
+        if record["status"] in ("PASSED", "BYPASSED"):
+            entry["passed"].append(record)
+        elif record["status"] == "FAILED":
+            entry["failed"].append(record)
+        sim_time_s = record.get("sim_time_s")
+        if record["status"] in ("PASSED",
+                                "FAILED") and sim_time_s is not None and (entry["max_sim_time_s"] is None
+                                                                          or sim_time_s > entry["max_sim_time_s"]):
+            entry["max_sim_time_s"] = sim_time_s
+            entry["max_sim_time"] = record.get("sim_time") or ""
+    return totals
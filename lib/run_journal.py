@@ -0,0 +1,114 @@
+"""Append-only journal of scheduler job states, used to resume an interrupted regression."""
+
+import datetime
+import json
+import os
+import threading
+
+JOURNAL_DIRECTORY = os.path.join(".simmer", "journal")
+
+
+def journal_path(project_dir, run_id):
+    return os.path.join(project_dir, JOURNAL_DIRECTORY, "{}.jsonl".format(run_id))
+
+
+def job_key(vcomp, test, iteration):
+    """Return the journal key of one planned (vcomp, test, iteration)."""
+    return json.dumps([vcomp, test, iteration])
+
+
+def _timestamp():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+class RunJournal():
+    """Journal one regression's planned iterations and every job state change.
+
+    The first line is a header with the run's command line and the seed of
+    every planned iteration; each later line records one state (LAUNCHED,
+    PASSED, FAILED, ...) of a job that carries a ``journal_key``. Lines are
+    written with single O_APPEND writes so a crash loses at most the
+    transition in flight. A resumed run appends to the same journal.
+    """
+
+    def __init__(self, path, run_id=None, argv=None, seeds=None):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size == 0:
+            self._write([{
+                "type": "header",
+                "run_id": run_id,
+                "argv": list(argv or []),
+                "seeds": dict(seeds or {}),
+                "created_at": _timestamp(),
+            }])
+        else:
+            self._write([{"type": "resume", "at": _timestamp()}])
+
+    def _write(self, entries):
+        data = "".join(json.dumps(entry, sort_keys=True) + "\n" for entry in entries).encode("utf-8")
+        with self._lock:
+            if self._fd is not None:
+                os.write(self._fd, data)
+
+    def record(self, job, state=None):
+        """Journal state for job, or for each member of a job array.
+
+        When state is None each job's own final jobstatus is recorded.
+        """
+        entries = []
+        for unit in getattr(job, "array_members", None) or [job]:
+            key = getattr(unit, "journal_key", None)
+            if key is None:
+                continue
+            entries.append({
+                "type": "job",
+                "key": key,
+                "state": state or unit.jobstatus.name,
+                "seed": getattr(unit, "seed", None),
+                "at": _timestamp(),
+            })
+        if entries:
+            self._write(entries)
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+def load(path):
+    """Return (header, {key: last job entry}) from a journal; a torn last line is ignored."""
+    header = None
+    states = {}
+    with open(path, encoding="utf-8") as journal:
+        for line in journal:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("type") == "header" and header is None:
+                header = entry
+            elif entry.get("type") == "job":
+                states[entry["key"]] = entry
+    if header is None:
+        raise ValueError("{} has no journal header".format(path))
+    return header, states
+
+
+def resume_plan(header, states):
+    """Return (passed keys, {key: seed}) for resuming a journaled run.
+
+    Every iteration whose last state is PASSED is done. All other planned
+    iterations run again with the seed they were launched with, or their
+    planned seed when they never started.
+    """
+    passed = {key for key, entry in states.items() if entry.get("state") in ("PASSED", "BYPASSED")}
+    seeds = dict(header.get("seeds") or {})
+    for key, entry in states.items():
+        if entry.get("seed") is not None:
+            seeds[key] = entry["seed"]
+    return passed, seeds
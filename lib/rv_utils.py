@@ -10,6 +10,8 @@ import subprocess
 from typing import Dict, Optional
 from urllib.parse import urlparse
 
+from lib import results_stream
+
 LOGGER_INDENT = 8
 
 
@@ -90,6 +92,21 @@ def prepare_regression_log(rcfg):
     return regression_log_path
 
 
+_EMPTY_TEST_RESULTS = {"passed": [], "failed": [], "max_sim_time": ""}
+
+
+def _read_streamed_results(rcfg):
+    """Return per-test totals from the run's results stream, or None to walk the jobs instead."""
+    stream = getattr(rcfg, "results_stream", None)
+    if stream is None:
+        return None
+    try:
+        return results_stream.tally(stream.read())
+    except (OSError, KeyError, TypeError) as exc:
+        rcfg.log.warning("Could not read results stream %s (%s); summarizing from job state", stream.path, exc)
+        return None
+
+
 def print_summary(rcfg, vcomp_jobs, jm, trd):
     """
     Print a summary of regression results
@@ -118,6 +135,7 @@ def print_summary(rcfg, vcomp_jobs, jm, trd):
     total_failed = 0
     total = 0
 
+    streamed_results = _read_streamed_results(rcfg)
     last = len(rcfg.all_vcomp) - 1
     for i, (vcomp_name, (icfgs, test_list)) in enumerate(rcfg.all_vcomp.items()):
         vcomp = vcomp_jobs[vcomp_name]
@@ -135,44 +153,55 @@ def print_summary(rcfg, vcomp_jobs, jm, trd):
         for icfg in icfgs:
             if not icfg.jobs[0].vcomper is vcomp:
                 continue
-            timed_jobs = [
-                job for job in icfg.jobs if job.jobstatus in [job.jobstatus.PASSED, job.jobstatus.FAILED]
-                and getattr(job, "simulation_duration_s", None) is not None
-            ]
-            max_sim_time = max(timed_jobs, key=lambda x: x.job_time)._get_job_time_str() if timed_jobs else ""
-            passed = [j for j in icfg.jobs if j.jobstatus.completed and j.jobstatus.successful]
-            failed = [j for j in icfg.jobs if j.jobstatus == j.jobstatus.FAILED]
-            skipped = [j for j in icfg.jobs if j.jobstatus not in [j.jobstatus.FAILED, j.jobstatus.PASSED]]
+            test_target = getattr(icfg.jobs[0], "target", "")
+            if streamed_results is not None:
+                test_results = streamed_results.get((vcomp.name, test_target or "", icfg.jobs[0].name),
+                                                    _EMPTY_TEST_RESULTS)
+                max_sim_time = test_results["max_sim_time"]
+                passed = [record["log_path"] for record in test_results["passed"]]
+                failed = [record["log_path"] for record in test_results["failed"]]
+                skipped_count = len(icfg.jobs) - len(passed) - len(failed)
+            else:
+                timed_jobs = [
+                    job for job in icfg.jobs if job.jobstatus in [job.jobstatus.PASSED, job.jobstatus.FAILED]
+                    and getattr(job, "simulation_duration_s", None) is not None
+                ]
+                max_sim_time = max(timed_jobs, key=lambda x: x.job_time)._get_job_time_str() if timed_jobs else ""
+                passed = [j.log_path for j in icfg.jobs if j.jobstatus.completed and j.jobstatus.successful]
+                failed = [j.log_path for j in icfg.jobs if j.jobstatus == j.jobstatus.FAILED]
+                skipped_count = len([
+                    j for j in icfg.jobs
+                    if j.jobstatus not in [j.jobstatus.FAILED, j.jobstatus.PASSED, j.jobstatus.BYPASSED]
+                ])
+
+                try:
+                    assert len(passed) + len(failed) + skipped_count == len(icfg.jobs), print(
+                        len(passed), len(failed), skipped_count, len(icfg.jobs))
+                except AssertionError as exc:
+                    if not jm.exited_prematurely:
+                        raise exc
 
             total_passed += len(passed)
             total_failed += len(failed)
-            total_skipped += len(skipped)
+            total_skipped += skipped_count
             total += len(icfg.jobs)
 
-            try:
-                assert len(passed) + len(failed) + len(skipped) == len(icfg.jobs), print(
-                    len(passed), len(failed), len(skipped), len(icfg.jobs))
-            except AssertionError as exc:
-                if not jm.exited_prematurely:
-                    raise exc
-
-            test_target = getattr(icfg.jobs[0], "target", "")
             test_tags = set(rcfg.tests_to_tags.get(test_target, []))
             test_category = ",".join(category for category, config in getattr(rcfg, "category_total_cases", {}).items()
                                      if test_tags & set(config.get("tags", [])))
-            test_set = ("", icfg.jobs[0].name,
-                        str(max_sim_time), str(len(passed)) if passed else "", str(len(skipped)) if skipped else "",
-                        str(len(failed)) if failed else "", str(len(icfg.jobs)), "", test_category)
+            test_set = ("", icfg.jobs[0].name, str(max_sim_time), str(len(passed)) if passed else "",
+                        str(skipped_count) if skipped_count else "", str(len(failed)) if failed else "",
+                        str(len(icfg.jobs)), "", test_category)
             table_data.append(test_set)
             trd.append(test_set)
 
-            for j in failed:
-                table_data.append(("", "", "", "", "", "", "", j.log_path if j.log_path else '', ""))
-                trd.append(("", "", "", "", "", "", "", j.log_path if j.log_path else '', ""))
+            for log_path in failed:
+                table_data.append(("", "", "", "", "", "", "", log_path if log_path else '', ""))
+                trd.append(("", "", "", "", "", "", "", log_path if log_path else '', ""))
             if rcfg.options.nt:
-                for j in passed:
-                    table_data.append(("", "", "", "", "", "", "", j.log_path if j.log_path else '', ""))
-                    trd.append(("", "", "", "", "", "", "", j.log_path if j.log_path else '', ""))
+                for log_path in passed:
+                    table_data.append(("", "", "", "", "", "", "", log_path if log_path else '', ""))
+                    trd.append(("", "", "", "", "", "", "", log_path if log_path else '', ""))
 
         if i != last:
             table_data.append(separator)
@@ -203,6 +232,18 @@ def print_summary(rcfg, vcomp_jobs, jm, trd):
         with open(regression_log_path, 'a') as file:
             formatted_string = "\n" + "Simulation Summary\n" + "\n".join(map(str, table_data_formatted))
             file.write(formatted_string)
+
+    fail_fast_policy = getattr(rcfg, "fail_fast", None)
+    if fail_fast_policy is not None and fail_fast_policy.cancelled:
+        fail_fast_lines = [
+            "{}{} {}: skipped {} iteration(s) after {} matching failures: {}".format(
+                " " * LOGGER_INDENT, cancelled.bench, cancelled.test, cancelled.skipped, cancelled.failures,
+                cancelled.signature or "<no error message>") for cancelled in fail_fast_policy.cancelled
+        ]
+        rcfg.log.summary("Fail-fast\n%s", "\n".join(fail_fast_lines))
+        if total_tests > 1 and not rcfg.options.no_run:
+            with open(regression_log_path, 'a') as file:
+                file.write("\n" + "Fail-fast\n" + "\n".join(fail_fast_lines))
     return regression_log_path
 
 
@@ -2,10 +2,12 @@
 """Local simmer result history helpers."""
 
 import datetime
+import heapq
 import json
 import math
 import os
 import sys
+import threading
 import uuid
 from contextlib import contextmanager
 
@@ -22,6 +24,9 @@ COLOR_RED = "\033[0;31m"
 COLOR_YELLOW = "\033[0;33m"
 COLOR_NC = "\033[0m"
 
+# Job post_run hooks record results from several scheduler hook workers.
+_RECORD_LOCK = threading.Lock()
+
 
 def results_path(project_dir):
     return os.path.join(project_dir, RESULTS_DIRECTORY, RESULTS_FILENAME)
@@ -216,7 +221,8 @@ def record_compile_job(run, vcomp_job, status=None):
         vcomp_job,
         stopped_at=datetime.datetime.now() if status == "INTERRUPTED" else None,
     )
-    _upsert_by_key(run["compile"], "vcomp_target", compile_record)
+    with _RECORD_LOCK:
+        _upsert_by_key(run["compile"], "vcomp_target", compile_record)
 
 
 def record_test_job(run, test_job, waves_script=None, waves_path=None, status=None, simulation_started=None):
@@ -258,11 +264,12 @@ def record_test_job(run, test_job, waves_script=None, waves_path=None, status=No
         test_job,
         stopped_at=datetime.datetime.now() if status == "INTERRUPTED" else None,
     )
-    for index, existing in enumerate(run["tests"]):
-        if all(existing.get(key) == test_record.get(key) for key in ("target", "iteration", "seed")):
-            run["tests"][index] = test_record
-            return
-    run["tests"].append(test_record)
+    with _RECORD_LOCK:
+        for index, existing in enumerate(run["tests"]):
+            if all(existing.get(key) == test_record.get(key) for key in ("target", "iteration", "seed")):
+                run["tests"][index] = test_record
+                return
+        run["tests"].append(test_record)
 
 
 def finalize_run(run, regression_log_path=None, backend_finalize_failed=False):
@@ -316,6 +323,7 @@ def _empty_store():
         "schema_version": SCHEMA_VERSION,
         "last_run": None,
         "runs": [],
+        "test_durations": {},
     }
 
 
@@ -330,6 +338,7 @@ def _read_store(path):
     store.setdefault("schema_version", SCHEMA_VERSION)
     store.setdefault("last_run", None)
     store.setdefault("runs", [])
+    store.setdefault("test_durations", {})
     return store
 
 
@@ -373,10 +382,13 @@ def _merge_stores(legacy_store, current_store, max_runs=MAX_RUNS):
             ),
         )
     ][-max_runs:]
+    test_durations = dict(legacy_store.get("test_durations") or {})
+    test_durations.update(current_store.get("test_durations") or {})
     return {
         "schema_version": SCHEMA_VERSION,
         "last_run": merged_runs[-1] if merged_runs else None,
         "runs": merged_runs,
+        "test_durations": test_durations,
     }
 
 
@@ -417,6 +429,40 @@ def load_store(project_dir):
         return _load_store_locked(project_dir, path)
 
 
+def _update_test_durations(test_durations, run):
+    """Replace each target's expected duration with its mean time in this run."""
+    samples = {}
+    for test in run.get("tests", []):
+        duration_s = _duration_seconds(test.get("duration_s"))
+        if test.get("status") not in ("PASSED", "FAILED") or not test.get("target") or not duration_s:
+            continue
+        samples.setdefault(test["target"], []).append(duration_s)
+    test_durations = dict(test_durations or {})
+    for target, durations in samples.items():
+        test_durations[target] = round(sum(durations) / len(durations), 3)
+    return test_durations
+
+
+def load_test_durations(project_dir):
+    """Return the expected simulation seconds of each previously run test target.
+
+    History is only used to order work, so an unreadable store yields no
+    estimates instead of failing the run.
+    """
+    try:
+        return load_store(project_dir).get("test_durations", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def predict_makespan(expected_durations, slots):
+    """Return the wall time of running durations longest-first on slots workers."""
+    loads = [0.0] * max(1, min(slots, len(expected_durations)))
+    for duration_s in sorted(expected_durations, reverse=True):
+        heapq.heapreplace(loads, loads[0] + duration_s)
+    return max(loads) if expected_durations else 0.0
+
+
 def should_save_run(run):
     """Return whether at least one simulation produced a result record."""
     return bool(run and any(test.get("simulation_started", True) for test in run.get("tests", [])))
@@ -445,6 +491,7 @@ def save_run(project_dir, run, max_runs=MAX_RUNS):
             "schema_version": SCHEMA_VERSION,
             "last_run": stored_run,
             "runs": runs[-max_runs:],
+            "test_durations": _update_test_durations(store.get("test_durations"), run),
         }
         _write_store(path, store)
     return True
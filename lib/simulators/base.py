@@ -5,7 +5,7 @@ import signal
 import subprocess
 import threading
 
-from lib import compile_cache
+from lib import compile_cache, filelist_graph
 
 POST_PROCESS_TIMEOUT_SECONDS = 12 * 60 * 60
 PROCESS_TERMINATION_GRACE_SECONDS = 5
@@ -207,6 +207,15 @@ class SimulatorInterface(abc.ABC):
         """Record simulator-specific outputs after a successful compile."""
         return
 
+    def get_shared_compile_artifacts(self, vcomp_job):
+        """Return the job_dir-relative compile outputs a shared compile cache may store.
+
+        None means this compile cannot be shared, for example because it
+        writes outputs outside job_dir. The default implementation shares
+        nothing.
+        """
+        return None
+
     def collect_compile_metrics(self, vcomp_job):
         """Return optional backend metrics for persistent simmer results."""
         return {}
@@ -236,6 +245,20 @@ class SimulatorInterface(abc.ABC):
         """Return the effective thread cost of one simulation for job limiting."""
         return 1
 
+    def get_compile_threads(self):
+        """Return the effective thread cost of one compile for job limiting."""
+        return 1
+
+    def get_test_resources(self, test_job):
+        """Return the scheduler resource claims of one simulation."""
+        resources = {"cpu": self.get_scheduler_threads_per_test()}
+        memory_mb = getattr(self.options, "sim_memory_mb", None)
+        if memory_mb:
+            resources["memory_mb"] = memory_mb
+        for feature, count in (getattr(self.options, "sim_licenses", None) or {}).items():
+            resources["license:{}".format(feature)] = count
+        return resources
+
     def validate_resolved_options(self):
         """Validate options after test cfgs choose the final simulator."""
         return
@@ -272,12 +295,30 @@ class SimulatorInterface(abc.ABC):
         """Return backend-owned values needed by its compile template."""
         return {}
 
+    def _filelist_cache(self):
+        """Return the parsed-filelist cache shared by this run's compiles and kept under .simmer/cache."""
+        cache = getattr(self, "_filelist_graph_cache", None)
+        if cache is None:
+            proj_dir = getattr(self.rcfg, "proj_dir", None)
+            cache = filelist_graph.FilelistCache(
+                os.path.join(proj_dir, ".simmer", "cache", filelist_graph.FILELIST_CACHE_FILE) if proj_dir else None)
+            self._filelist_graph_cache = cache
+        return cache
+
     def get_compile_fingerprint_inputs(self, vcomp_job):
         """Return common external files and environment affecting compilation."""
         compile_args_file = self.options.compile_args_file
         extra_input_paths = []
         if compile_args_file:
-            extra_input_paths = compile_cache.discover_filelist_inputs(compile_args_file, vcomp_job.bazel_runfiles_main)
+            cache = self._filelist_cache()
+            extra_input_paths = compile_cache.discover_filelist_inputs(compile_args_file,
+                                                                       vcomp_job.bazel_runfiles_main,
+                                                                       cache=cache,
+                                                                       digests=getattr(vcomp_job, "digest_index", None))
+            try:
+                cache.save()
+            except OSError:
+                pass
         return {
             "extra_input_paths": extra_input_paths,
             "environment": {
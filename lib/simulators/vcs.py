@@ -261,6 +261,11 @@ class VcsSimulator(SimulatorInterface):
     def get_scheduler_threads_per_test(self):
         return self.options.fgp if self.options.fgp is not None else 1
 
+    def get_compile_threads(self):
+        if self.get_effective_partcomp_mode() == 'disabled':
+            return 1
+        return self.get_partcomp_jobs()
+
     def use_smartlog(self):
         return self.options.smartlog
 
@@ -805,6 +810,22 @@ class VcsSimulator(SimulatorInterface):
             if os.path.exists(temporary_path):
                 os.remove(temporary_path)
 
+    def get_shared_compile_artifacts(self, vcomp_job):
+        # Coverage databases and configured partition libraries live outside
+        # the compile directory, and --no-vcs-auto-compile-cache asks for VCS
+        # to run every time.
+        if (not self.options.vcs_auto_compile_cache or self.options.cm or self.options.vcs_partcomp_dir is not None
+                or self.options.vcs_partcomp_sharedlib is not None):
+            return None
+        artifacts = ["simv", "simv.daidir"]
+        if self.get_effective_partcomp_mode() != 'disabled':
+            artifacts.append(os.path.relpath(self.get_partition_compile_dir(vcomp_job), vcomp_job.job_dir))
+        if getattr(vcomp_job, "vcs_three_step", False):
+            artifacts.extend(
+                os.path.relpath(path, vcomp_job.job_dir)
+                for path in (self.get_analysis_work_dir(vcomp_job), self.get_analysis_setup_file(vcomp_job)))
+        return artifacts
+
     def collect_compile_metrics(self, vcomp_job):
         reused = bool(self.options.no_compile or getattr(vcomp_job, "compile_cache_hit", False))
         effective_partcomp_mode = self.get_effective_partcomp_mode()
@@ -13,6 +13,7 @@ import tempfile
 
 import jinja2
 
+from lib import digest_index
 from lib.coverage_data import aggregate_coverage_metrics, parse_coverage_summary
 from .base import SimulatorInterface, ValidationErrorParser, run_bounded_process
 from .options import validate_explicit_switches
@@ -35,15 +36,13 @@ def _tcl_quote(value):
     return '"{}"'.format(escaped)
 
 
-def _sha256_file(path):
-    digest = hashlib.sha256()
-    try:
-        with open(path, "rb") as filep:
-            for chunk in iter(lambda: filep.read(1024 * 1024), b""):
-                digest.update(chunk)
-    except OSError:
-        return None
-    return digest.hexdigest()
+def _sha256_files(paths, vcomp_job):
+    digests = getattr(vcomp_job, "digest_index", None)
+    return digest_index.sha256_files(paths, sha256=digests.sha256 if digests is not None else None)
+
+
+def _sha256_file(path, vcomp_job):
+    return _sha256_files([path], vcomp_job)[0]
 
 
 def _write_json_atomic(path, value):
@@ -204,8 +203,7 @@ class XceliumSimulator(SimulatorInterface):
                                "msie_incremental_deps on {} and rebuild with Bazel.".format(
                                    inputs_path, vcomp_job.bazel_vcomp_target))
 
-        digest = hashlib.sha256()
-        count = 0
+        entries = []
         with open(inputs_path, "r", encoding="utf-8") as filep:
             for line in filep:
                 kind, _, relative_path = line.rstrip("\n").partition("\t")
@@ -215,14 +213,17 @@ class XceliumSimulator(SimulatorInterface):
                     vcomp_job.bazel_runfiles_main, relative_path)
                 if not os.path.isfile(path):
                     raise RuntimeError("MSIE primary input is missing: {}".format(path))
-                digest.update(kind.encode("utf-8"))
-                digest.update(b"\0")
-                digest.update(relative_path.encode("utf-8"))
-                digest.update(b"\0")
-                digest.update((_sha256_file(path) or "missing").encode("ascii"))
-                digest.update(b"\0")
-                count += 1
-        return digest.hexdigest(), count
+                entries.append((kind, relative_path, path))
+        digest = hashlib.sha256()
+        file_digests = _sha256_files([path for _, _, path in entries], vcomp_job)
+        for (kind, relative_path, _), file_digest in zip(entries, file_digests):
+            digest.update(kind.encode("utf-8"))
+            digest.update(b"\0")
+            digest.update(relative_path.encode("utf-8"))
+            digest.update(b"\0")
+            digest.update((file_digest or "missing").encode("ascii"))
+            digest.update(b"\0")
+        return digest.hexdigest(), len(entries)
 
     def _effective_covfile(self, vcomp_job):
         if not self.options.coverage:
@@ -244,16 +245,16 @@ class XceliumSimulator(SimulatorInterface):
             "primary_top": vcomp_job.msie_primary_top,
             "primary_name": vcomp_job.msie_primary_name,
             "primary_key": self.options.msie_primary_key,
-            "primary_compile_args_sha256": _sha256_file(vcomp_job.msie_primary_compile_args),
+            "primary_compile_args_sha256": _sha256_file(vcomp_job.msie_primary_compile_args, vcomp_job),
             "primary_inputs_sha256": inputs_sha256,
             "primary_input_count": input_count,
-            "href_sha256": _sha256_file(vcomp_job.msie_href_file),
+            "href_sha256": _sha256_file(vcomp_job.msie_href_file, vcomp_job),
             "externs": {
-                os.path.basename(path): _sha256_file(path)
+                os.path.basename(path): _sha256_file(path, vcomp_job)
                 for path in vcomp_job.msie_extern_files
             },
             "coverage": self.options.coverage or "",
-            "covfile_sha256": _sha256_file(covfile) if covfile else None,
+            "covfile_sha256": _sha256_file(covfile, vcomp_job) if covfile else None,
             "rtl_defines": sorted(self.options.rtl_defines or []),
             "debug": self.options.waves is not None,
             "xcelium_tool_id": self.get_tool_identity(),
@@ -342,6 +343,18 @@ class XceliumSimulator(SimulatorInterface):
             _write_json_atomic(os.path.join(vcomp_job.msie_primary_dir, MSIE_MANIFEST),
                                vcomp_job.msie_manifest_identity)
 
+    def get_shared_compile_artifacts(self, vcomp_job):
+        # MSIE partitions, emulator libraries and coverage work directories
+        # live outside the compile directory.
+        if (self.options.coverage or self.options.emulator or self.options.msie_href or self.options.msie_prim
+                or self.options.msie_incr):
+            return None
+        job_dir = os.path.abspath(vcomp_job.job_dir)
+        if os.path.isdir(os.path.join(job_dir, "xcelium.d")):
+            return ["xcelium.d"]
+        return sorted(
+            os.path.basename(path) for path in glob.glob(os.path.join(job_dir, "run.*.d")) if os.path.isdir(path))
+
     def get_bazel_runtime_args_file(self, bazel_runfiles_main, relpath, bazel_target):
         return os.path.join(bazel_runfiles_main, relpath, "{}_runtime_args.f".format(bazel_target))
 
@@ -0,0 +1,97 @@
+"""Select discovered tests from bench:test globs and tags with precompiled bitsets."""
+
+import collections
+import fnmatch
+import re
+
+TestSpec = collections.namedtuple("TestSpec", ["bench_glob", "test_glob", "iterations", "tag", "ntag"])
+
+
+def _mask_from_ids(ids, size):
+    bits = bytearray((size + 7) // 8)
+    for test_id in ids:
+        bits[test_id >> 3] |= 1 << (test_id & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _ids_from_mask(mask):
+    return [test_id for test_id, bit in enumerate(reversed(bin(mask)[2:])) if bit == "1"]
+
+
+class SelectionIndex():
+    """Bitset index over every discovered (vcomp, test) pair.
+
+    Each test gets an integer id, and every tag and bench:test glob maps to
+    a Python integer used as a bitset over those ids, so tag filtering and
+    merging specs are bitwise operations. Test globs are matched only
+    against the tests of matching benches; specs that differ only in their
+    test glob are matched as one regular-expression union, and masks are
+    memoized across specs.
+    """
+
+    def __init__(self, all_vcomp, tests_to_tags):
+        self.tests = [(vcomp, test) for vcomp, tests in all_vcomp.items() for test in tests]
+        self.all_mask = (1 << len(self.tests)) - 1
+        self._tests_by_vcomp = collections.defaultdict(list)
+        ids_by_tag = collections.defaultdict(list)
+        for test_id, (vcomp, test) in enumerate(self.tests):
+            self._tests_by_vcomp[vcomp].append((test_id, test))
+            for tag in tests_to_tags.get(test, ()):
+                ids_by_tag[tag].append(test_id)
+        self._tag_masks = {tag: _mask_from_ids(ids, len(self.tests)) for tag, ids in ids_by_tag.items()}
+        self._bench_vcomps = {}
+        self._glob_masks = {}
+
+    def bench_vcomps(self, bench_glob):
+        vcomps = self._bench_vcomps.get(bench_glob)
+        if vcomps is None:
+            match = re.compile(fnmatch.translate("*:{}".format(bench_glob))).match
+            vcomps = [vcomp for vcomp in self._tests_by_vcomp if match(vcomp)]
+            self._bench_vcomps[bench_glob] = vcomps
+        return vcomps
+
+    def glob_mask(self, bench_glob, test_globs):
+        """Return the tests of benches matching bench_glob that match any of test_globs."""
+        key = (bench_glob, tuple(sorted(set(test_globs))))
+        mask = self._glob_masks.get(key)
+        if mask is None:
+            match = re.compile("|".join(fnmatch.translate("*:{}".format(test_glob)) for test_glob in key[1])).match
+            mask = _mask_from_ids((test_id for vcomp in self.bench_vcomps(bench_glob)
+                                   for test_id, test in self._tests_by_vcomp[vcomp] if match(test)), len(self.tests))
+            self._glob_masks[key] = mask
+        return mask
+
+    def tags_mask(self, required=(), excluded=()):
+        """Return the tests carrying every required tag and none of the excluded ones."""
+        mask = self.all_mask
+        for tag in required or ():
+            mask &= self._tag_masks.get(tag, 0)
+        for tag in excluded or ():
+            mask &= ~self._tag_masks.get(tag, 0)
+        return mask
+
+    def select(self, specs, global_tag=(), global_ntag=(), log=None):
+        """Return {(vcomp, test): iterations} for specs; a test matched by several specs gets the largest count."""
+        test_globs = collections.defaultdict(list)
+        for spec in specs:
+            key = (spec.bench_glob, frozenset(spec.tag or ()), frozenset(spec.ntag or ()), spec.iterations)
+            test_globs[key].append(spec.test_glob)
+
+        global_mask = self.tags_mask(global_tag, global_ntag)
+        selected_by_iterations = collections.defaultdict(int)
+        for (bench_glob, tag, ntag, iterations), globs in test_globs.items():
+            matched = self.glob_mask(bench_glob, globs)
+            selected = matched & self.tags_mask(tag, ntag) & global_mask
+            if log:
+                log.debug("%s:%s matched %d test(s); %d met tag requirements", bench_glob, ",".join(globs),
+                          bin(matched).count("1"),
+                          bin(selected).count("1"))
+            selected_by_iterations[iterations] |= selected
+
+        selection = {}
+        assigned = 0
+        for iterations in sorted(selected_by_iterations, reverse=True):
+            for test_id in _ids_from_mask(selected_by_iterations[iterations] & ~assigned):
+                selection[self.tests[test_id]] = iterations
+            assigned |= selected_by_iterations[iterations]
+        return selection
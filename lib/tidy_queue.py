@@ -0,0 +1,177 @@
+"""Background removal of tidied simulation directories."""
+
+import os
+import queue
+import shutil
+import stat
+import threading
+import time
+import uuid
+
+TRASH_DIR_NAME = ".simmer_trash"
+DEFAULT_TIDY_WORKERS = 4
+
+
+def trash_path(path, trash_root):
+    """Return a unique trash entry name for path, tagged with the owning pid."""
+    return os.path.join(trash_root, "{}.{}.{}".format(os.path.basename(path), os.getpid(), uuid.uuid4().hex[:12]))
+
+
+def _trash_owner_alive(name):
+    parts = name.rsplit(".", 2)
+    if len(parts) != 3 or not parts[1].isdigit():
+        return False
+    try:
+        os.kill(int(parts[1]), 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def remove_tree(path):
+    """Delete path bottom-up and return the bytes of disk usage it held.
+
+    Sizes are taken from lstat while walking, so a tree is only read once.
+    Anything the walk could not remove is retried with shutil.rmtree.
+    """
+    reclaimed = 0
+    for root, dirs, files in os.walk(path, topdown=False):
+        for name in files + dirs:
+            entry = os.path.join(root, name)
+            try:
+                st = os.lstat(entry)
+                if stat.S_ISDIR(st.st_mode):
+                    os.rmdir(entry)
+                else:
+                    os.unlink(entry)
+            except OSError:
+                continue
+            reclaimed += getattr(st, "st_blocks", 0) * 512 or st.st_size
+    try:
+        os.rmdir(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        shutil.rmtree(path, ignore_errors=True)
+    return reclaimed
+
+
+class TidyQueue():
+    """Remove passing simulation directories off the post_run path.
+
+    ``remove`` renames a directory into a trash area beside the regression
+    results, which is a single metadata operation, and hands the real deletion
+    to at most ``max_workers`` daemon threads so a slow filesystem is never hit
+    by one unlink storm per finished test. ``drain`` waits for the backlog at
+    the end of a regression or on shutdown and returns the reclaimed totals.
+    """
+
+    def __init__(self, trash_root, max_workers=DEFAULT_TIDY_WORKERS, log=None):
+        if max_workers < 1:
+            raise ValueError("max_workers must be positive, got {}".format(max_workers))
+        self.trash_root = trash_root
+        self._max_workers = max_workers
+        self._log = log
+        self._queue = queue.Queue()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._pending = 0
+        self.directories = 0
+        self.bytes_reclaimed = 0
+        self.errors = 0
+        self.delete_seconds = 0.0
+        self._sweep_abandoned()
+
+    def _sweep_abandoned(self):
+        """Queue trash left behind by runs that exited before draining."""
+        try:
+            names = os.listdir(self.trash_root)
+        except OSError:
+            return
+        for name in names:
+            if _trash_owner_alive(name):
+                continue
+            self._submit(os.path.join(self.trash_root, name), count=False)
+
+    def remove(self, path):
+        """Detach path from the results tree now and delete it in the background."""
+        try:
+            os.makedirs(self.trash_root, exist_ok=True)
+            target = trash_path(path, self.trash_root)
+            os.rename(path, target)
+        except FileNotFoundError:
+            if not os.path.lexists(path):
+                return
+            target = path
+        except OSError as exc:
+            # Cross-device or permission problems: delete in place instead.
+            if self._log is not None:
+                self._log.debug("Could not move %s to trash (%s); deleting in place", path, exc)
+            target = path
+        self._submit(target)
+
+    def _submit(self, path, count=True):
+        with self._condition:
+            self._pending += 1
+            if len(self._threads) < self._max_workers and len(self._threads) < self._pending:
+                thread = threading.Thread(name="tidy_{}".format(len(self._threads)), target=self._run, daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        self._queue.put((path, count))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, count = item
+            start = time.monotonic()
+            reclaimed = 0
+            failed = False
+            try:
+                reclaimed = remove_tree(path)
+            except Exception as exc:
+                failed = True
+                if self._log is not None:
+                    self._log.warning("Failed to remove tidied directory %s: %s", path, exc)
+            with self._condition:
+                self._pending -= 1
+                self.bytes_reclaimed += reclaimed
+                self.delete_seconds += time.monotonic() - start
+                if failed:
+                    self.errors += 1
+                elif count:
+                    self.directories += 1
+                self._condition.notify_all()
+
+    def drain(self, timeout=None):
+        """Wait for queued deletions; return False if timeout seconds elapse first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self):
+        """Stop the workers once the queue ahead of them is empty."""
+        with self._condition:
+            threads = list(self._threads)
+            self._threads = []
+        for _ in threads:
+            self._queue.put(None)
+
+    def summary(self):
+        """Return a one-line account of what has been reclaimed so far."""
+        with self._condition:
+            return "Tidy reclaimed {:.1f} MiB from {} director{} ({:.1f}s of deletion{})".format(
+                self.bytes_reclaimed / (1024 * 1024),
+                self.directories,
+                "y" if self.directories == 1 else "ies",
+                self.delete_seconds,
+                ", {} failed".format(self.errors) if self.errors else "",
+            )
@@ -35,6 +35,59 @@ class ArgsParserValidationTest(unittest.TestCase):
         self.assert_parse_error(["--uvm-max-quit-count", "-1"])
         self.assertEqual(0, parse_args(["--uvm-max-quit-count", "0"]).uvm_max_quit_count)
 
+    def test_resource_pools_and_license_claims_parse_to_counts(self):
+        options = parse_args([
+            "--resource-pool", "license:VCSRuntime_Net=8", "--resource-pool", "cpu=32", "--sim-license",
+            "VCSRuntime_Net", "--sim-license", "VCS_Coverage=2", "--sim-memory-mb", "4096"
+        ])
+
+        self.assertEqual({"license:VCSRuntime_Net": 8, "cpu": 32}, options.resource_pools)
+        self.assertEqual({"VCSRuntime_Net": 1, "VCS_Coverage": 2}, options.sim_licenses)
+        self.assertEqual(4096, options.sim_memory_mb)
+        self.assertEqual({}, parse_args([]).resource_pools)
+
+    def test_resource_options_reject_invalid_counts(self):
+        self.assert_parse_error(["--resource-pool", "cpu"])
+        self.assert_parse_error(["--resource-pool", "cpu=0"])
+        self.assert_parse_error(["--resource-pool", "=4"])
+        self.assert_parse_error(["--sim-license", "VCSRuntime_Net=many"])
+        self.assert_parse_error(["--sim-memory-mb", "0"])
+
+    def test_compile_jobs_require_pipelined_compile(self):
+        self.assert_parse_error(["--compile-jobs", "2"])
+        self.assert_parse_error(["--pipeline-compile", "--compile-jobs", "0"])
+        options = parse_args(["--pipeline-compile", "--compile-jobs", "2"])
+
+        self.assertTrue(options.pipeline_compile)
+        self.assertEqual(2, options.compile_jobs)
+        self.assertIsNone(parse_args(["--pipeline-compile"]).compile_jobs)
+
+    def test_batch_submit_args_require_batch_system(self):
+        self.assert_parse_error(["--batch-submit-args", "-q regress"])
+        self.assert_parse_error(["--batch-system", "lsf", "--gui"])
+        options = parse_args(["--batch-system", "slurm", "--batch-submit-args", "-p sim"])
+
+        self.assertEqual("slurm", options.batch_system)
+        self.assertEqual("-p sim", options.batch_submit_args)
+
+    def test_job_array_size_requires_batch_system(self):
+        self.assert_parse_error(["--job-array-size", "100"])
+        self.assert_parse_error(["--batch-system", "lsf", "--job-array-size", "0"])
+
+        self.assertEqual(100, parse_args(["--batch-system", "lsf", "--job-array-size", "100"]).job_array_size)
+
+    def test_adaptive_jobs_is_local_only(self):
+        self.assert_parse_error(["--adaptive-jobs", "0"])
+        self.assert_parse_error(["--batch-system", "lsf", "--adaptive-jobs", "16"])
+
+        self.assertEqual(16, parse_args(["--batch-system", "local", "--adaptive-jobs", "16"]).adaptive_jobs)
+        self.assertIsNone(parse_args([]).adaptive_jobs)
+
+    def test_fail_fast_threshold_is_positive(self):
+        self.assert_parse_error(["--fail-fast", "0"])
+
+        self.assertEqual(3, parse_args(["--fail-fast", "3"]).fail_fast)
+
     def test_history_filters_enable_default_history_query(self):
         for option in ("--history-bench", "--his-bench"):
             with self.subTest(option=option):
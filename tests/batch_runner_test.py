@@ -0,0 +1,265 @@
+import functools
+import os
+import signal
+import subprocess
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from lib import batch_runner
+from lib.job_lib import Job, JobManager, JobStatus
+
+
+class _Logger:
+
+    def __getattr__(self, _):
+        return lambda *args, **kwargs: None
+
+
+class _SimJob(Job):
+
+    @property
+    def execution_mode(self):
+        return "parallel"
+
+    def post_run(self):
+        super().post_run()
+        self.jobstatus = JobStatus.PASSED if self.job_lib.returncode == 0 else JobStatus.FAILED
+
+
+class _FastBatchJobRunner(batch_runner.BatchJobRunner):
+    CHECK_INTERVAL_SECONDS = 0
+    EXIT_FILE_GRACE_SECONDS = 0
+    KILL_POLL_SECONDS = 0.05
+
+
+class _FastBatchArrayJobRunner(batch_runner.BatchArrayJobRunner):
+    element_runner_type = _FastBatchJobRunner
+
+
+class _FakeCommands:
+
+    def __init__(self, stdout="", returncode=0):
+        self.calls = []
+        self.stdout = stdout
+        self.returncode = returncode
+
+    def __call__(self, argv):
+        self.calls.append(argv)
+        return subprocess.CompletedProcess(argv, self.returncode, self.stdout, "")
+
+
+class BatchRunnerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.rcfg = SimpleNamespace(options=SimpleNamespace(timeout=1), log=_Logger())
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _job(self, name, command, timeout=1):
+        job = _SimJob(self.rcfg, name)
+        job.job_dir = os.path.join(self.temp_dir.name, name)
+        os.makedirs(job.job_dir)
+        job.main_cmdline = command
+        job.timeout = timeout
+        return job
+
+    def _manager(self, scheduler):
+        manager = JobManager({"idle_print_seconds": 60, "quit_count": 10, "active_job_limit": 4}, _Logger())
+        manager.parallel_job_lib_type = functools.partial(_FastBatchJobRunner, scheduler=scheduler)
+        return manager
+
+    def test_local_scheduler_reports_exit_status_of_each_job(self):
+        manager = self._manager(batch_runner.LocalScheduler())
+        passing = self._job("passing", "echo hello")
+        failing = self._job("failing", "exit 3")
+
+        try:
+            manager.add_job(passing)
+            manager.add_job(failing)
+            manager.wait()
+        finally:
+            manager.stop()
+
+        self.assertEqual(JobStatus.PASSED, passing.jobstatus)
+        self.assertEqual(JobStatus.FAILED, failing.jobstatus)
+        self.assertEqual(3, failing.job_lib.returncode)
+        self.assertEqual("hello\n", Path(passing.job_dir, "stdout.log").read_text())
+
+    def test_timeout_kills_batch_job_and_reports_sigterm(self):
+        manager = self._manager(batch_runner.LocalScheduler())
+        job = self._job("slow", "sleep 30", timeout=0.2 / 3600)
+
+        try:
+            start = time.monotonic()
+            manager.add_job(job)
+            manager.wait()
+        finally:
+            manager.stop()
+
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual(-signal.SIGTERM, job.job_lib.returncode)
+        self.assertIn("exceeded timeout value", Path(job.job_dir, "stderr.log").read_text())
+
+    def test_kill_and_pause_go_through_the_scheduler(self):
+        scheduler = batch_runner.LocalScheduler()
+        job = self._job("paused", "sleep 30")
+        runner = _FastBatchJobRunner(job, None, scheduler)
+
+        self.assertTrue(runner.pause())
+        deadline = time.monotonic() + 5
+        while scheduler.state(runner.job_id, max_age=0) != batch_runner.SUSPENDED and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(batch_runner.SUSPENDED, scheduler.state(runner.job_id, max_age=0))
+        self.assertTrue(runner.resume())
+        self.assertTrue(runner.kill())
+        self.assertTrue(runner.done)
+        self.assertFalse(runner.shutdown_incomplete)
+        self.assertEqual(-signal.SIGTERM, runner.returncode)
+        self.assertFalse(Path(runner.exit_path).exists())
+
+    def test_job_that_ends_without_exit_status_fails(self):
+        job = self._job("lost", "true")
+        scheduler = batch_runner.LsfScheduler(run_command=_FakeCommands("Job <42> is submitted to queue <normal>."))
+        runner = _FastBatchJobRunner(job, None, scheduler)
+        scheduler._run_command.stdout = "42 0 EXIT\n"
+
+        self.assertTrue(runner.check_for_done())
+        self.assertEqual(-signal.SIGKILL, runner.returncode)
+
+    def test_lsf_commands_carry_resources_and_parse_states(self):
+        commands = _FakeCommands("Job <1234> is submitted to default queue <normal>.")
+        scheduler = batch_runner.LsfScheduler(["-q", "regress"], run_command=commands)
+
+        job_id = scheduler.submit("/w/batch_job.sh", "smoke", "/w/stdout.log", "/w/stderr.log", "/repo", {
+            "cpu": 4,
+            "memory_mb": 8000
+        })
+        commands.stdout = "1234 0 RUN\n"
+
+        self.assertEqual("1234", job_id)
+        self.assertEqual([
+            "bsub", "-J", "smoke", "-oo", "/w/stdout.log", "-eo", "/w/stderr.log", "-cwd", "/repo", "-n", "4", "-R",
+            "span[hosts=1]", "-R", "rusage[mem=8000]", "-q", "regress", "/bin/sh", "/w/batch_job.sh"
+        ], commands.calls[0])
+        self.assertEqual(batch_runner.RUNNING, scheduler.state("1234"))
+        self.assertEqual(["bjobs", "-noheader", "-o", "jobid jobindex stat", "1234"], commands.calls[1])
+        scheduler.state("1234")
+        self.assertEqual(2, len(commands.calls))
+
+    def test_slurm_state_query_is_batched_and_unknown_jobs_are_none(self):
+        commands = _FakeCommands("77\n")
+        scheduler = batch_runner.SlurmScheduler(run_command=commands)
+        scheduler.submit("/w/a.sh", "a", "/w/a.out", "/w/a.err", "/repo", {})
+        commands.stdout = "78;cluster\n"
+        scheduler.submit("/w/b.sh", "b", "/w/b.out", "/w/b.err", "/repo", {})
+        commands.stdout = "77 TIMEOUT\n"
+
+        self.assertEqual(batch_runner.EXIT, scheduler.state("77"))
+        self.assertIsNone(scheduler.state("78"))
+        self.assertEqual(["squeue", "-h", "-r", "--states=all", "-o", "%i %T", "-j", "77,78"], commands.calls[-1])
+
+    def test_failed_state_query_keeps_last_known_states(self):
+        job = self._job("busy", "true")
+        commands = _FakeCommands("Job <42> is submitted to queue <normal>.")
+        scheduler = batch_runner.LsfScheduler(run_command=commands)
+        runner = _FastBatchJobRunner(job, None, scheduler)
+        commands.stdout = "42 0 RUN\n"
+        self.assertEqual(batch_runner.RUNNING, scheduler.state("42", max_age=0))
+
+        commands.stdout = ""
+        commands.returncode = 1
+        self.assertEqual(batch_runner.RUNNING, scheduler.state("42", max_age=0))
+
+        self.assertFalse(runner.check_for_done())
+        self.assertIsNone(runner.returncode)
+
+    def test_incomplete_scheduler_fails_when_created(self):
+
+        class _NoControl(batch_runner.CommandScheduler):
+
+            def _submit_argv(self, script_path, name, stdout_path, stderr_path, cwd, resources):
+                return ["submit", script_path]
+
+        with self.assertRaises(TypeError):
+            _NoControl()
+
+    def _array_job(self, commands):
+        array = SimpleNamespace(name="sweep", job_dir=os.path.join(self.temp_dir.name, "array"), log=_Logger())
+        os.makedirs(array.job_dir)
+        array.array_members = [self._job("sweep_{}".format(index), command) for index, command in enumerate(commands)]
+        return array
+
+    def _wait_until_done(self, runner):
+        deadline = time.monotonic() + 10
+        while not runner.check_for_done() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertTrue(runner.done)
+
+    def test_local_job_array_runs_every_member_from_one_script(self):
+        array = self._array_job(["echo first", "exit 3", "echo third"])
+
+        runner = _FastBatchArrayJobRunner(array, None, batch_runner.LocalScheduler())
+        self._wait_until_done(runner)
+
+        self.assertEqual([0, 3, 0], [member.job_lib.returncode for member in array.array_members])
+        self.assertEqual(3, runner.returncode)
+        self.assertEqual("third\n", Path(array.array_members[2].job_dir, "stdout.log").read_text())
+        self.assertEqual(["batch_array.sh"], [path.name for path in Path(array.job_dir).glob("*.sh")])
+        self.assertFalse(any(Path(member.job_dir, "batch_job.sh").exists() for member in array.array_members))
+
+    def test_job_array_kill_stops_every_member(self):
+        array = self._array_job(["sleep 30", "sleep 30"])
+        runner = _FastBatchArrayJobRunner(array, None, batch_runner.LocalScheduler())
+
+        self.assertTrue(runner.pause())
+        self.assertTrue(runner.resume())
+        self.assertTrue(runner.kill())
+        self.assertFalse(runner.shutdown_incomplete)
+        self.assertEqual([-signal.SIGTERM] * 2, [member.job_lib.returncode for member in array.array_members])
+
+    def test_lsf_job_array_is_one_submission_with_per_element_states(self):
+        commands = _FakeCommands("Job <1234> is submitted to default queue <normal>.")
+        scheduler = batch_runner.LsfScheduler(run_command=commands)
+
+        array_id, element_ids = scheduler.submit_array("/w/a.sh", "sweep", "/w/stdout.log", "/w/stderr.log", "/repo",
+                                                       {}, 3)
+        commands.stdout = "1234 1 RUN\n1234 2 DONE\n1234 3 PEND\n"
+
+        self.assertEqual("1234", array_id)
+        self.assertEqual(["1234[1]", "1234[2]", "1234[3]"], element_ids)
+        self.assertEqual([
+            "bsub", "-J", "sweep[1-3]", "-oo", "/w/stdout.log.%I", "-eo", "/w/stderr.log.%I", "-cwd", "/repo",
+            "/bin/sh", "/w/a.sh"
+        ], commands.calls[0])
+        self.assertEqual(batch_runner.DONE, scheduler.state("1234[2]"))
+        self.assertEqual(batch_runner.PENDING, scheduler.state("1234[3]"))
+        self.assertEqual(["bjobs", "-noheader", "-o", "jobid jobindex stat", "1234"], commands.calls[1])
+        self.assertEqual(2, len(commands.calls))
+
+    def test_slurm_job_array_submission_and_element_ids(self):
+        commands = _FakeCommands("77\n")
+        scheduler = batch_runner.SlurmScheduler(run_command=commands)
+
+        array_id, element_ids = scheduler.submit_array("/w/a.sh", "sweep", "/w/out", "/w/err", "/repo", {}, 2)
+        commands.stdout = "77_1 RUNNING\n77_2 COMPLETED\n"
+
+        self.assertEqual(("77", ["77_1", "77_2"]), (array_id, element_ids))
+        self.assertEqual("--array=1-2", commands.calls[0][1])
+        self.assertIn("/w/out.%a", commands.calls[0])
+        self.assertEqual(batch_runner.DONE, scheduler.state("77_2"))
+        self.assertEqual("77", commands.calls[1][-1])
+
+    def test_failed_submission_raises(self):
+        scheduler = batch_runner.SlurmScheduler(run_command=_FakeCommands("", returncode=1))
+
+        with self.assertRaises(RuntimeError):
+            scheduler.submit("/w/a.sh", "a", "/w/a.out", "/w/a.err", "/repo", {})
+
+
+if __name__ == "__main__":
+    unittest.main()
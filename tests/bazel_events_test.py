@@ -0,0 +1,157 @@
+import json
+import os
+import tempfile
+import unittest
+
+from lib import bazel_events
+
+
+class BazelEventsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "build_events.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write_events(self, events, torn_tail=""):
+        with open(self.path, "w") as build_events:
+            for event in events:
+                build_events.write(json.dumps(event) + "\n")
+            build_events.write(torn_tail)
+
+    def test_output_group_files_resolve_nested_file_sets(self):
+        self._write_events([
+            {
+                "id": {
+                    "namedSet": {
+                        "id": "1"
+                    }
+                },
+                "namedSetOfFiles": {
+                    "files": [{
+                        "name": "benches/tb/tests/b_test_cfg_info.json",
+                        "uri": "file:///out/benches/tb/tests/b_test_cfg_info.json"
+                    }]
+                },
+            },
+            {
+                "id": {
+                    "namedSet": {
+                        "id": "0"
+                    }
+                },
+                "namedSetOfFiles": {
+                    "files": [
+                        {
+                            "name": "a_test_cfg_info.json",
+                            "uri": "file:///out/with%20space/a_test_cfg_info.json"
+                        },
+                        {
+                            "name": "remote.json",
+                            "uri": "bytestream://cache/blobs/abc/1"
+                        },
+                    ],
+                    "fileSets": [{
+                        "id": "1"
+                    }],
+                },
+            },
+            {
+                "id": {
+                    "namedSet": {
+                        "id": "2"
+                    }
+                },
+                "namedSetOfFiles": {
+                    "files": [{
+                        "name": "run.sh",
+                        "uri": "file:///out/run.sh"
+                    }]
+                },
+            },
+            {
+                "id": {
+                    "targetCompleted": {
+                        "label": "//benches/tb/tests:a",
+                        "aspect": "//verilog/private:dv.bzl%verilog_dv_test_cfg_info_aspect"
+                    }
+                },
+                "completed": {
+                    "success": True,
+                    "outputGroup": [{
+                        "name": "verilog_dv_test_cfg_info",
+                        "fileSets": [{
+                            "id": "0"
+                        }]
+                    }]
+                },
+            },
+            {
+                "id": {
+                    "targetCompleted": {
+                        "label": "//benches/tb/tests:a"
+                    }
+                },
+                "completed": {
+                    "success": True,
+                    "outputGroup": [{
+                        "name": "default",
+                        "fileSets": [{
+                            "id": "2"
+                        }]
+                    }]
+                },
+            },
+        ],
+                           torn_tail='{"id": {"namedSet"')
+
+        self.assertEqual(
+            ["/out/benches/tb/tests/b_test_cfg_info.json", "/out/with space/a_test_cfg_info.json"],
+            bazel_events.output_group_files(self.path, "verilog_dv_test_cfg_info"),
+        )
+
+    def test_output_group_with_only_remote_files_is_an_error(self):
+        self._write_events([
+            {
+                "id": {
+                    "namedSet": {
+                        "id": "0"
+                    }
+                },
+                "namedSetOfFiles": {
+                    "files": [{
+                        "name": "a_test_cfg_info.json",
+                        "uri": "bytestream://cache/blobs/abc/1"
+                    }]
+                },
+            },
+            {
+                "id": {
+                    "targetCompleted": {
+                        "label": "//benches/tb/tests:a"
+                    }
+                },
+                "completed": {
+                    "outputGroup": [{
+                        "name": "verilog_dv_test_cfg_info",
+                        "fileSets": [{
+                            "id": "0"
+                        }]
+                    }]
+                },
+            },
+        ])
+
+        with self.assertRaisesRegex(ValueError, "bytestream://cache/blobs/abc/1"):
+            bazel_events.output_group_files(self.path, "verilog_dv_test_cfg_info")
+
+    def test_missing_output_group_returns_no_files(self):
+        self._write_events([{"id": {"buildStarted": {}}, "started": {"command": "build"}}])
+
+        self.assertEqual([], bazel_events.output_group_files(self.path, "verilog_dv_test_cfg_info"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,11 +2,12 @@ import os
 import subprocess
 import sys
 import tempfile
+import time
 import unittest
 from pathlib import Path
 from unittest import mock
 
-from lib import compile_cache
+from lib import compile_cache, content_store, digest_index
 from lib.compile_cache import (CompileDirectoryLock, can_reuse_compile, compile_fingerprint, discover_filelist_inputs,
                                invalidate_compile_fingerprint, normalize_compile_script_paths,
                                validate_compile_fingerprint, write_compile_fingerprint)
@@ -126,6 +127,87 @@ class CompileCacheTest(unittest.TestCase):
         with self.assertRaisesRegex(RuntimeError, r"compile_script_sha256, environment\.PATH"):
             validate_compile_fingerprint(job_dir, changed)
 
+    def test_shared_compile_key_ignores_checkout_paths_but_not_the_tool(self):
+        project, _, compile_args = self._project()
+        keys = []
+        for checkout in ("alice", "bob"):
+            job_dir = project / checkout / "sim" / "tb__VCS_VCOMP"
+            script = "cd {}\nvcs -Mdir={}/csrc -f compile.f\n".format(job_dir, job_dir)
+            fingerprint = compile_fingerprint(project, script, compile_args, extra_input_paths=[compile_args])
+            keys.append(
+                compile_cache.shared_compile_key(fingerprint, script, {
+                    "VCOMP_DIR": job_dir,
+                    "PROJ_DIR": project / checkout
+                }, {"tool_identity": "V-2023.12"}))
+        upgraded = compile_cache.shared_compile_key(fingerprint, script, {"VCOMP_DIR": job_dir},
+                                                    {"tool_identity": "W-2024.09"})
+
+        self.assertEqual(keys[0], keys[1])
+        self.assertNotEqual(keys[1], upgraded)
+
+    def test_shared_compile_outputs_are_discarded_before_a_local_compile(self):
+        project, _, _ = self._project()
+        published = project / "published"
+        (published / "simv.daidir").mkdir(parents=True)
+        (published / "simv").write_text("binary", encoding="utf-8")
+        store = content_store.ContentStore(project / "shared")
+        store.publish_tree(compile_cache.SHARED_COMPILE_KIND, "ab" * 32, published, ["simv", "simv.daidir"])
+        job_dir = project / "vcomp"
+
+        self.assertIsNone(compile_cache.materialize_shared_compile(store, "cd" * 32, job_dir))
+        self.assertEqual(["simv", "simv.daidir"], compile_cache.materialize_shared_compile(store, "ab" * 32, job_dir))
+        self.assertTrue((job_dir / "simv").is_file())
+
+        compile_cache.discard_shared_compile(job_dir)
+
+        self.assertEqual([], os.listdir(job_dir))
+        self.assertEqual("binary", (Path(store.path(compile_cache.SHARED_COMPILE_KIND, "ab" * 32)) /
+                                    "simv").read_text(encoding="utf-8"))
+
+    def test_explain_lists_changed_inputs_environment_and_script_lines(self):
+        project, source, compile_args = self._project()
+        inventory = project / "compile_inputs.txt"
+        inventory.write_text("source\ttop.sv\nsource\tcompile.f\n", encoding="utf-8")
+        job_dir = project / "vcomp"
+        recorded = {}
+        fingerprint = compile_fingerprint(project,
+                                          "cd vcomp\nvcs -f compile.f\n",
+                                          compile_args,
+                                          inventory,
+                                          project,
+                                          environment={"VCS_HOME": "/tools/vcs/Y"},
+                                          inputs_manifest=recorded)
+        self.assertEqual(["No previous compile fingerprint in {}".format(job_dir)],
+                         compile_cache.explain_compile_changes(job_dir, fingerprint, recorded))
+        write_compile_fingerprint(job_dir, fingerprint)
+        compile_cache.write_compile_inputs_manifest(job_dir, recorded)
+        self.assertEqual([], compile_cache.explain_compile_changes(job_dir, fingerprint, recorded))
+
+        source.write_text("module top; logic changed; endmodule\n", encoding="utf-8")
+        current = {}
+        changed = compile_fingerprint(project,
+                                      "cd vcomp\nvcs -debug_access -f compile.f\n",
+                                      compile_args,
+                                      inventory,
+                                      project,
+                                      environment={"VCS_HOME": "/tools/vcs/Z"},
+                                      inputs_manifest=current)
+
+        self.assertEqual([
+            "Changed fingerprint fields: compile_inputs_sha256, compile_script_sha256, environment.VCS_HOME",
+            "environment VCS_HOME: '/tools/vcs/Y' -> '/tools/vcs/Z'",
+            "changed input top.sv",
+            "compile script -vcs -f compile.f",
+            "compile script +vcs -debug_access -f compile.f",
+        ], compile_cache.explain_compile_changes(job_dir, changed, current))
+
+        (job_dir / compile_cache.INPUTS_MANIFEST_FILE).unlink()
+        self.assertIn("No per-input record from the previous compile",
+                      compile_cache.explain_compile_changes(job_dir, changed, current)[-1])
+        compile_cache.write_compile_inputs_manifest(job_dir, recorded)
+        invalidate_compile_fingerprint(job_dir)
+        self.assertFalse((job_dir / compile_cache.INPUTS_MANIFEST_FILE).exists())
+
     def test_automatic_reuse_turns_validation_failure_into_cache_miss(self):
         project, _, compile_args = self._project()
         job_dir = project / "vcomp"
@@ -177,6 +259,21 @@ class CompileCacheTest(unittest.TestCase):
 
         self.assertEqual(direct, precomputed)
 
+    def test_bazel_compile_input_digest_matches_direct_hash(self):
+        project, _, compile_args = self._project()
+        inventory = project / "compile_inputs.txt"
+        inventory.write_text("source\ttop.sv\nsource\tcompile.f\n", encoding="utf-8")
+        manifest = project / "digest_manifest.txt"
+        manifest.write_text("source\ttop.sv\t{}\nsource\tcompile.f\t{}\n".format(project / "top.sv", compile_args),
+                            encoding="utf-8")
+        digest = project / "compile_inputs.sha256"
+        tool = Path(__file__).resolve().parents[1] / "verilog" / "private" / "compile_input_digest.py"
+
+        subprocess.run([sys.executable, str(tool), str(manifest), str(digest)], check=True)
+
+        direct = compile_fingerprint(project, "vcs -f compile.f", compile_args, inventory, project)
+        self.assertEqual(direct["compile_inputs_sha256"] + "\n", digest.read_text(encoding="ascii"))
+
     def test_precomputed_compile_input_digest_rejects_malformed_content(self):
         project, _, compile_args = self._project()
         inventory = project / "compile_inputs.txt"
@@ -245,6 +342,37 @@ class CompileCacheTest(unittest.TestCase):
         )
         self.assertEqual(config_changed["extra_inputs_content_sha256"], equivalent["extra_inputs_content_sha256"])
 
+    def test_unchanged_inputs_are_not_read_again_through_the_digest_index(self):
+        project, source, compile_args = self._project()
+        inventory = project / "compile_inputs.txt"
+        inventory.write_text("source\ttop.sv\n", encoding="utf-8")
+        job_dir = project / "vcomp"
+        old = time.time() - 60
+        for path in (source, compile_args):
+            os.utime(path, (old, old))
+        digests = compile_cache.compile_digest_index(job_dir)
+        initial = compile_fingerprint(project, "vcs -f compile.f", compile_args, inventory, project, digests=digests)
+        digests.save()
+
+        digests = compile_cache.compile_digest_index(job_dir)
+        with mock.patch("lib.digest_index.file_sha256", side_effect=AssertionError("input was read")):
+            unchanged = compile_fingerprint(project,
+                                            "vcs -f compile.f",
+                                            compile_args,
+                                            inventory,
+                                            project,
+                                            digests=digests)
+        self.assertEqual(initial, unchanged)
+        self.assertEqual((0, 2), (digests.hashed, digests.reused))
+
+        source.write_text("module top; logic changed; endmodule\n", encoding="utf-8")
+        changed = compile_fingerprint(project, "vcs -f compile.f", compile_args, inventory, project, digests=digests)
+        self.assertNotEqual(initial, changed)
+        forced = compile_cache.compile_digest_index(job_dir, force=True)
+        self.assertEqual(
+            changed, compile_fingerprint(project, "vcs -f compile.f", compile_args, inventory, project, digests=forced))
+        self.assertEqual(2, forced.hashed)
+
     def test_filelist_input_discovery_tracks_nested_sources_and_include_directories(self):
         runfiles = Path(tempfile.mkdtemp())
         external = Path(tempfile.mkdtemp())
@@ -263,7 +391,7 @@ class CompileCacheTest(unittest.TestCase):
 
         self.assertEqual(sorted(map(str, (root, nested, source, header))), inputs)
 
-        with mock.patch("lib.compile_cache._file_bytes", wraps=compile_cache._file_bytes) as read_file:
+        with mock.patch("lib.digest_index.file_sha256", wraps=digest_index.file_sha256) as read_file:
             compile_fingerprint(
                 external,
                 "vcs -f {}".format(root),
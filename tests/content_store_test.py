@@ -0,0 +1,99 @@
+import os
+import stat
+import tempfile
+import unittest
+
+from lib import content_store
+
+
+class ContentStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = content_store.ContentStore(os.path.join(self.temp_dir.name, "shared"))
+
+    def tearDown(self):
+        for root, dirs, _ in os.walk(self.temp_dir.name):
+            for directory in dirs:
+                os.chmod(os.path.join(root, directory), 0o755)
+        self.temp_dir.cleanup()
+
+    def test_content_key_ignores_key_order(self):
+        self.assertEqual(content_store.content_key({"a": 1, "b": [2]}), content_store.content_key({"b": [2], "a": 1}))
+        self.assertNotEqual(content_store.content_key({"a": 1}), content_store.content_key({"a": 2}))
+
+    def test_first_publish_wins_and_entries_are_read_only(self):
+        key = content_store.content_key({"commit": "abc"})
+
+        self.assertIsNone(self.store.read_json("discovery", key))
+        self.assertTrue(self.store.publish_json("discovery", key, {"generation": 1}))
+        self.assertFalse(self.store.publish_json("discovery", key, {"generation": 2}))
+
+        self.assertEqual({"generation": 1}, self.store.read_json("discovery", key))
+        path = self.store.path("discovery", key)
+        self.assertEqual(0o444, stat.S_IMODE(os.stat(path).st_mode))
+        self.assertEqual([key], os.listdir(os.path.dirname(path)))
+
+    @unittest.skipIf(hasattr(os, "geteuid") and os.geteuid() == 0, "root ignores directory permissions")
+    def test_read_only_store_is_still_read(self):
+        key = content_store.content_key({"commit": "abc"})
+        self.store.publish_json("discovery", key, {"generation": 1})
+        os.chmod(os.path.dirname(self.store.path("discovery", key)), 0o555)
+
+        self.assertEqual({"generation": 1}, self.store.read_json("discovery", key))
+        with self.assertRaises(OSError):
+            self.store.publish_json("discovery", key[:2] + "0" * 62, {"generation": 2})
+
+    def test_tree_entries_are_published_once_and_materialized_as_links(self):
+        source = os.path.join(self.temp_dir.name, "vcomp")
+        os.makedirs(os.path.join(source, "simv.daidir"))
+        with open(os.path.join(source, "simv"), "w") as filep:
+            filep.write("binary")
+        os.chmod(os.path.join(source, "simv"), 0o755)
+        with open(os.path.join(source, "simv.daidir", "db"), "w") as filep:
+            filep.write("database")
+        os.chmod(os.path.join(source, "simv.daidir", "db"), 0o600)
+        with open(os.path.join(source, "cmp.log"), "w") as filep:
+            filep.write("log")
+        key = content_store.content_key({"fingerprint": "abc"})
+
+        self.assertIsNone(self.store.tree_names("compile", key))
+        self.assertTrue(self.store.publish_tree("compile", key, source, ["simv", "simv.daidir"]))
+        self.assertFalse(self.store.publish_tree("compile", key, source, ["cmp.log"]))
+        self.assertEqual(["simv", "simv.daidir"], self.store.tree_names("compile", key))
+        stored_simv = os.path.join(self.store.path("compile", key), "simv")
+        self.assertEqual(0o555, stat.S_IMODE(os.stat(stored_simv).st_mode))
+        self.assertEqual(0o444, stat.S_IMODE(os.stat(os.path.join(stored_simv + ".daidir", "db")).st_mode))
+
+        destination = os.path.join(self.temp_dir.name, "other", "vcomp")
+        os.makedirs(os.path.join(destination, "simv.daidir"))
+        with open(os.path.join(destination, "simv.daidir", "stale"), "w") as filep:
+            filep.write("stale")
+
+        self.assertEqual(["simv", "simv.daidir"], self.store.materialize_tree("compile", key, destination))
+        self.assertEqual(["db"], os.listdir(os.path.join(destination, "simv.daidir")))
+        self.assertTrue(os.path.samefile(stored_simv, os.path.join(destination, "simv")))
+        self.assertIsNone(self.store.materialize_tree("compile", key[:2] + "0" * 62, destination))
+
+    def test_tree_entries_are_readable_by_other_users(self):
+        source = os.path.join(self.temp_dir.name, "vcomp")
+        os.makedirs(os.path.join(source, "simv.daidir"))
+        with open(os.path.join(source, "simv.daidir", "db"), "w") as filep:
+            filep.write("database")
+        key = content_store.content_key({"fingerprint": "abc"})
+        old_umask = os.umask(0o077)
+        try:
+            self.assertTrue(self.store.publish_tree("compile", key, source, ["simv.daidir"]))
+        finally:
+            os.umask(old_umask)
+
+        entry = self.store.path("compile", key)
+        for directory in (entry, os.path.join(entry, "simv.daidir")):
+            mode = stat.S_IMODE(os.stat(directory).st_mode)
+            self.assertEqual(stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH,
+                             mode & (stat.S_IRWXG | stat.S_IRWXO), oct(mode))
+        self.assertTrue(stat.S_IMODE(os.stat(os.path.join(entry, "simv.daidir", "db")).st_mode) & stat.S_IROTH)
+
+
+if __name__ == "__main__":
+    unittest.main()
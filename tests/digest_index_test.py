@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from lib import digest_index
+
+
+class DigestIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.temp_dir.name, "cache", "digests.json")
+        self.source = os.path.join(self.temp_dir.name, "BUILD")
+        self._write(self.source, "filegroup(name = 'first')\n", age_s=60)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def _write(path, text, age_s):
+        with open(path, "w") as filep:
+            filep.write(text)
+        timestamp = time.time() - age_s
+        os.utime(path, (timestamp, timestamp))
+
+    def _saved_index(self):
+        index = digest_index.DigestIndex(self.index_path)
+        digest = index.sha256(self.source)
+        index.save()
+        return digest
+
+    def test_unchanged_files_are_not_read_again(self):
+        expected = self._saved_index()
+
+        index = digest_index.DigestIndex(self.index_path)
+        with mock.patch.object(digest_index, "file_sha256", side_effect=AssertionError("file was read")):
+            self.assertEqual(expected, index.sha256(self.source))
+        self.assertEqual((0, 1), (index.hashed, index.reused))
+
+    def test_changed_stat_identity_rehashes(self):
+        first = self._saved_index()
+        self._write(self.source, "filegroup(name = 'other')\n", age_s=60)
+
+        index = digest_index.DigestIndex(self.index_path)
+
+        self.assertNotEqual(first, index.sha256(self.source))
+        self.assertEqual(1, index.hashed)
+
+    def test_force_ignores_stored_digests_and_missing_files_have_none(self):
+        self._saved_index()
+
+        index = digest_index.DigestIndex(self.index_path, force=True)
+        index.sha256(self.source)
+        index.sha256(self.source)
+
+        self.assertEqual((1, 1), (index.hashed, index.reused))
+        self.assertIsNone(index.sha256(os.path.join(self.temp_dir.name, "missing")))
+
+    def test_recently_modified_files_are_not_remembered_and_prune_drops_unused(self):
+        fresh = os.path.join(self.temp_dir.name, "fresh.bzl")
+        self._write(fresh, "x = 1\n", age_s=0)
+        index = digest_index.DigestIndex(self.index_path)
+        index.sha256(self.source)
+        index.sha256(fresh)
+        index.save()
+
+        with open(self.index_path) as filep:
+            self.assertEqual([os.path.abspath(self.source)], list(json.load(filep)["entries"]))
+
+        reopened = digest_index.DigestIndex(self.index_path)
+        reopened.save(prune=True)
+        with open(self.index_path) as filep:
+            self.assertEqual({}, json.load(filep)["entries"])
+
+    def test_large_files_and_file_lists_hash_like_hashlib(self):
+        large = os.path.join(self.temp_dir.name, "vip.svp")
+        content = os.urandom(digest_index.MMAP_MIN_BYTES + 17)
+        with open(large, "wb") as filep:
+            filep.write(content)
+        missing = os.path.join(self.temp_dir.name, "missing")
+
+        digests = digest_index.sha256_files([large, missing, self.source], max_workers=2)
+
+        with open(self.source, "rb") as filep:
+            source_digest = hashlib.sha256(filep.read()).hexdigest()
+        self.assertEqual([hashlib.sha256(content).hexdigest(), None, source_digest], digests)
+
+
+if __name__ == "__main__":
+    unittest.main()
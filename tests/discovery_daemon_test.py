@@ -0,0 +1,128 @@
+import hashlib
+import os
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from lib import discovery_daemon
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@unittest.skipUnless(os.name == "posix", "unix domain sockets")
+class DiscoveryDaemonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.proj_dir = self.temp_dir.name
+        self.build_file = os.path.join(self.proj_dir, "benches", "soc_tb", "BUILD")
+        os.makedirs(os.path.dirname(self.build_file))
+        self._write(self.build_file, "dv_tb(name = 'soc_tb')\n")
+        self.manifest_calls = 0
+        self.runtime_dir = os.path.join(self.proj_dir, "run")
+        os.mkdir(self.runtime_dir, 0o700)
+        environ = mock.patch.dict(os.environ, {"XDG_RUNTIME_DIR": self.runtime_dir})
+        environ.start()
+        self.addCleanup(environ.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def _write(path, text):
+        with open(path, "w") as filep:
+            filep.write(text)
+
+    def _manifest(self):
+        self.manifest_calls += 1
+        with open(self.build_file, "rb") as filep:
+            digest = hashlib.sha256(filep.read()).hexdigest()
+        return {"schema_version": 5, "files": [{"path": "benches/soc_tb/BUILD", "sha256": digest}]}
+
+    def _start(self):
+        daemon = discovery_daemon.DiscoveryDaemon(
+            self.proj_dir,
+            self._manifest,
+            lambda relative_path: os.path.basename(relative_path).startswith("BUILD"),
+        )
+        thread = threading.Thread(target=daemon.serve, daemon=True)
+        thread.start()
+        self.assertTrue(daemon.ready.wait(5.0))
+
+        def stop():
+            daemon.stop()
+            thread.join(5.0)
+
+        self.addCleanup(stop)
+        return daemon
+
+    def test_lookup_without_daemon_falls_back(self):
+        self.assertIsNone(discovery_daemon.lookup(self.proj_dir, "scope"))
+        self.assertFalse(discovery_daemon.publish(self.proj_dir, "scope", {}, {}))
+
+    def test_published_results_are_served_until_a_dependency_changes(self):
+        daemon = self._start()
+        discovery = {"all_vcomp": {"//benches/soc_tb:soc_tb": {}}, "tests_to_tags": {}, "tests_to_simulator": {}}
+        manifest = dict(self._manifest(), discovery_query="kind(dv_tb, //benches/...)")
+
+        self.assertTrue(discovery_daemon.publish(self.proj_dir, "scope", manifest, discovery))
+        self.assertEqual(discovery, discovery_daemon.lookup(self.proj_dir, "scope"))
+        self.assertIsNone(discovery_daemon.lookup(self.proj_dir, "other-scope"))
+
+        if daemon.watching:
+            calls = self.manifest_calls
+            generation = daemon._generation
+            self._write(os.path.join(self.proj_dir, "benches", "soc_tb", "notes.txt"), "unrelated\n")
+            time.sleep(0.3)
+            self.assertEqual(generation, daemon._generation)
+            self.assertEqual(discovery, discovery_daemon.lookup(self.proj_dir, "scope"))
+            self.assertEqual(calls, self.manifest_calls)
+
+        self._write(self.build_file, "dv_tb(name = 'renamed_tb')\n")
+        if daemon.watching:
+            self.assertTrue(_wait_for(lambda: daemon._generation != generation))
+        self.assertIsNone(discovery_daemon.lookup(self.proj_dir, "scope"))
+
+    def test_status_and_shutdown_requests(self):
+        daemon = self._start()
+
+        status = discovery_daemon.request(self.proj_dir, {"op": "status"})
+        self.assertEqual(os.getpid(), status["pid"])
+        self.assertEqual(daemon.watching, status["watching"])
+
+        self.assertEqual("ok", discovery_daemon.request(self.proj_dir, {"op": "shutdown"})["status"])
+        self.assertTrue(_wait_for(lambda: not os.path.exists(daemon.path)))
+        self.assertIsNone(discovery_daemon.request(self.proj_dir, {"op": "status"}))
+
+    def test_socket_lives_in_a_private_directory(self):
+        daemon = self._start()
+
+        info = os.lstat(os.path.dirname(daemon.path))
+        self.assertEqual(os.path.join(self.runtime_dir, "simmer"), os.path.dirname(daemon.path))
+        self.assertEqual(os.getuid(), info.st_uid)
+        self.assertEqual(0o700, stat.S_IMODE(info.st_mode))
+
+    def test_shared_socket_directory_is_refused(self):
+        socket_dir = os.path.join(self.runtime_dir, "simmer")
+        os.mkdir(socket_dir)
+        os.chmod(socket_dir, 0o777)
+        daemon = discovery_daemon.DiscoveryDaemon(self.proj_dir, self._manifest, lambda relative_path: False)
+
+        with self.assertRaises(RuntimeError):
+            daemon.serve()
+        self.assertIsNone(discovery_daemon.request(self.proj_dir, {"op": "status"}))
+        self.assertFalse(os.path.exists(daemon.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
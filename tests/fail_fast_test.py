@@ -0,0 +1,98 @@
+import unittest
+from types import SimpleNamespace
+
+from lib import fail_fast
+from lib.job_lib import Job, JobManager, JobStatus
+
+
+class _Logger:
+
+    def __getattr__(self, _):
+        return lambda *args, **kwargs: None
+
+
+class _Iteration(Job):
+
+    @property
+    def execution_mode(self):
+        return "parallel"
+
+
+class _IterationCfg:
+
+    def __init__(self):
+        self.jobs = []
+
+
+class FailFastTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = JobManager({"idle_print_seconds": 60, "quit_count": 100, "active_job_limit": 2}, _Logger())
+        self.rcfg = SimpleNamespace(options=SimpleNamespace(timeout=1), log=_Logger())
+        self.vcomp = _Iteration(self.rcfg, "sys_tb")
+
+    def tearDown(self):
+        self.manager.stop()
+
+    def _test(self, name, iterations):
+        icfg = _IterationCfg()
+        for _ in range(iterations):
+            job = _Iteration(self.rcfg, name)
+            job.icfg = icfg
+            job.vcomper = self.vcomp
+            job.add_dependency(self.vcomp)
+            icfg.jobs.append(job)
+        return icfg
+
+    def _fail(self, job, message):
+        job.jobstatus = JobStatus.FAILED
+        job.error_message = message
+
+    def test_signature_masks_seeds_times_and_paths(self):
+        first = fail_fast.error_signature("\nUVM_ERROR @ 1200ns: /sim/run_s123/tb.sv(42) [SCB] mismatch 0xdead\n")
+        second = fail_fast.error_signature("UVM_ERROR @ 97ns: /sim/run_s7/tb.sv(42) [SCB] mismatch 0xbeef")
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, fail_fast.error_signature("UVM_FATAL @ 97ns: [CFG] missing config"))
+        self.assertEqual("", fail_fast.error_signature(None))
+
+    def test_matching_failures_skip_only_that_tests_queued_iterations(self):
+        broken = self._test("broken", 5)
+        healthy = self._test("healthy", 2)
+        for job in broken.jobs[2:] + healthy.jobs:
+            self.manager.add_job(job)
+        child = _Iteration(self.rcfg, "report")
+        child.add_dependency(broken.jobs[4])
+        self.manager.add_job(child)
+        policy = fail_fast.FailFastPolicy(2, _Logger())
+
+        self._fail(broken.jobs[0], "UVM_ERROR @ 10ns: [SCB] mismatch\n")
+        self.assertEqual([], policy.record(broken.jobs[0], self.manager))
+        self._fail(broken.jobs[1], "UVM_ERROR @ 55ns: [SCB] mismatch\n")
+        skipped = policy.record(broken.jobs[1], self.manager)
+
+        self.assertEqual(broken.jobs[2:], skipped)
+        self.assertTrue(all(job.jobstatus == JobStatus.SKIPPED for job in broken.jobs[2:] + [child]))
+        self.assertTrue(all(job.jobstatus == JobStatus.NOT_STARTED for job in healthy.jobs))
+        self.assertTrue(policy.test_cancelled(broken))
+        self.assertEqual([("sys_tb", "broken", 2, 3, "UVM_ERROR @ <n>ns: [SCB] mismatch")], policy.cancelled)
+
+    def test_different_errors_or_a_pass_keep_the_test_running(self):
+        flaky = self._test("flaky", 4)
+        self.manager.add_job(flaky.jobs[3])
+        policy = fail_fast.FailFastPolicy(2, _Logger())
+
+        self._fail(flaky.jobs[0], "UVM_ERROR [SCB] mismatch")
+        policy.record(flaky.jobs[0], self.manager)
+        self._fail(flaky.jobs[1], "UVM_FATAL [TIMEOUT] watchdog expired")
+        policy.record(flaky.jobs[1], self.manager)
+        flaky.jobs[2].jobstatus = JobStatus.PASSED
+        policy.record(flaky.jobs[2], self.manager)
+        self._fail(flaky.jobs[3], "UVM_ERROR [SCB] mismatch")
+
+        self.assertEqual([], policy.record(flaky.jobs[3], self.manager))
+        self.assertFalse(policy.test_cancelled(flaky))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import shlex
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from lib import compile_cache, digest_index, filelist_graph
+
+
+class FilelistGraphTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.cache_path = os.path.join(self.root, "cache", filelist_graph.FILELIST_CACHE_FILE)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, relative_path, text, age_s=60):
+        path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as filep:
+            filep.write(text)
+        timestamp = time.time() - age_s
+        os.utime(path, (timestamp, timestamp))
+        os.utime(os.path.dirname(path), (timestamp, timestamp))
+        return path
+
+    def test_tokenizer_matches_shlex(self):
+        for text in (
+                "top.sv  +incdir+inc\n-f nested.f # comment\n\t-y lib # -v other.v\n",
+                "a#b c\n#only a comment\n",
+                "'quoted path.sv' \"other path.sv\" escaped\\ space.sv\n",
+                "",
+        ):
+            self.assertEqual(shlex.split(text, comments=True), filelist_graph.tokenize(text, posix=True), text)
+
+    def test_filelists_are_tokenized_once_per_content_and_across_runs(self):
+        header = self._write("vip/include/vip.svh", "`define VIP\n")
+        source = self._write("vip/vip_pkg.sv", "package vip_pkg; endpackage\n")
+        vip = self._write("vip/vip.f", "{}\n+incdir+{}\n".format(source, os.path.dirname(header)))
+        root = self._write("tb/compile.f", "-f {}\n".format(vip))
+        expected = sorted([root, vip, source, header])
+        digests = digest_index.DigestIndex(os.path.join(self.root, "cache", "digests.json"))
+        cache = filelist_graph.FilelistCache(self.cache_path)
+
+        self.assertEqual(expected, compile_cache.discover_filelist_inputs(root, self.root, cache, digests))
+        cache.save()
+        digests.save()
+
+        cache = filelist_graph.FilelistCache(self.cache_path)
+        digests = digest_index.DigestIndex(os.path.join(self.root, "cache", "digests.json"))
+        with mock.patch.object(filelist_graph, "tokenize", side_effect=AssertionError("filelist was parsed")), \
+                mock.patch.object(filelist_graph, "_walk", side_effect=AssertionError("directory was walked")):
+            self.assertEqual(expected, compile_cache.discover_filelist_inputs(root, self.root, cache, digests))
+
+    def test_directory_listing_is_refreshed_when_an_entry_is_added(self):
+        header = self._write("inc/first.svh", "`define FIRST\n")
+        cache = filelist_graph.FilelistCache(self.cache_path)
+        self.assertEqual([header], cache.directory_files(os.path.dirname(header)))
+
+        added = self._write("inc/second.svh", "`define SECOND\n", age_s=0)
+
+        self.assertEqual([header, added], cache.directory_files(os.path.dirname(header)))
+
+
+if __name__ == "__main__":
+    unittest.main()
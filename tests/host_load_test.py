@@ -0,0 +1,154 @@
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from lib import host_load
+from lib.job_lib import JobManager, JobStatus
+
+
+class _Logger:
+
+    def __getattr__(self, _):
+        return lambda *args, **kwargs: None
+
+
+class _Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self):
+        self.now += host_load.AdaptiveJobLimit.ADJUST_INTERVAL_SECONDS
+
+
+def _finished_job(expected_s, actual_s, from_history=True, wall_s=None):
+    return SimpleNamespace(expected_duration_s=expected_s,
+                           simulation_duration_s=actual_s,
+                           duration_s=actual_s if wall_s is None else wall_s,
+                           duration_from_history=from_history,
+                           jobstatus=JobStatus.PASSED)
+
+
+class HostLoadSamplingTest(unittest.TestCase):
+
+    def test_pressure_and_loadavg_are_parsed(self):
+        with tempfile.TemporaryDirectory() as root:
+            Path(root, "io").write_text("some avg10=23.50 avg60=10.00 avg300=2.00 total=1234\n"
+                                        "full avg10=11.00 avg60=5.00 avg300=1.00 total=567\n")
+            Path(root, "loadavg").write_text("12.50 8.00 4.00 3/900 4242\n")
+
+            self.assertEqual(23.5, host_load.read_pressure("io", root=root))
+            self.assertIsNone(host_load.read_pressure("memory", root=root))
+            self.assertEqual(12.5, host_load.read_loadavg(str(Path(root, "loadavg"))))
+
+
+class AdaptiveJobLimitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = _Clock()
+        self.load = host_load.HostLoad(load1=1.0, io_pressure=0.0, memory_pressure=0.0)
+
+    def _controller(self, initial=4, minimum=1, maximum=8):
+        return host_load.AdaptiveJobLimit(initial,
+                                          minimum,
+                                          maximum,
+                                          cpu_count=8,
+                                          sampler=lambda: self.load,
+                                          clock=self.clock)
+
+    def test_limit_only_changes_once_per_interval(self):
+        controller = self._controller()
+
+        self.assertIsNone(controller.update(saturated=True))
+        self.clock.advance()
+        self.assertEqual(5, controller.update(saturated=True)[0])
+        self.assertIsNone(controller.update(saturated=True))
+
+    def test_headroom_grows_the_limit_only_while_jobs_wait(self):
+        controller = self._controller(maximum=5)
+
+        self.clock.advance()
+        self.assertIsNone(controller.update(saturated=False))
+        self.clock.advance()
+        self.assertEqual(5, controller.update(saturated=True)[0])
+        self.clock.advance()
+        self.assertIsNone(controller.update(saturated=True))
+
+    def test_pressure_backs_off_toward_the_minimum(self):
+        controller = self._controller(initial=8, minimum=3)
+        self.load = host_load.HostLoad(load1=1.0, io_pressure=45.0, memory_pressure=None)
+
+        self.clock.advance()
+        limit, reason = controller.update(saturated=True)
+        self.assertEqual(6, limit)
+        self.assertIn("I/O pressure", reason)
+        for _ in range(3):
+            self.clock.advance()
+            controller.update(saturated=True)
+        self.assertEqual(3, controller.limit)
+
+    def test_step_that_slows_jobs_down_is_reverted(self):
+        controller = self._controller()
+
+        self.clock.advance()
+        controller.record_completion(_finished_job(100, 100))
+        self.assertEqual(5, controller.update(saturated=True)[0])
+        # Five slots at half speed do less work than four at full speed.
+        controller.record_completion(_finished_job(100, 200))
+        self.clock.advance()
+        limit, reason = controller.update(saturated=True)
+        self.assertEqual(4, limit)
+        self.assertIn("throughput fell", reason)
+        self.clock.advance()
+        self.assertIsNone(controller.update(saturated=True))
+
+    def test_jobs_without_history_do_not_measure_throughput(self):
+        controller = self._controller()
+
+        self.clock.advance()
+        controller.record_completion(_finished_job(100, 100))
+        self.assertEqual(5, controller.update(saturated=True)[0])
+        # A median fallback estimate says nothing about how fast the job ran.
+        controller.record_completion(_finished_job(100, 200, from_history=False))
+        self.clock.advance()
+        self.assertEqual(6, controller.update(saturated=True)[0])
+
+    def test_speed_compares_simulation_time_not_wall_time(self):
+        controller = self._controller()
+
+        self.clock.advance()
+        controller.record_completion(_finished_job(100, 100))
+        self.assertEqual(5, controller.update(saturated=True)[0])
+        # Setup and queueing time on top of the simulation is not a slowdown.
+        controller.record_completion(_finished_job(100, 100, wall_s=200))
+        self.clock.advance()
+        self.assertEqual(6, controller.update(saturated=True)[0])
+
+    def test_bounds_are_validated(self):
+        with self.assertRaises(ValueError):
+            self._controller(minimum=0)
+        with self.assertRaises(ValueError):
+            self._controller(minimum=4, maximum=2)
+        self.assertEqual(8, self._controller(initial=20).limit)
+
+    def test_job_manager_starts_from_clamped_limit(self):
+        manager = JobManager(
+            {
+                "idle_print_seconds": 60,
+                "quit_count": 10,
+                "active_job_limit": 32,
+                "adaptive_job_limits": (1, 12),
+            }, _Logger())
+        try:
+            self.assertEqual(12, manager.active_job_limit)
+            self.assertEqual(JobManager.DEFAULT_HOOK_WORKERS, manager.hook_workers)
+        finally:
+            manager.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
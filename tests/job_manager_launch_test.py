@@ -11,7 +11,7 @@ from types import SimpleNamespace
 from unittest import mock
 
 from lib import rv_utils
-from lib.job_lib import BazelTBJob, BazelTestCfgJob, Job, JobManager, JobStatus, SubprocessJobRunner
+from lib.job_lib import BazelTBJob, BazelTestCfgJob, Job, JobManager, JobStatus, SubprocessJobRunner, _HookPool
 
 
 class _Logger:
@@ -83,6 +83,29 @@ class _PausableRunner:
         return True
 
 
+class _PassingJob(Job):
+
+    def post_run(self):
+        super().post_run()
+        self.jobstatus = JobStatus.PASSED
+
+
+class _ResourceJob(Job):
+
+    def __init__(self, rcfg, name, resources, execution_mode="parallel"):
+        super().__init__(rcfg, name)
+        self._resources = resources
+        self._execution_mode = execution_mode
+
+    @property
+    def execution_mode(self):
+        return self._execution_mode
+
+    @property
+    def resources(self):
+        return self._resources
+
+
 class _IncompleteCompletionRunner:
 
     def __init__(self, job, _manager):
@@ -577,6 +600,275 @@ class JobManagerLaunchTest(unittest.TestCase):
             SubprocessJobRunner.TERM_GRACE_SECONDS + 2 * SubprocessJobRunner.KILL_GRACE_SECONDS,
         )
 
+    @unittest.skipUnless(hasattr(os, "pidfd_open"), "pidfd exit notification")
+    def test_process_exit_wakes_scheduler_without_timeout_polling(self):
+        log = _Logger()
+        rcfg = SimpleNamespace(options=SimpleNamespace(timeout=1, no_stdout=False), log=log)
+        manager = JobManager({"idle_print_seconds": 60, "quit_count": 1, "active_job_limit": 2}, log)
+        manager.TIMEOUT_POLL_SECONDS = 60
+        jobs = []
+        for name in ("first", "second"):
+            job = _PassingJob(rcfg, name)
+            job.job_dir = tempfile.mkdtemp()
+            job.main_cmdline = "sleep 0.3"
+            jobs.append(job)
+
+        try:
+            start = time.monotonic()
+            for job in jobs:
+                manager.add_job(job)
+            manager.wait()
+            self.assertLess(time.monotonic() - start, 5.0)
+            self.assertEqual(set(jobs), set(manager._done))
+            self.assertEqual(set(), manager._exit_watched)
+        finally:
+            manager.stop()
+
+    def test_exit_watched_jobs_are_only_polled_for_timeout_bookkeeping(self):
+        log = _Logger()
+        rcfg = SimpleNamespace(options=SimpleNamespace(timeout=1), log=log)
+        manager = JobManager({"idle_print_seconds": 60, "quit_count": 1}, log)
+        manager.stop()
+        watched = Job(rcfg, "watched")
+        polled = Job(rcfg, "polled")
+        escalating = Job(rcfg, "escalating")
+        watched.job_lib = SimpleNamespace(signal_escalation_pending=False)
+        polled.job_lib = SimpleNamespace()
+        escalating.job_lib = SimpleNamespace(signal_escalation_pending=True)
+        manager._active = [watched, polled, escalating]
+        manager._exit_watched = {watched, escalating}
+        manager._next_timeout_poll = time.monotonic() + 60
+
+        self.assertEqual([polled, escalating], manager._jobs_to_check_locked())
+        self.assertEqual(manager.POLL_SLEEP_SECONDS, manager._poll_timeout_locked())
+
+        manager._next_timeout_poll = time.monotonic() - 1
+        self.assertEqual([watched, polled, escalating], manager._jobs_to_check_locked())
+
+    def test_launch_path_logs_queue_lengths_not_queue_contents(self):
+        log = mock.Mock()
+        rcfg = SimpleNamespace(options=SimpleNamespace(timeout=1), log=_Logger())
+        manager = JobManager({"idle_print_seconds": 60, "quit_count": 1}, log)
+        manager.stop()
+        manager._ready = [Job(rcfg, "queued_{}".format(index)) for index in range(3)]
+
+        manager._debug_state_locked()
+
+        message, *counts = log.debug.call_args.args
+        self.assertNotIn("queued_", message % tuple(counts))
+        self.assertIn(3, counts)
+
+    def test_stop_then_kill_does_not_wake_a_closed_exit_notifier(self):
+        log = _Logger()
+        manager = JobManager({"idle_print_seconds": 60, "quit_count": 1}, log)
+        manager.stop()
+
+        with mock.patch("lib.job_lib.os.write") as write:
+            manager._exit_notifier.close()
+            manager._exit_notifier.unwatch(None)
+
+        write.assert_not_called()
+        self.assertIsNone(manager._exit_notifier._wake_write)
+
+    def test_completed_dependency_only_promotes_its_own_children(self):
+        log = _Logger()
+        rcfg = SimpleNamespace(options=SimpleNamespace(timeout=1), log=log)
+        manager = JobManager({"idle_print_seconds": 60, "quit_count": 1}, log)
+        manager.stop()
+        passing = Job(rcfg, "passing")
+        failing = Job(rcfg, "failing")
+        unrelated = Job(rcfg, "unrelated")
+        children = [Job(rcfg, "child{}".format(i)) for i in range(3)]
+        for child in children:
+            child.add_dependency(passing)
+        both = Job(rcfg, "both")
+        both.add_dependency(passing)
+        both.add_dependency(failing)
+        waiting = Job(rcfg, "waiting")
+        waiting.add_dependency(unrelated)
+        for job in children + [both, waiting]:
+            manager._todo.append(job)
+            manager._track_dependencies_locked(job)
+        self.assertEqual([], manager._unblocked)
+
+        passing.jobstatus = JobStatus.PASSED
+        manager._release_children_locked(passing)
+        manager._move_todo_to_ready_locked()
+        self.assertEqual(set(children), set(manager._ready))
+        self.assertEqual([both, waiting], manager._todo)
+
+        failing.jobstatus = JobStatus.FAILED
+        manager._release_children_locked(failing)
+        manager._move_todo_to_ready_locked()
+        self.assertEqual(JobStatus.SKIPPED, both.jobstatus)
+        self.assertEqual([both], manager._skipped)
+        self.assertEqual([waiting], manager._todo)
+        self.assertEqual({waiting: {unrelated}}, manager._unmet_dependencies)
+
+    def test_parallel_jobs_are_packed_against_resource_pools(self):
+        log = _Logger()
+        rcfg = SimpleNamespace(options=SimpleNamespace(timeout=1), log=log)
+        pools = {"cpu": 8, "license:sim": 2}
+        manager = JobManager({
+            "idle_print_seconds": 60,
+            "quit_count": 1,
+            "active_job_limit": 8,
+            "resource_pools": pools
+        }, log)
+        manager.stop()
+        fgp = _ResourceJob(rcfg, "fgp", {"cpu": 4, "license:sim": 1})
+        plain = _ResourceJob(rcfg, "plain", {"cpu": 1, "license:sim": 1})
+        wide = _ResourceJob(rcfg, "wide", {"cpu": 3})
+        unpooled = _ResourceJob(rcfg, "unpooled", {"cpu": 1, "memory_mb": 64000})
+        oversized = _ResourceJob(rcfg, "oversized", {"cpu": 16})
+
+        manager._active = [fgp]
+        self.assertTrue(manager._can_launch_locked(plain))
+        self.assertFalse(manager._can_launch_locked(oversized))
+        manager._active = [fgp, plain]
+        self.assertFalse(manager._can_launch_locked(_ResourceJob(rcfg, "third", {"cpu": 1, "license:sim": 1})))
+        self.assertTrue(manager._can_launch_locked(wide))
+        manager._active = [fgp, plain, wide]
+        self.assertFalse(manager._can_launch_locked(unpooled))
+        manager._active = []
+        self.assertTrue(manager._can_launch_locked(oversized))
+
+    def test_compile_jobs_run_beside_simulations_within_compile_limit(self):
+        log = _Logger()
+        rcfg = SimpleNamespace(options=SimpleNamespace(timeout=1), log=log)
+        manager = JobManager({
+            "idle_print_seconds": 60,
+            "quit_count": 1,
+            "active_job_limit": 4,
+            "compile_job_limit": 1
+        }, log)
+        manager.stop()
+        compile_a = _ResourceJob(rcfg, "compile_a", {}, execution_mode="compile")
+        compile_b = _ResourceJob(rcfg, "compile_b", {}, execution_mode="compile")
+        sim = _ResourceJob(rcfg, "sim", {})
+        exclusive = Job(rcfg, "exclusive")
+
+        manager._active = [compile_a]
+        self.assertTrue(manager._can_launch_locked(sim))
+        self.assertFalse(manager._can_launch_locked(compile_b))
+        self.assertFalse(manager._can_launch_locked(exclusive))
+        manager._active = [sim]
+        self.assertTrue(manager._can_launch_locked(compile_b))
+        manager._active = [exclusive]
+        self.assertFalse(manager._can_launch_locked(compile_b))
+        manager.compile_job_limit = None
+        manager._active = [compile_a, sim]
+        self.assertTrue(manager._can_launch_locked(compile_b))
+
+    def test_resource_pool_capacity_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            JobManager({"idle_print_seconds": 60, "quit_count": 1, "resource_pools": {"cpu": 0}}, _Logger())
+
+    def test_fan_out_children_run_after_shared_dependency(self):
+        log = _Logger()
+        rcfg = SimpleNamespace(options=SimpleNamespace(timeout=1), log=log)
+        manager = JobManager({"idle_print_seconds": 60, "quit_count": 1, "active_job_limit": 4}, log)
+        manager.job_lib_type = _RecordingRunner
+        parent = Job(rcfg, "parent")
+        children = [Job(rcfg, "child{}".format(i)) for i in range(20)]
+        for job in [parent] + children:
+            job.job_dir = str(Path(tempfile.mkdtemp()) / job.name)
+        for child in children:
+            child.add_dependency(parent)
+
+        try:
+            for child in children:
+                manager.add_job(child)
+            manager.add_job(parent)
+            manager.wait()
+            self.assertEqual(set([parent] + children), set(manager._done))
+            self.assertEqual({}, manager._unmet_dependencies)
+        finally:
+            manager.stop()
+
+    def test_hook_burst_after_idle_spell_runs_in_parallel(self):
+        pool = _HookPool(4, _Logger())
+        try:
+            pool.submit(lambda: None)
+            self.assertTrue(pool.join(1.0))
+            started = threading.Semaphore(0)
+            release = threading.Event()
+
+            def hook():
+                started.release()
+                release.wait(2.0)
+
+            for _ in range(4):
+                pool.submit(hook)
+            for _ in range(4):
+                self.assertTrue(started.acquire(timeout=1.0))
+            release.set()
+            self.assertTrue(pool.join(2.0))
+        finally:
+            release.set()
+            pool.close()
+
+    def test_slow_pre_run_does_not_block_other_launches(self):
+        log = _Logger()
+        rcfg = SimpleNamespace(options=SimpleNamespace(timeout=1), log=log)
+        manager = JobManager({"idle_print_seconds": 60, "quit_count": 1, "active_job_limit": 2}, log)
+        manager.job_lib_type = _RecordingRunner
+        slow = _BlockingPreRunJob(rcfg, "slow")
+        fast = _ResourceJob(rcfg, "fast", {})
+        slow.job_dir = str(Path(tempfile.mkdtemp()) / "slow")
+        fast.job_dir = str(Path(tempfile.mkdtemp()) / "fast")
+        slow.increase_priority(-10)
+
+        try:
+            with mock.patch.object(_BlockingPreRunJob, "execution_mode", "parallel"):
+                manager.add_job(slow)
+                self.assertTrue(slow.pre_run_started.wait(1.0))
+                manager.add_job(fast)
+                deadline = time.monotonic() + 2.0
+                while fast not in manager.status_snapshot()["done"] and time.monotonic() < deadline:
+                    time.sleep(0.01)
+
+                snapshot = manager.status_snapshot()
+                self.assertIn(fast, snapshot["done"])
+                self.assertEqual((slow, ), snapshot["launching"])
+                slow.release_pre_run.set()
+                manager.wait()
+            self.assertEqual({slow, fast}, set(manager._done))
+        finally:
+            slow.release_pre_run.set()
+            manager.stop()
+
+    def test_exclusive_job_waits_for_finalizing_post_run(self):
+        log = _Logger()
+        rcfg = SimpleNamespace(options=SimpleNamespace(timeout=1), log=log)
+        manager = JobManager({"idle_print_seconds": 60, "quit_count": 1, "active_job_limit": 2}, log)
+        manager.job_lib_type = _RecordingRunner
+        first = _BlockingPostRunJob(rcfg, "first_compile")
+        second = _ResourceJob(rcfg, "second_compile", {}, execution_mode="exclusive")
+        first.job_dir = str(Path(tempfile.mkdtemp()) / "first")
+        second.job_dir = str(Path(tempfile.mkdtemp()) / "second")
+
+        try:
+            manager.add_job(first)
+            self.assertTrue(first.post_run_started.wait(1.0))
+            manager.add_job(second)
+            time.sleep(0.2)
+
+            snapshot = manager.status_snapshot()
+            self.assertEqual((first, ), snapshot["finalizing"])
+            self.assertNotIn(second, snapshot["launching"] + snapshot["active"] + snapshot["done"])
+            first.release_post_run.set()
+            manager.wait()
+            self.assertEqual([first, second], list(manager._done))
+        finally:
+            first.release_post_run.set()
+            manager.stop()
+
+    def test_hook_workers_must_be_positive(self):
+        for hook_workers in (0, -1):
+            with self.subTest(hook_workers=hook_workers), self.assertRaises(ValueError):
+                JobManager({"idle_print_seconds": 60, "quit_count": 1, "hook_workers": hook_workers}, _Logger())
+
     def test_pause_blocks_new_jobs_until_resume(self):
         log = _Logger()
         rcfg = SimpleNamespace(options=SimpleNamespace(timeout=1), log=log)
@@ -1186,6 +1478,73 @@ class JobManagerLaunchTest(unittest.TestCase):
 
         self.assertIn(("", "skipped_test", "", "", "1", "", "1", "", ""), trd)
 
+    def test_summary_lists_tests_cancelled_by_fail_fast(self):
+        log = _SummaryLogger()
+        vcomp = SimpleNamespace(name="sys_tb", jobstatus=JobStatus.PASSED, log_path="cmp.log")
+        failed = _FakeTimedJob("broken", JobStatus.FAILED, seconds=1)
+        skipped = _FakeTimedJob("broken", JobStatus.SKIPPED)
+        failed.vcomper = skipped.vcomper = vcomp
+        icfg = SimpleNamespace(target=2, jobs=[failed, skipped])
+        rcfg = SimpleNamespace(
+            all_vcomp={"//pkg:sys_tb": ([icfg], [failed])},
+            options=SimpleNamespace(no_run=False, report=False, nt=False),
+            tests_to_tags={},
+            fail_fast=SimpleNamespace(cancelled=[
+                SimpleNamespace(
+                    bench="sys_tb", test="broken", failures=1, skipped=1, signature="UVM_ERROR [SCB] mismatch")
+            ]),
+            log=log,
+        )
+
+        with mock.patch("lib.rv_utils.prepare_regression_log", return_value=os.devnull):
+            rv_utils.print_summary(rcfg, {"//pkg:sys_tb": vcomp}, SimpleNamespace(exited_prematurely=False), [])
+
+        fail_fast_summary = next(message for message in log.messages if message.startswith("Fail-fast"))
+        self.assertIn("sys_tb broken: skipped 1 iteration(s) after 1 matching failures: UVM_ERROR [SCB] mismatch",
+                      fail_fast_summary)
+
+    def test_summary_totals_come_from_the_results_stream(self):
+        log = _SummaryLogger()
+        vcomp = SimpleNamespace(name="sys_tb", jobstatus=JobStatus.PASSED, log_path="cmp.log")
+        jobs = [_FakeTimedJob("smoke", JobStatus.NOT_STARTED) for _ in range(3)]
+        for job in jobs:
+            job.vcomper = vcomp
+            job.target = "//pkg/tests:smoke"
+        icfg = SimpleNamespace(target=3, jobs=jobs)
+        records = [{
+            "bench": "sys_tb",
+            "target": "//pkg/tests:smoke",
+            "test": "smoke",
+            "iteration": 1,
+            "status": "PASSED",
+            "sim_time_s": 4,
+            "sim_time": "0:00:04",
+            "log_path": "/sim/1/stdout.log",
+        }, {
+            "bench": "sys_tb",
+            "target": "//pkg/tests:smoke",
+            "test": "smoke",
+            "iteration": 2,
+            "status": "FAILED",
+            "sim_time_s": 2,
+            "sim_time": "0:00:02",
+            "log_path": "/sim/2/stdout.log",
+        }]
+        rcfg = SimpleNamespace(
+            all_vcomp={"//pkg:sys_tb": ([icfg], jobs)},
+            options=SimpleNamespace(no_run=False, report=False, nt=False),
+            tests_to_tags={},
+            results_stream=SimpleNamespace(path="results.jsonl", read=lambda: records),
+            log=log,
+        )
+        trd = []
+
+        with mock.patch("lib.rv_utils.prepare_regression_log", return_value=os.devnull):
+            rv_utils.print_summary(rcfg, {"//pkg:sys_tb": vcomp}, SimpleNamespace(exited_prematurely=False), trd)
+
+        self.assertIn(("", "smoke", "0:00:04", "1", "1", "1", "3", "", ""), trd)
+        self.assertIn(("", "", "", "", "", "", "", "/sim/2/stdout.log", ""), trd)
+
     def test_simulation_summary_does_not_count_compile_job(self):
         log = _SummaryLogger()
         vcomp = SimpleNamespace(name="sys_tb", jobstatus=JobStatus.PASSED, log_path="cmp.log")
@@ -145,6 +145,24 @@ class RegressionDiscoveryTest(unittest.TestCase):
         os.utime(bazel_ignore, (original_mtime, original_mtime))
         self.assertFalse(config._discovery_cache_is_fresh())
 
+    def test_cache_freshness_check_reuses_recorded_digests(self):
+        proj_dir = Path(tempfile.mkdtemp())
+        build_file = proj_dir / "benches" / "soc_tb" / "BUILD"
+        build_file.parent.mkdir(parents=True)
+        build_file.write_text("filegroup(name='x')\n", encoding="utf-8")
+        os.utime(build_file, (time.time() - 60, time.time() - 60))
+        config = self._config(proj_dir)
+        config._write_discovery_manifest()
+
+        config = self._config(proj_dir)
+        self.assertTrue(config._discovery_cache_is_fresh())
+        self.assertEqual(0, config._digest_index.hashed)
+
+        config = self._config(proj_dir)
+        config.options.rehash_discovery = True
+        self.assertTrue(config._discovery_cache_is_fresh())
+        self.assertEqual(1, config._digest_index.hashed)
+
     @unittest.skipUnless(os.name == "posix", "POSIX advisory-lock behavior")
     def test_cache_reader_cannot_observe_a_partial_generation(self):
         project_dir = tempfile.mkdtemp()
@@ -607,16 +625,21 @@ class RegressionDiscoveryTest(unittest.TestCase):
         self.assertIn("attr(verilog_dv_test_cfg_marker, 1,", query)
         self.assertNotIn("generator_function", query)
 
-    def test_discovery_batches_cquery_and_build(self):
+    def test_discovery_uses_one_cquery_and_build_through_argument_files(self):
         proj_dir = Path(tempfile.mkdtemp())
         config = self._config(proj_dir)
         config.tests_to_tags = {}
         config.tests_to_simulator = {}
 
         commands = []
+        argument_files = {}
 
         def fake_run_command(cmd):
             commands.append(cmd)
+            for argument in cmd:
+                option, _, path = argument.partition("=")
+                if option in ("--query_file", "--target_pattern_file"):
+                    argument_files[option] = (path, Path(path).read_text().splitlines())
             if cmd[:2] == ["bazel", "query"]:
                 return 0, "//benches/soc_tb:soc_tb\n", ""
             if cmd[:2] == ["bazel", "cquery"]:
@@ -642,7 +665,12 @@ class RegressionDiscoveryTest(unittest.TestCase):
         self.assertEqual(["bazel", "query"], commands[0][:2])
         self.assertEqual(["bazel", "cquery"], commands[1][:2])
         self.assertEqual(["bazel", "build"], commands[2][:2])
-        self.assertIn("//benches/soc_tb:soc_tb", commands[2])
+        query_path, query_lines = argument_files["--query_file"]
+        self.assertEqual(["({})".format(config._build_test_cfg_query("//benches/soc_tb:soc_tb"))], query_lines)
+        target_path, target_lines = argument_files["--target_pattern_file"]
+        self.assertEqual(["//benches/soc_tb/tests:dma_single_transfer", "//benches/soc_tb:soc_tb"], target_lines)
+        self.assertFalse(Path(query_path).exists())
+        self.assertFalse(Path(target_path).exists())
         self.assertEqual(
             {
                 "//benches/soc_tb:soc_tb",
@@ -665,11 +693,222 @@ class RegressionDiscoveryTest(unittest.TestCase):
             config.all_vcomp,
         )
 
-    def test_discovery_argument_chunks_stay_under_configured_budget(self):
+    def test_discovery_reads_test_cfg_info_files_from_build_events(self):
+        proj_dir = Path(tempfile.mkdtemp())
+        config = self._config(proj_dir)
+        info_dir = Path(tempfile.mkdtemp())
+
+        def fake_run_command(cmd):
+            if cmd[:2] == ["bazel", "query"]:
+                return 0, "//benches/soc_tb:soc_tb\n", ""
+            if cmd[:2] == ["bazel", "cquery"]:
+                return 0, "//benches/soc_tb/tests:smoke (abc1234)\n", ""
+            options = dict(argument.split("=", 1) for argument in cmd if argument.startswith("--") and "=" in argument)
+            self.assertEqual("+verilog_dv_test_cfg_info", options["--output_groups"])
+            self.assertEqual("toplevel", options["--remote_download_outputs"])
+            info_path = info_dir / "smoke_test_cfg_info.json"
+            info_path.write_text(
+                json.dumps({
+                    "test": "@@//benches/soc_tb/tests:smoke",
+                    "tb": "@@//benches/soc_tb:soc_tb",
+                    "tags": ["nightly"],
+                    "simulator": "XRUN",
+                }))
+            with open(options["--build_event_json_file"], "w") as build_events:
+                build_events.write(
+                    json.dumps({
+                        "id": {
+                            "namedSet": {
+                                "id": "0"
+                            }
+                        },
+                        "namedSetOfFiles": {
+                            "files": [{
+                                "name": "smoke_test_cfg_info.json",
+                                "uri": info_path.as_uri()
+                            }]
+                        },
+                    }) + "\n")
+                build_events.write(
+                    json.dumps({
+                        "id": {
+                            "targetCompleted": {
+                                "label": "//benches/soc_tb/tests:smoke"
+                            }
+                        },
+                        "completed": {
+                            "outputGroup": [{
+                                "name": "verilog_dv_test_cfg_info",
+                                "fileSets": [{
+                                    "id": "0"
+                                }]
+                            }]
+                        },
+                    }) + "\n")
+            return 0, "", "verilog_dv_test_cfg_info(@//benches/soc_tb/tests:stale, @//benches/soc_tb:soc_tb, [], VCS)\n"
+
+        config._run_command = fake_run_command
+
+        from lib import regression as regression_module
+
+        original_timer = regression_module.rv_utils.DatetimePrinter
+        regression_module.rv_utils.DatetimePrinter = _Timer
+        try:
+            config._discover_test_metadata()
+        finally:
+            regression_module.rv_utils.DatetimePrinter = original_timer
+
+        self.assertEqual({"//benches/soc_tb/tests:smoke": ["nightly"]}, config.tests_to_tags)
+        self.assertEqual({"//benches/soc_tb/tests:smoke": "XRUN"}, config.tests_to_simulator)
+        self.assertEqual({"//benches/soc_tb:soc_tb": {"//benches/soc_tb/tests:smoke": 0}}, config.all_vcomp)
+
+    def _two_bench_cache(self, build_texts=None):
+        proj_dir = Path(tempfile.mkdtemp())
+        for bench in ("soc_tb", "dma_tb"):
+            build_file = proj_dir / "benches" / bench / "tests" / "BUILD"
+            build_file.parent.mkdir(parents=True)
+            build_file.write_text((build_texts or {}).get(bench, "# {} tests\n".format(bench)), encoding="utf-8")
+        (proj_dir / "WORKSPACE").write_text("", encoding="utf-8")
+        config = self._config(proj_dir)
+        config.options.tests[0].btiglob = "*:*"
+        config.all_vcomp = {
+            "//benches/soc_tb:soc_tb": {
+                "//benches/soc_tb/tests:smoke": 0
+            },
+            "//benches/dma_tb:dma_tb": {
+                "//benches/dma_tb/tests:burst": 0
+            },
+        }
+        config.tests_to_tags = {"//benches/soc_tb/tests:smoke": ["nightly"], "//benches/dma_tb/tests:burst": []}
+        config.tests_to_simulator = {"//benches/soc_tb/tests:smoke": "VCS", "//benches/dma_tb/tests:burst": "XRUN"}
+        config._write_discovery_manifest()
+        return proj_dir, self._config(proj_dir)
+
+    def test_bench_metadata_change_rediscovers_only_that_bench(self):
+        proj_dir, config = self._two_bench_cache()
+        config.options.tests[0].btiglob = "*:*"
+        (proj_dir / "benches" / "dma_tb" / "tests" / "BUILD").write_text("# new test\n", encoding="utf-8")
+
+        self.assertFalse(config._should_use_cached_discovery())
+
+        queries = []
+
+        def fake_run_command(cmd):
+            if cmd[:2] == ["bazel", "query"]:
+                return 0, "//benches/dma_tb:dma_tb\n//benches/soc_tb:soc_tb\n", ""
+            if cmd[:2] == ["bazel", "cquery"]:
+                queries.append(Path(cmd[2].split("=", 1)[1]).read_text())
+                return 0, "//benches/dma_tb/tests:burst\n//benches/dma_tb/tests:wrap\n", ""
+            return 0, "", (
+                "verilog_dv_test_cfg_info(@//benches/dma_tb/tests:burst, @//benches/dma_tb:dma_tb, [], XRUN)\n"
+                "verilog_dv_test_cfg_info(@//benches/dma_tb/tests:wrap, @//benches/dma_tb:dma_tb, [], XRUN)\n")
+
+        config._run_command = fake_run_command
+
+        from lib import regression as regression_module
+
+        original_timer = regression_module.rv_utils.DatetimePrinter
+        regression_module.rv_utils.DatetimePrinter = _Timer
+        try:
+            config._discover_test_metadata()
+        finally:
+            regression_module.rv_utils.DatetimePrinter = original_timer
+
+        self.assertEqual(1, len(queries))
+        self.assertIn("//benches/dma_tb:dma_tb", queries[0])
+        self.assertNotIn("soc_tb", queries[0])
         self.assertEqual(
-            [["aaaa"], ["bbbb"], ["cc"]],
-            RegressionConfig._chunk_arguments(["aaaa", "bbbb", "cc"], max_chars=7),
-        )
+            {
+                "//benches/dma_tb:dma_tb": {
+                    "//benches/dma_tb/tests:burst": 0,
+                    "//benches/dma_tb/tests:wrap": 0
+                },
+                "//benches/soc_tb:soc_tb": {
+                    "//benches/soc_tb/tests:smoke": 0
+                },
+            }, config.all_vcomp)
+        self.assertEqual(["nightly"], config.tests_to_tags["//benches/soc_tb/tests:smoke"])
+        self.assertEqual("XRUN", config.tests_to_simulator["//benches/dma_tb/tests:wrap"])
+        self.assertEqual({"//benches/dma_tb:dma_tb", "//benches/dma_tb/tests:burst", "//benches/dma_tb/tests:wrap"},
+                         config.discovery_prebuilt_targets)
+
+    def test_changed_cfg_package_also_rediscovers_benches_that_reference_it(self):
+        proj_dir, config = self._two_bench_cache(
+            {"dma_tb": 'verilog_dv_test_cfg(name = "burst", inherits = ["//benches/soc_tb/tests:base"])\n'})
+        config.options.tests[0].btiglob = "*:*"
+        (proj_dir / "benches" / "soc_tb" / "tests" / "BUILD").write_text("# base cfg changed\n", encoding="utf-8")
+
+        self.assertFalse(config._should_use_cached_discovery())
+        self.assertEqual({"//benches/soc_tb:soc_tb", "//benches/dma_tb:dma_tb"}, config._partial_discovery[3])
+
+    def test_bench_bzl_change_invalidates_every_bench(self):
+        proj_dir, config = self._two_bench_cache()
+        config.options.tests[0].btiglob = "*:*"
+        (proj_dir / "benches" / "soc_tb" / "defs.bzl").write_text("DEFAULTS = {}\n", encoding="utf-8")
+
+        self.assertFalse(config._should_use_cached_discovery())
+        self.assertIsNone(getattr(config, "_partial_discovery", None))
+
+    def test_shared_metadata_change_invalidates_every_bench(self):
+        proj_dir, config = self._two_bench_cache()
+        config.options.tests[0].btiglob = "*:*"
+        (proj_dir / "WORKSPACE").write_text("# changed\n", encoding="utf-8")
+
+        self.assertFalse(config._should_use_cached_discovery())
+        self.assertIsNone(getattr(config, "_partial_discovery", None))
+
+    def test_running_discovery_daemon_answers_before_the_cache(self):
+        config = self._config(Path(tempfile.mkdtemp()))
+        discovery = {
+            "all_vcomp": {
+                "//benches/soc_tb:soc_tb": {
+                    "//benches/soc_tb/tests:smoke": 0
+                }
+            },
+            "tests_to_tags": {
+                "//benches/soc_tb/tests:smoke": []
+            },
+            "tests_to_simulator": {
+                "//benches/soc_tb/tests:smoke": "VCS"
+            },
+        }
+
+        with mock.patch("lib.regression.discovery_daemon.lookup", return_value=discovery) as lookup:
+            self.assertTrue(config._should_use_cached_discovery())
+
+        lookup.assert_called_once_with(config.proj_dir, config._discovery_scope_id())
+        self.assertEqual(discovery["all_vcomp"], config._cached_discovery[0])
+
+        config.options.rehash_discovery = True
+        with mock.patch("lib.regression.discovery_daemon.lookup", return_value=discovery) as lookup:
+            self.assertFalse(config._should_use_cached_discovery())
+        lookup.assert_not_called()
+
+    def test_shared_discovery_cache_serves_other_checkouts_of_the_same_commit(self):
+        shared_dir = tempfile.mkdtemp()
+        checkouts = []
+        for _ in range(2):
+            proj_dir = Path(tempfile.mkdtemp())
+            build_file = proj_dir / "benches" / "soc_tb" / "BUILD"
+            build_file.parent.mkdir(parents=True)
+            build_file.write_text("dv_tb(name = 'soc_tb')\n", encoding="utf-8")
+            config = self._config(proj_dir)
+            config.options.shared_discovery_cache = shared_dir
+            checkouts.append(config)
+        publisher, reader = checkouts
+        publisher.all_vcomp = {"//benches/soc_tb:soc_tb": {"//benches/soc_tb/tests:smoke": 0}}
+        publisher.tests_to_tags = {"//benches/soc_tb/tests:smoke": ["nightly"]}
+        publisher.tests_to_simulator = {"//benches/soc_tb/tests:smoke": "VCS"}
+        publisher._write_discovery_manifest()
+
+        self.assertTrue(reader._should_use_cached_discovery())
+        self.assertEqual(publisher.all_vcomp, reader._cached_discovery[0])
+        self.assertTrue(reader._discovery_cache_is_fresh())
+
+        (Path(reader.proj_dir) / "benches" / "soc_tb" / "BUILD").write_text("# changed\n", encoding="utf-8")
+        reader = self._config(Path(reader.proj_dir))
+        reader.options.shared_discovery_cache = shared_dir
+        self.assertFalse(reader._should_use_cached_discovery())
 
     def test_discovery_retries_when_source_manifest_changes(self):
         config = self._config(Path(tempfile.mkdtemp()))
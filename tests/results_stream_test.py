@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from lib import results_stream
+
+
+class _Status:
+
+    def __init__(self, name):
+        self.name = name
+
+
+def _test_job(test, iteration, status, job_time=None):
+    job = SimpleNamespace(
+        vcomper=SimpleNamespace(name="sys_tb"),
+        name=test,
+        target="//tests:{}".format(test),
+        iteration=iteration,
+        seed=iteration * 11,
+        jobstatus=_Status(status),
+        simulation_duration_s=job_time,
+        job_time=job_time or 0,
+        _log_path="/sim/{}_{}/stdout.log".format(test, iteration),
+        error_message=None if status == "PASSED" else "UVM_ERROR",
+    )
+    job._get_job_time_str = lambda: "0:00:{:02d}".format(job.job_time)
+    return job
+
+
+class ResultsStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = results_stream.stream_path(os.path.join(self.temp_dir.name, "sys_tb_regression_1.log"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_each_result_is_one_json_line_as_it_finishes(self):
+        stream = results_stream.ResultsStream(self.path)
+        results_stream.append_test(stream, _test_job("smoke", 1, "PASSED", job_time=3))
+        results_stream.append_test(stream, _test_job("smoke", 2, "FAILED", job_time=7))
+        results_stream.append_test(None, _test_job("smoke", 3, "PASSED"))
+        stream.close()
+
+        with open(self.path) as lines:
+            records = [json.loads(line) for line in lines]
+        self.assertTrue(self.path.endswith("sys_tb_regression_1.jsonl"))
+        self.assertEqual([("smoke", 1, "PASSED"), ("smoke", 2, "FAILED")],
+                         [(record["test"], record["iteration"], record["status"]) for record in records])
+        self.assertEqual(22, records[1]["seed"])
+
+    def test_tally_keeps_the_last_record_of_each_iteration(self):
+        stream = results_stream.ResultsStream(self.path)
+        stream.append(results_stream.test_record(_test_job("smoke", 1, "PASSED", job_time=3)))
+        stream.append(results_stream.test_record(_test_job("smoke", 1, "FAILED", job_time=3)))
+        stream.append(results_stream.test_record(_test_job("smoke", 2, "PASSED", job_time=9)))
+        stream.append(results_stream.test_record(_test_job("smoke", 3, "FAILED")))
+        with open(self.path, "a") as torn:
+            torn.write('{"bench": "sys_tb", "test"')
+
+        totals = results_stream.tally(stream.read())
+
+        smoke = totals[("sys_tb", "//tests:smoke", "smoke")]
+        self.assertEqual([2], [record["iteration"] for record in smoke["passed"]])
+        self.assertEqual([1, 3], [record["iteration"] for record in smoke["failed"]])
+        self.assertEqual("0:00:09", smoke["max_sim_time"])
+
+
+if __name__ == "__main__":
+    unittest.main()
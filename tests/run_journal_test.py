@@ -0,0 +1,114 @@
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from lib import run_journal
+from lib.job_lib import Job, JobManager, JobStatus
+
+
+class _Logger:
+
+    def __getattr__(self, _):
+        return lambda *args, **kwargs: None
+
+
+class _Runner:
+
+    def __init__(self, job, _manager):
+        job.job_lib = self
+        job.seed = 7
+        self.returncode = 0 if job.name == "passing" else 1
+
+    def check_for_done(self):
+        return True
+
+
+class _Iteration(Job):
+
+    @property
+    def execution_mode(self):
+        return "parallel"
+
+    def post_run(self):
+        super().post_run()
+        self.jobstatus = JobStatus.PASSED if self.job_lib.returncode == 0 else JobStatus.FAILED
+
+
+class RunJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = run_journal.journal_path(self.temp_dir.name, "abc123")
+        self.keys = [run_journal.job_key("//tb:sys_tb", "smoke", iteration) for iteration in (1, 2, 3)]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _job(self, name, key):
+        job = _Iteration(SimpleNamespace(options=SimpleNamespace(timeout=1), log=_Logger()), name)
+        job.journal_key = key
+        job.job_dir = self.temp_dir.name
+        return job
+
+    def test_job_manager_journals_launches_and_results(self):
+        journal = run_journal.RunJournal(self.path, run_id="abc123", argv=["simmer", "-t", "sys_tb:smoke@3"])
+        manager = JobManager({"idle_print_seconds": 60, "quit_count": 10, "active_job_limit": 2}, _Logger())
+        manager.job_lib_type = _Runner
+        manager.journal = journal
+        try:
+            manager.add_job(self._job("passing", self.keys[0]))
+            manager.add_job(self._job("failing", self.keys[1]))
+            manager.add_job(self._job("unjournaled", None))
+            manager.wait()
+        finally:
+            manager.stop()
+            journal.close()
+
+        header, states = run_journal.load(self.path)
+        self.assertEqual(["simmer", "-t", "sys_tb:smoke@3"], header["argv"])
+        self.assertEqual({
+            self.keys[0]: "PASSED",
+            self.keys[1]: "FAILED"
+        }, {
+            key: entry["state"]
+            for key, entry in states.items()
+        })
+        with open(self.path) as lines:
+            entries = [json.loads(line) for line in lines]
+        self.assertEqual(2, sum(1 for entry in entries if entry.get("state") == "LAUNCHED"))
+
+    def test_resume_skips_passed_iterations_and_keeps_seeds(self):
+        journal = run_journal.RunJournal(self.path, run_id="abc123", seeds=dict(zip(self.keys, (11, 22, 33))))
+        passed = self._job("passing", self.keys[0])
+        passed.jobstatus = JobStatus.PASSED
+        failed = self._job("failing", self.keys[1])
+        failed.seed = 99
+        journal.record(failed, "LAUNCHED")
+        array = SimpleNamespace(array_members=[passed])
+        journal.record(array)
+        journal.close()
+        with open(self.path, "a") as torn:
+            torn.write('{"type": "job", "key"')
+
+        reopened = run_journal.RunJournal(self.path, run_id="ignored", seeds={})
+        reopened.close()
+        header, states = run_journal.load(self.path)
+        done, seeds = run_journal.resume_plan(header, states)
+
+        self.assertEqual("abc123", header["run_id"])
+        self.assertEqual({self.keys[0]}, done)
+        self.assertEqual({self.keys[0]: 11, self.keys[1]: 99, self.keys[2]: 33}, seeds)
+
+    def test_missing_header_is_rejected(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as journal:
+            journal.write('{"type": "job", "key": "k", "state": "PASSED"}\n')
+
+        with self.assertRaises(ValueError):
+            run_journal.load(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
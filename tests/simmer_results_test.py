@@ -602,6 +602,54 @@ class SimmerResultsTest(unittest.TestCase):
         stored = simmer_results.load_store(self.project_dir)["last_run"]
         self.assertEqual("interrupted.log", stored["tests"][0]["stdout_log"])
 
+    def test_multi_test_history_keeps_expected_duration_for_every_target(self):
+        run = self._completed_run()
+        run["planned_tests"] = 4
+        run["tests"] = [
+            {
+                "target": "//tests:long",
+                "status": "PASSED",
+                "duration_s": 100
+            },
+            {
+                "target": "//tests:long",
+                "status": "FAILED",
+                "duration_s": 300
+            },
+            {
+                "target": "//tests:short",
+                "status": "PASSED",
+                "duration_s": 5
+            },
+            {
+                "target": "//tests:stopped",
+                "status": "INTERRUPTED",
+                "duration_s": 50
+            },
+        ]
+        simmer_results.save_run(self.project_dir, run)
+        rerun = self._completed_run()
+        rerun["tests"] = [{"target": "//tests:short", "status": "PASSED", "duration_s": 7, "waves": {}}]
+        simmer_results.save_run(self.project_dir, rerun)
+
+        self.assertEqual({
+            "//tests:long": 200,
+            "//tests:short": 7
+        }, simmer_results.load_test_durations(self.project_dir))
+
+    def test_unreadable_history_has_no_expected_durations(self):
+        path = Path(simmer_results.results_path(self.project_dir))
+        path.parent.mkdir(parents=True)
+        path.write_text("{broken", encoding="utf-8")
+
+        self.assertEqual({}, simmer_results.load_test_durations(self.project_dir))
+
+    def test_predicted_makespan_packs_longest_durations_first(self):
+        self.assertEqual(0, simmer_results.predict_makespan([], 4))
+        self.assertEqual(10, simmer_results.predict_makespan([10, 3, 3, 3, 1], 2))
+        self.assertEqual(20, simmer_results.predict_makespan([10, 10], 1))
+        self.assertEqual(10, simmer_results.predict_makespan([10, 1], 8))
+
     def test_record_test_job_updates_existing_iteration(self):
         run = simmer_results.create_run(["simmer"], self.rcfg, 1)
         test_job = SimpleNamespace(
@@ -21,6 +21,8 @@ if str(REPO_ROOT) not in sys.path:
 from args_parser import parse_args
 import simmer
 from lib import compile_cache
+from lib import results_stream
+from lib import run_journal
 from lib.job_lib import JobCancelledError, JobStatus
 
 
@@ -130,6 +132,111 @@ class SimmerRuntimeHardeningTest(unittest.TestCase):
 
         rcfg.log.info.assert_called_once_with("Scheduler CPU allocation: %d (%s)", 4, "unit allocation")
 
+    def test_adaptive_job_limit_judges_load_against_cpu_allocation(self):
+        options = SimpleNamespace(gui=False, adaptive_jobs=16)
+        rcfg = SimpleNamespace(all_vcomp={"//tb:tb": ([SimpleNamespace(target=8)], [])}, log=mock.Mock())
+
+        with mock.patch("simmer.job_lib.detect_allocated_cpus", return_value=(4, "unit allocation")):
+            self.assertEqual((1, 8, 4), simmer.get_adaptive_job_limits(options, rcfg, 4))
+
+    def test_pipelined_compile_shares_job_slots_and_cpu_pool(self):
+        options = SimpleNamespace(gui=False, jobs=None, pipeline_compile=True, resource_pools={})
+        rcfg = SimpleNamespace(
+            all_vcomp={
+                "//a:tb": ([SimpleNamespace(target=1)], []),
+                "//b:tb": ([SimpleNamespace(target=1)], []),
+            },
+            log=mock.Mock(),
+        )
+        simulator = SimpleNamespace(get_scheduler_threads_per_test=lambda: 1)
+
+        with mock.patch("simmer.job_lib.detect_allocated_cpus", return_value=(8, "unit allocation")):
+            self.assertEqual(4, simmer.get_active_job_limit(options, rcfg, simulator))
+            self.assertEqual({"cpu": 8}, simmer.get_resource_pools(options, rcfg))
+            options.resource_pools = {"cpu": 6}
+            self.assertEqual({"cpu": 6}, simmer.get_resource_pools(options, rcfg))
+
+    def test_tests_with_longer_history_launch_first(self):
+        vcomper = simmer.Job(SimpleNamespace(options=SimpleNamespace(timeout=1), log=mock.Mock()), "vcomp")
+        tests = []
+        for target in ("//tb:quick", "//tb:slow", "//tb:new"):
+            test = simmer.Job(vcomper.rcfg, target)
+            test.target = target
+            test.add_dependency(vcomper)
+            tests.append(test)
+        rcfg = SimpleNamespace(proj_dir="/repo", all_vcomp={"//tb:tb": ([], tests)}, log=mock.Mock())
+        options = SimpleNamespace(default_test_runtime=None)
+        vcomp_priority = vcomper.priority
+
+        with mock.patch("simmer.simmer_results.load_test_durations", return_value={"//tb:quick": 60, "//tb:slow": 600}):
+            simmer.prioritize_tests_by_history(rcfg, options, 2)
+
+        self.assertEqual(["//tb:slow", "//tb:new", "//tb:quick"], [test.target for test in sorted(tests)])
+        self.assertEqual(330, tests[2].expected_duration_s)
+        self.assertEqual([True, True, False], [test.duration_from_history for test in tests])
+        self.assertEqual(vcomp_priority - 990, vcomper.priority)
+        rcfg.log.info.assert_called_once_with(
+            "Predicted simulation makespan: %s for %d tests on %d job slots (%d with runtime history)",
+            datetime.timedelta(seconds=600), 3, 2, 2)
+
+    def test_iterations_of_a_test_are_grouped_into_job_arrays(self):
+        rcfg = SimpleNamespace(options=SimpleNamespace(timeout=1), log=mock.Mock())
+        vcomper = simmer.Job(rcfg, "vcomp")
+        sweep, single = object(), object()
+        tests = []
+        for icfg, iteration in ((sweep, 1), (sweep, 2), (sweep, 3), (single, 1)):
+            test = simmer.Job(rcfg, "smoke")
+            test.icfg = icfg
+            test.iteration = iteration
+            test.vcomper = vcomper
+            test.simulator = None
+            test.add_dependency(vcomper)
+            tests.append(test)
+        tests[1].increase_priority(-100)
+
+        jobs = simmer.group_test_arrays(tests, 2)
+
+        self.assertEqual(3, len(jobs))
+        self.assertIsInstance(jobs[0], simmer.TestArrayJob)
+        self.assertEqual(tests[:2], jobs[0].array_members)
+        self.assertEqual("parallel", jobs[0].execution_mode)
+        self.assertEqual(tests[1].priority, jobs[0].priority)
+        self.assertEqual([vcomper], jobs[0]._dependencies)
+        self.assertIn(jobs[0], vcomper._children)
+        self.assertIs(tests[2], jobs[1])
+        self.assertIs(tests[3], jobs[2])
+        self.assertEqual(tests, simmer.group_test_arrays(tests, None))
+
+    def test_resume_reuses_journaled_command_line_and_skips_passed_iterations(self):
+        with tempfile.TemporaryDirectory() as project_dir:
+            keys = [run_journal.job_key("//tb:sys_tb", "//tb/tests:smoke", iteration) for iteration in (1, 2)]
+            journal = run_journal.RunJournal(run_journal.journal_path(project_dir, "run1"),
+                                             run_id="run1",
+                                             argv=["simmer", "-t", "sys_tb:smoke@2", "--jobs", "2"],
+                                             seeds={
+                                                 keys[0]: 5,
+                                                 keys[1]: 6
+                                             })
+            journal.record(SimpleNamespace(journal_key=keys[0], seed=5, jobstatus=JobStatus.PASSED))
+            journal.record(SimpleNamespace(journal_key=keys[1], seed=6), "LAUNCHED")
+            journal.close()
+
+            options = simmer.resolve_resume_options(SimpleNamespace(resume="run1", proj_dir=project_dir))
+            rcfg = SimpleNamespace(proj_dir=project_dir, log=mock.Mock())
+            passed, seeds = simmer.load_resume_plan(rcfg, options, dynamic_test_plan=False)
+
+        self.assertEqual("run1", options.resume)
+        self.assertEqual(2, options.jobs)
+        self.assertEqual({keys[0]}, passed)
+        self.assertEqual({keys[0]: 5, keys[1]: 6}, seeds)
+
+    def test_resume_rejects_other_options(self):
+        options = SimpleNamespace(resume="run1", proj_dir="/repo")
+
+        with self.assertRaisesRegex(SystemExit, "remove --jobs 4"):
+            simmer.resolve_resume_options(options, ["--resume", "run1", "--jobs", "4"])
+        self.assertEqual(parse_args(["--resume", "run1"]).resume, "run1")
+
     def test_history_persistence_failure_is_fatal(self):
         rcfg = SimpleNamespace(
             proj_dir="/repo",
@@ -145,6 +252,34 @@ class SimmerRuntimeHardeningTest(unittest.TestCase):
              self.assertRaisesRegex(SystemExit, "Failed to write simmer results"):
             simmer.persist_simmer_results(rcfg)
 
+    def test_run_files_are_closed_after_results_are_persisted(self):
+        with tempfile.TemporaryDirectory() as log_dir:
+            stream = results_stream.ResultsStream(os.path.join(log_dir, "regression.jsonl"))
+            journal = run_journal.RunJournal(os.path.join(log_dir, "run1.jsonl"), run_id="run1")
+            rcfg = SimpleNamespace(results_stream=stream, run_journal=journal)
+
+            simmer.close_run_files(rcfg)
+            simmer.close_run_files(SimpleNamespace())
+
+            self.assertIsNone(stream._fd)
+            self.assertIsNone(journal._fd)
+
+    def test_incomplete_shutdown_streams_the_failed_test(self):
+        stream = mock.Mock()
+        test_job = simmer.TestJob.__new__(simmer.TestJob)
+        test_job._jobstatus = simmer.JobStatus.NOT_STARTED
+        test_job.rcfg = SimpleNamespace(simmer_results_run={}, results_stream=stream)
+
+        with mock.patch("simmer.simmer_results.record_test_job") as record_test_job, \
+             mock.patch("simmer.results_stream.test_record", return_value={"status": "FAILED"}) as test_record:
+            test_job.incomplete_shutdown("process did not exit")
+
+        self.assertEqual(simmer.JobStatus.FAILED, test_job.jobstatus)
+        self.assertIsNone(test_job.simulation_duration_s)
+        record_test_job.assert_called_once_with({}, test_job)
+        test_record.assert_called_once_with(test_job)
+        stream.append.assert_called_once_with({"status": "FAILED"})
+
     def test_interrupted_run_without_started_test_does_not_persist_history(self):
         with tempfile.TemporaryDirectory() as project_dir:
             run = {
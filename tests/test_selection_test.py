@@ -0,0 +1,74 @@
+import unittest
+
+from lib import test_selection
+
+
+class SelectionIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.all_vcomp = {
+            "//benches/soc_tb:soc_tb": {
+                "//benches/soc_tb/tests:smoke": 0,
+                "//benches/soc_tb/tests:dma_burst": 0,
+                "//benches/soc_tb/tests:dma_wrap": 0,
+            },
+            "//benches/dma_tb:dma_tb": {
+                "//benches/dma_tb/tests:smoke": 0,
+                "//benches/dma_tb/tests:stress": 0,
+            },
+        }
+        self.tests_to_tags = {
+            "//benches/soc_tb/tests:smoke": ["nightly", "quick"],
+            "//benches/soc_tb/tests:dma_burst": ["nightly"],
+            "//benches/soc_tb/tests:dma_wrap": ["nightly", "broken"],
+            "//benches/dma_tb/tests:smoke": ["quick"],
+            "//benches/dma_tb/tests:stress": [],
+        }
+        self.index = test_selection.SelectionIndex(self.all_vcomp, self.tests_to_tags)
+
+    def _selected(self, specs, global_tag=(), global_ntag=()):
+        return {
+            (vcomp.split(":")[1], test.split(":")[1]): iterations
+            for (vcomp, test), iterations in self.index.select(specs, global_tag, global_ntag).items()
+        }
+
+    def test_globs_select_tests_of_matching_benches(self):
+        self.assertEqual({
+            ("soc_tb", "dma_burst"): 1,
+            ("soc_tb", "dma_wrap"): 1,
+            ("dma_tb", "smoke"): 1,
+        },
+                         self._selected([
+                             test_selection.TestSpec("soc_tb", "dma_*", 1, set(), set()),
+                             test_selection.TestSpec("dma_tb", "smoke", 1, set(), set())
+                         ]))
+        self.assertEqual({}, self._selected([test_selection.TestSpec("missing_tb", "*", 1, set(), set())]))
+
+    def test_spec_and_global_tags_filter_tests(self):
+        self.assertEqual({("soc_tb", "smoke"): 2},
+                         self._selected([test_selection.TestSpec("*", "*", 2, {"nightly", "quick"}, set())]))
+        self.assertEqual({
+            ("soc_tb", "smoke"): 1,
+            ("soc_tb", "dma_burst"): 1,
+        }, self._selected([test_selection.TestSpec("soc_tb", "*", 1, set(), {"broken"})]))
+        self.assertEqual({("dma_tb", "smoke"): 1},
+                         self._selected([test_selection.TestSpec("*", "*", 1, set(), set())],
+                                        global_tag={"quick"},
+                                        global_ntag={"nightly"}))
+        self.assertEqual({}, self._selected([test_selection.TestSpec("*", "*", 1, {"unknown"}, set())]))
+
+    def test_test_matched_by_several_specs_keeps_the_largest_count(self):
+        self.assertEqual({
+            ("soc_tb", "smoke"): 5,
+            ("soc_tb", "dma_burst"): 3,
+            ("soc_tb", "dma_wrap"): 3,
+        },
+                         self._selected([
+                             test_selection.TestSpec("soc_tb", "*", 3, set(), set()),
+                             test_selection.TestSpec("soc_tb", "smoke", 5, set(), set()),
+                             test_selection.TestSpec("soc_tb", "sm?ke", 1, set(), set()),
+                         ]))
+
+
+if __name__ == "__main__":
+    unittest.main()
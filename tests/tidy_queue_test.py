@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from lib import tidy_queue
+
+
+class TidyQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.trash_root = self.root / tidy_queue.TRASH_DIR_NAME
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _job_dir(self, name, size=4096):
+        job_dir = self.root / name
+        (job_dir / "logs").mkdir(parents=True)
+        (job_dir / "logs" / "sim.log").write_bytes(b"x" * size)
+        os.symlink("/nonexistent", str(job_dir / "dangling"))
+        return job_dir
+
+    def test_remove_detaches_directory_and_drain_reports_reclaimed_space(self):
+        cleanup = tidy_queue.TidyQueue(str(self.trash_root), max_workers=2)
+        job_dirs = [self._job_dir("test_{}".format(index)) for index in range(3)]
+
+        for job_dir in job_dirs:
+            cleanup.remove(str(job_dir))
+            self.assertFalse(job_dir.exists())
+        self.assertTrue(cleanup.drain(timeout=10))
+        cleanup.close()
+
+        self.assertEqual([], os.listdir(str(self.trash_root)))
+        self.assertEqual(3, cleanup.directories)
+        self.assertGreaterEqual(cleanup.bytes_reclaimed, 3 * 4096)
+        self.assertEqual(0, cleanup.errors)
+        self.assertIn("from 3 directories", cleanup.summary())
+
+    def test_missing_directory_is_ignored(self):
+        cleanup = tidy_queue.TidyQueue(str(self.trash_root))
+
+        cleanup.remove(str(self.root / "never_created"))
+
+        self.assertTrue(cleanup.drain(timeout=10))
+        self.assertEqual(0, cleanup.directories)
+
+    def test_trash_abandoned_by_an_exited_run_is_swept(self):
+        abandoned = self.trash_root / "test_0.999999999.0123456789ab"
+        (abandoned / "logs").mkdir(parents=True)
+        (abandoned / "logs" / "sim.log").write_text("left behind")
+        live = self.trash_root / "test_1.{}.0123456789ab".format(os.getpid())
+        live.mkdir()
+
+        cleanup = tidy_queue.TidyQueue(str(self.trash_root))
+
+        self.assertTrue(cleanup.drain(timeout=10))
+        self.assertFalse(abandoned.exists())
+        self.assertTrue(live.exists())
+        self.assertEqual(0, cleanup.directories)
+
+    def test_worker_limit_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            tidy_queue.TidyQueue(str(self.trash_root), max_workers=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -977,19 +977,20 @@ def _verilog_dv_test_cfg_info_aspect_impl(target, ctx):
     if target[DVTestInfo].tb == None:
         return []
 
-    # buildifier: disable=print
-    print("verilog_dv_test_cfg_info({}, {}, {}, {})".format(
-        target.label,
-        target[DVTestInfo].tb.label,
-        target[DVTestInfo].tags,
-        target[DVTestInfo].simulator,
-    ))
-
-    # buildifier: enable=print
-    return []
+    info = ctx.actions.declare_file("{}_test_cfg_info.json".format(target.label.name))
+    ctx.actions.write(
+        output = info,
+        content = json.encode({
+            "test": str(target.label),
+            "tb": str(target[DVTestInfo].tb.label),
+            "tags": target[DVTestInfo].tags,
+            "simulator": target[DVTestInfo].simulator,
+        }),
+    )
+    return [OutputGroupInfo(verilog_dv_test_cfg_info = depset([info]))]
 
 verilog_dv_test_cfg_info_aspect = aspect(
-    doc = """Gather information about the tb and tags related to a verilog_dv_test_config for use in simmer.""",
+    doc = """Write the tb, tags and simulator of a verilog_dv_test_cfg to a JSON file in the verilog_dv_test_cfg_info output group for use in simmer.""",
     implementation = _verilog_dv_test_cfg_info_aspect_impl,
     required_providers = [[DVTestInfo]],
 )